@@ -0,0 +1,68 @@
+"""
+Benchmark DataSaver write throughput and compression ratio.
+
+Usage:
+    python benchmarks/bench_compression.py [data/france_church_*.json ...]
+
+Without arguments a synthetic dataset of 200 000 elements is used.
+"""
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.data_saver import DataSaver, _import_zstandard
+
+
+def synthetic_dataset(element_count=200_000, seed=1):
+    """Build an Overpass-like response with church nodes scattered over France."""
+    rng = random.Random(seed)
+    elements = []
+    for osm_id in range(1, element_count + 1):
+        elements.append({
+            "type": "node",
+            "id": osm_id,
+            "lat": round(rng.uniform(42.3, 51.1), 7),
+            "lon": round(rng.uniform(-4.8, 8.2), 7),
+            "tags": {
+                "amenity": "place_of_worship",
+                "religion": "christian",
+                "denomination": rng.choice(["catholic", "protestant", "orthodox"]),
+                "name": f"Église Saint-{rng.choice(['Pierre', 'Martin', 'Jean', 'Étienne'])} {osm_id}",
+            },
+        })
+    return {"version": 0.6, "generator": "synthetic", "elements": elements}
+
+
+def benchmark(name, data, workdir):
+    """Save the dataset with every codec and print throughput and ratio."""
+    suffixes = ["", ".gz"]
+    if _import_zstandard() is not None:
+        suffixes.append(".zst")
+
+    plain_size = None
+    print(f"\n{name} ({len(data.get('elements', []))} elements)")
+    for suffix in suffixes:
+        start = time.perf_counter()
+        path = DataSaver.save_json(data, Path(workdir) / f"bench.json{suffix}")
+        elapsed = time.perf_counter() - start
+        size = path.stat().st_size
+        plain_size = plain_size or size
+        print(f"  {suffix or 'plain':6} {size / 1e6:9.1f} MB  "
+              f"{plain_size / 1e6 / elapsed:8.1f} MB/s  ratio {plain_size / size:5.2f}x")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        if len(sys.argv) > 1:
+            for filename in sys.argv[1:]:
+                benchmark(filename, DataSaver.load_json(filename), workdir)
+        else:
+            benchmark("synthetic", synthetic_dataset(), workdir)
+
+
+if __name__ == "__main__":
+    main()
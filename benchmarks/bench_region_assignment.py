@@ -0,0 +1,97 @@
+"""
+Benchmark point-in-polygon region assignment throughput.
+
+Usage:
+    python benchmarks/bench_region_assignment.py [--points 1000000] [--workers N]
+
+A synthetic partition of France into 20 x 20 regions with wiggly shared
+borders (200 vertices per side) stands in for municipality boundaries.
+The target is millions of points per minute on one core.
+"""
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.region_assigner import RegionIndex, assign_regions
+
+BOUNDS = (-4.8, 42.3, 8.2, 51.1)
+
+
+def synthetic_regions(columns=20, rows=20, vertices_per_side=200, seed=3):
+    """Grid of regions whose borders are shared, jittered polylines."""
+    rng = random.Random(seed)
+    min_x, min_y, max_x, max_y = BOUNDS
+    xs = [min_x + (max_x - min_x) * i / columns for i in range(columns + 1)]
+    ys = [min_y + (max_y - min_y) * j / rows for j in range(rows + 1)]
+    jitter = min(xs[1] - xs[0], ys[1] - ys[0]) * 0.1
+    borders = {}
+
+    def border(a, b):
+        if (b, a) in borders:
+            return borders[(b, a)][::-1]
+        if (a, b) not in borders:
+            (ax, ay), (bx, by) = a, b
+            points = [a]
+            for step in range(1, vertices_per_side):
+                t = step / vertices_per_side
+                offset = rng.uniform(-jitter, jitter)
+                # Displace perpendicular to the (axis-aligned) side
+                if ay == by:
+                    points.append((ax + (bx - ax) * t, ay + offset))
+                else:
+                    points.append((ax + offset, ay + (by - ay) * t))
+            points.append(b)
+            borders[(a, b)] = points
+        return borders[(a, b)]
+
+    regions = []
+    for j in range(rows):
+        for i in range(columns):
+            corners = [(xs[i], ys[j]), (xs[i + 1], ys[j]), (xs[i + 1], ys[j + 1]), (xs[i], ys[j + 1])]
+            ring = []
+            for a, b in zip(corners, corners[1:] + corners[:1]):
+                ring.extend(border(a, b)[:-1])
+            ring.append(ring[0])
+            regions.append(({"id": j * columns + i, "name": f"Region {i},{j}"}, [ring]))
+    return regions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark region assignment")
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = RegionIndex(synthetic_regions())
+    edges = sum(len(polygon.edges) for _, polygon in index.regions)
+    print(f"Prepared {len(index.regions)} regions ({edges} edges) in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(4)
+    min_x, min_y, max_x, max_y = BOUNDS
+    elements = [{"type": "node", "id": i, "lat": rng.uniform(min_y, max_y), "lon": rng.uniform(min_x, max_x)}
+                for i in range(args.points)]
+
+    start = time.perf_counter()
+    assigned = assign_regions(elements, index, "admin_level_8", workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Assigned {assigned}/{len(elements)} points in {elapsed:.2f}s "
+          f"({len(elements) / elapsed * 60 / 1e6:.1f}M points/minute, {args.workers} worker(s))")
+
+    # Check a sample against the exact ray-casting test
+    sample = elements[:2000]
+    mismatches = 0
+    for element in sample:
+        expected = next((info for info, polygon in index.regions
+                         if polygon.contains_exact(element["lon"], element["lat"])), None)
+        if element.get("regions", {}).get("admin_level_8") != expected:
+            mismatches += 1
+    print(f"Exact-test mismatches in a sample of {len(sample)}: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
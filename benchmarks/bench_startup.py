@@ -0,0 +1,86 @@
+"""
+Benchmark CLI startup time for commands that should not touch the network.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 20] [--target-ms 40]
+
+Each command is run repeatedly in a fresh interpreter. The median wall time
+is reported next to the median of a bare `python -c pass`, and the
+difference (time spent in main.py, its imports and config loading) is
+compared to the target. The modules main.py imports are listed from
+`python -X importtime`, with the slowest first.
+"""
+import sys
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = {
+    "--list-types": ["main.py", "--list-types"],
+    "invalid flags": ["main.py", "--index", "--compress", "gzip"],
+    "unknown type": ["main.py", "--type", "no_such_type"],
+}
+
+
+def wall_time(args, runs):
+    """Median wall time of running the interpreter with args, in milliseconds."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return median(times)
+
+
+def slowest_imports(args, count=8):
+    """Cumulative import times (ms) of the top-level imports made by main.py."""
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    baseline = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], cwd=ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    interpreter_modules = {line.split("|")[2].strip() for line in baseline.stderr.splitlines() if "|" in line}
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented by two spaces per level
+        top_level = len(name) - len(name.lstrip()) == 1
+        if top_level and cumulative.strip().isdigit() and name.strip() not in interpreter_modules:
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--target-ms", type=float, default=40.0,
+                        help="Target for time spent beyond bare interpreter startup")
+    args = parser.parse_args()
+
+    interpreter = wall_time(["-c", "pass"], args.runs)
+    print(f"Interpreter startup (python -c pass): {interpreter:.1f} ms")
+
+    failed = False
+    for label, command in COMMANDS.items():
+        total = wall_time(command, args.runs)
+        overhead = total - interpreter
+        status = "ok" if overhead <= args.target_ms else "OVER TARGET"
+        failed |= overhead > args.target_ms
+        print(f"{label:>14}: {total:6.1f} ms total, {overhead:5.1f} ms over interpreter "
+              f"(target {args.target_ms:.0f} ms) {status}")
+
+    print("\nSlowest imports of --list-types (cumulative ms):")
+    for milliseconds, name in slowest_imports(COMMANDS["--list-types"]):
+        print(f"  {milliseconds:6.1f}  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
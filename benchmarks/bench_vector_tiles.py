@@ -0,0 +1,79 @@
+"""
+Benchmark vector tile export time and output size.
+
+Usage:
+    python benchmarks/bench_vector_tiles.py [--max-zoom 12] [--workers N] [data/france_church_*.json ...]
+
+Without files two synthetic datasets are used: a country-scale set of
+200 000 points and 2 000 park polygons over France, and one country outline
+of 20 000 vertices, whose many tiles per polygon stress clipping.
+"""
+import sys
+import time
+import math
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_compression import synthetic_dataset
+from src.data_saver import DataSaver
+from src.vector_tiles import export_mbtiles
+
+
+def synthetic_parks(count=2000, seed=2):
+    """Irregular polygons with `out geom` style geometry."""
+    rng = random.Random(seed)
+    parks = []
+    for osm_id in range(1, count + 1):
+        lat, lon = rng.uniform(42.3, 51.1), rng.uniform(-4.8, 8.2)
+        radius = rng.uniform(0.005, 0.1)
+        geometry = []
+        for step in range(64):
+            angle = step / 64 * 6.283185307
+            r = radius * rng.uniform(0.8, 1.2)
+            geometry.append({"lat": lat + r * math.sin(angle),
+                             "lon": lon + r * math.cos(angle)})
+        geometry.append(geometry[0])
+        parks.append({"type": "way", "id": osm_id, "tags": {"name": f"Parc {osm_id}"}, "geometry": geometry})
+    return parks
+
+
+def synthetic_outline(vertices=20000, seed=3):
+    """One large, slightly irregular polygon the size of France."""
+    rng = random.Random(seed)
+    geometry = []
+    for step in range(vertices):
+        angle = step / vertices * 6.283185307
+        r = 4 * (1 + 0.05 * math.sin(40 * angle)) * rng.uniform(0.99, 1.01)
+        geometry.append({"lat": 46.5 + 0.8 * r * math.sin(angle), "lon": 2.5 + r * math.cos(angle)})
+    geometry.append(geometry[0])
+    return [{"type": "way", "id": 1, "tags": {"name": "Outline"}, "geometry": geometry}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector tile export")
+    parser.add_argument("files", nargs="*", help="Saved data files to export")
+    parser.add_argument("--max-zoom", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    datasets = [(f, DataSaver.load_json(f)["elements"]) for f in args.files]
+    if not datasets:
+        datasets = [("synthetic", synthetic_dataset()["elements"] + synthetic_parks()),
+                    ("outline", synthetic_outline())]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, elements in datasets:
+            start = time.perf_counter()
+            stats = export_mbtiles(elements, Path(workdir) / "bench.mbtiles",
+                                   max_zoom=args.max_zoom, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            print(f"{name}: {len(elements)} elements, z0-{args.max_zoom}, {stats['tiles']} tiles, "
+                  f"{stats['bytes'] / 1e6:.1f} MB in {elapsed:.1f} s ({stats['tiles'] / elapsed:.0f} tiles/s)")
+
+
+if __name__ == "__main__":
+    main()
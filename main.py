@@ -1,29 +1,157 @@
-import json
 import argparse
 from pathlib import Path
-from src.data_saver import DataSaver
-from src.osm_data_fetcher import OSMDataFetcher
+from src.config_cache import load_config, validate_country_codes, validate_location_types
+from src.data_saver import COMPRESSION_SUFFIXES, DataSaver
+from src.regions import Region
+
+# Modules needed only by some commands (the fetcher pulls in requests) are
+# imported where they are used, so --list-types and argument errors stay fast.
+# Run benchmarks/bench_startup.py after changing the imports above.
 
 def list_available_location_types(config_dir):
     """Print available location types from configuration."""
     location_types_file = config_dir / "location_types.json"
     try:
-        with open(location_types_file, "r") as f:
-            location_types = json.load(f)
-            print("\nAvailable location types:")
-            for loc_type, config in location_types.items():
-                print(f"  - {loc_type}: {config.get('description', '')}")
-            print()
+        location_types = load_config(location_types_file, validate_location_types)
+        print("\nAvailable location types:")
+        for loc_type, config in location_types.items():
+            print(f"  - {loc_type}: {config.get('description', '')}")
+        print()
     except FileNotFoundError:
         print(f"Error: {location_types_file} does not exist.")
+    except ValueError as e:
+        print(f"Error: {location_types_file} is invalid: {e}")
+
+def save_results(fetcher, osm_data, output_name, location_type, args, country_name=None):
+    """Post-process and save fetched data according to the command-line options."""
+    if args.dedup:
+        osm_data, _ = fetcher.deduplicate(osm_data, location_type)
+
+    if args.assign_regions:
+        # Fetched data may be shared with other callers, so tag copies
+        osm_data = {**osm_data, 'elements': [dict(e) for e in osm_data.get('elements', [])]}
+    for admin_level in args.assign_regions or []:
+        from src.region_assigner import assign_regions, load_region_index
+        index = load_region_index(fetcher, country_name, admin_level)
+        if index is not None:
+            assigned = assign_regions(osm_data.get('elements', []), index, f"admin_level_{admin_level}",
+                                      workers=args.workers)
+            print(f"Assigned admin level {admin_level} regions to {assigned} elements")
+
+    element_count = len(osm_data.get('elements', []))
+    if args.partition:
+        output_dir = DataSaver.default_filename(output_name, location_type, element_count).removesuffix(".json")
+        DataSaver.save_partitioned(osm_data, output_dir, args.partition, args.precision, args.compress,
+                                   workers=args.workers)
+    else:
+        output_file = DataSaver.default_filename(output_name, location_type, element_count, args.compress)
+        DataSaver.save_json(osm_data, output_file, index=args.index)
+    if args.tiles:
+        from src.vector_tiles import export_mbtiles
+        export_mbtiles(osm_data.get('elements', []), f"data/{output_name}_{location_type}.mbtiles",
+                       max_zoom=args.max_zoom)
+
+def aggregate_results(fetcher, region, args):
+    """Stream elements into an aggregate and save only the aggregate."""
+    from src.aggregation import Aggregator, make_grid
+
+    region_indexes = {}
+    for admin_level in args.assign_regions or []:
+        from src.region_assigner import load_region_index
+        index = load_region_index(fetcher, args.country, admin_level)
+        if index is not None:
+            region_indexes[f"admin_level_{admin_level}"] = index
+
+    aggregator = Aggregator(make_grid(args.aggregate, args.cell_km, args.precision),
+                            args.stats_tags or (), region_indexes)
+
+    if args.from_file:
+        from src.dataset_reader import iter_elements
+        matcher = fetcher.get_tag_matcher(args.type)
+        elements = (e for e in iter_elements(args.from_file) if matcher.matches(e))
+        output_name = Path(args.from_file).name.split(".")[0] + "_filtered"
+    elif region:
+        elements = fetcher.stream_region(region, args.type)
+        output_name = region.label
+    else:
+        elements = fetcher.stream_data(args.country, args.type)
+        output_name = args.country.lower()
+
+    if elements is None:
+        print("Failed to fetch data after all retry attempts")
+        return
+
+    result = {"location_type": args.type, **aggregator.add_all(elements).result()}
+    print(f"Aggregated {result['element_count']} {args.type} elements")
+    output_file = f"data/{output_name.lower()}_{args.type}_{args.aggregate}_aggregate.json"
+    if args.compress:
+        output_file += COMPRESSION_SUFFIXES[args.compress]
+    DataSaver.save_json(result, output_file)
 
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description="Fetch OSM data for different location types")
     parser.add_argument("--country", "-c", default="Holy See (Vatican City State)", help="Country name to search within")
     parser.add_argument("--type", "-t", default="church", help="Location type to search for")
+    parser.add_argument("--region", "-r", help="Region to search instead of a country, e.g. subdivision:US-CA, admin:4:Bavaria, relation:62422, bbox:S,W,N,E")
+    parser.add_argument("--dedup", action="store_true", help="Merge duplicate elements of the same feature (e.g. node and building way)")
+    parser.add_argument("--from-file", help="Filter a previously saved file locally with the location type's conditions instead of fetching")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="Write the changes between two saved snapshots as JSON lines")
+    parser.add_argument("--batch", action="store_true", help="Fetch every combination of --countries and --types, longest jobs first")
+    parser.add_argument("--countries", nargs="+", help="Country names for --batch (defaults to --country)")
+    parser.add_argument("--types", nargs="+", help="Location types for --batch (defaults to --type)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetches for --batch")
     parser.add_argument("--list-types", "-l", action="store_true", help="List available location types")
+    parser.add_argument("--index", action="store_true", help="Write a sidecar offset index for random access to saved elements")
+    parser.add_argument("--lock-dir", help="Directory for file locks that share identical in-flight fetches across processes")
+    parser.add_argument("--serve", action="store_true", help="Run a long-lived server that accepts fetch jobs over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind with --serve")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind with --serve")
+    parser.add_argument("--tiles", action="store_true", help="Also export the results as vector tiles to an MBTiles file")
+    parser.add_argument("--max-zoom", type=int, default=14, help="Highest zoom level for --tiles")
+    parser.add_argument("--assign-regions", nargs="+", type=int, metavar="LEVEL", help="Tag elements with the admin boundaries of these levels containing them, e.g. 4 8")
+    parser.add_argument("--partition", choices=["geohash", "tile"], help="Save a directory of spatial partitions with a manifest instead of one file")
+    parser.add_argument("--precision", type=int, help="Geohash length (default 3) or tile zoom (default 8) for --partition, or H3 resolution (default 6) for --aggregate h3")
+    parser.add_argument("--aggregate", choices=["square", "hex", "h3"], help="Stream elements into per-cell counts on this equal-area grid and save only the aggregate")
+    parser.add_argument("--cell-km", type=float, default=10.0, help="Cell size in km for --aggregate square or hex")
+    parser.add_argument("--stats-tags", nargs="+", metavar="TAG", help="Tags to collect value statistics for with --aggregate")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], help="Compress the saved file (zstd falls back to gzip if unavailable)")
     args = parser.parse_args()
+
+    if args.index and args.compress:
+        parser.error("--index cannot be combined with --compress")
+    if args.index and args.partition:
+        parser.error("--index cannot be combined with --partition")
+    if args.assign_regions and args.region:
+        parser.error("--assign-regions needs a country and cannot be combined with --region")
+    if args.aggregate:
+        for flag in ("dedup", "index", "partition", "tiles", "batch"):
+            if getattr(args, flag):
+                parser.error(f"--aggregate cannot be combined with --{flag}")
+        if args.cell_km <= 0:
+            parser.error("--cell-km must be positive")
+        if args.aggregate == "h3":
+            from src.aggregation import make_grid
+            try:
+                make_grid("h3", resolution=args.precision)
+            except ImportError as e:
+                parser.error(str(e))
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.precision is not None and args.precision < 1:
+        parser.error("--precision must be at least 1")
+    if not 0 <= args.max_zoom <= 22:
+        parser.error("--max-zoom must be between 0 and 22")
+    for filename in (args.diff or []) + ([args.from_file] if args.from_file else []):
+        if not Path(filename).exists():
+            parser.error(f"{filename} does not exist")
+
+    region = None
+    if args.region:
+        try:
+            region = Region.parse(args.region)
+        except ValueError as e:
+            parser.error(str(e))
     
     # Create config directory if it doesn't exist
     config_dir = Path("config")
@@ -34,6 +162,25 @@ def main():
         list_available_location_types(config_dir)
         return
 
+    # Handle snapshot diff command
+    if args.diff:
+        old_file, new_file = args.diff
+        output_name = f"diff_{Path(old_file).name.split('.')[0]}_to_{Path(new_file).name.split('.')[0]}.jsonl"
+        if args.compress:
+            output_name += COMPRESSION_SUFFIXES[args.compress]
+        from src.snapshot_diff import write_diff
+        write_diff(old_file, new_file, Path("data") / output_name)
+        return
+
+    # Handle server mode
+    if args.serve:
+        from src.daemon import serve
+        try:
+            serve(args.host, args.port, str(config_dir))
+        except ValueError as e:
+            parser.error(f"invalid configuration: {e}")
+        return
+
     # Check if required configuration files exist
     country_codes_file = config_dir / "country_codes.json"
     location_types_file = config_dir / "location_types.json"
@@ -45,22 +192,61 @@ def main():
     if not location_types_file.exists():
         print(f"Error: {location_types_file} does not exist. Please create this file with location type definitions.")
         return
-    
+
+    # Validate names against the (cached) configuration before importing the fetcher
+    try:
+        country_codes = load_config(country_codes_file, validate_country_codes)
+        location_types = load_config(location_types_file, validate_location_types)
+    except ValueError as e:
+        parser.error(f"invalid configuration: {e}")
+    for loc_type in (args.types or [args.type]) if args.batch else [args.type]:
+        if loc_type not in location_types:
+            parser.error(f"unknown location type '{loc_type}' (see --list-types)")
+    if args.batch or not (region or args.from_file):
+        country_names = {name.lower() for name in country_codes.values()}
+        for country in (args.countries or [args.country]) if args.batch else [args.country]:
+            if country.lower() not in country_names:
+                parser.error(f"unknown country '{country}' (see {country_codes_file})")
+
+    from src.osm_data_fetcher import OSMDataFetcher
+    from src.single_flight import SingleFlight
+
     # Initialize fetcher
-    fetcher = OSMDataFetcher()
+    fetcher = OSMDataFetcher(single_flight=SingleFlight(args.lock_dir) if args.lock_dir else None)
+
+    # Handle aggregation mode
+    if args.aggregate:
+        aggregate_results(fetcher, region, args)
+        return
     
+    # Handle batch mode
+    if args.batch:
+        jobs = [(country, loc_type) for country in args.countries or [args.country]
+                for loc_type in args.types or [args.type]]
+        from src.job_scheduler import BatchScheduler
+        scheduler = BatchScheduler(fetcher, workers=args.workers)
+        scheduler.run(jobs, on_result=lambda country, loc_type, data: save_results(
+            fetcher, data, country.lower(), loc_type, args, country))
+        return
+
     # Set parameters from arguments
     country_name = args.country
     location_type = args.type
     
     # Fetch data
-    osm_data, country_code = fetcher.fetch_data(country_name, location_type)
+    if args.from_file:
+        osm_data = fetcher.filter_elements(DataSaver.load_json(args.from_file), location_type)
+        output_name = Path(args.from_file).name.split(".")[0] + "_filtered"
+    elif region:
+        osm_data = fetcher.fetch_region(region, location_type)
+        output_name = region.label
+    else:
+        osm_data, country_code = fetcher.fetch_data(country_name, location_type)
+        output_name = country_name.lower()
     
     # Save data if fetch was successful
     if osm_data:
-        element_count = len(osm_data.get('elements', []))
-        output_file = f"data/{country_name.lower()}_{location_type}_{element_count}_elements.json"
-        DataSaver.save_json(osm_data, output_file)
+        save_results(fetcher, osm_data, output_name, location_type, args, country_name)
     else:
         print("Failed to fetch data after all retry attempts")
 
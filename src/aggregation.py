@@ -0,0 +1,270 @@
+import math
+from src.geometry import element_coordinates, sinusoidal_km, sinusoidal_to_latlon
+
+GRID_TYPES = ("square", "hex", "h3")
+DEFAULT_H3_RESOLUTION = 6
+# Distinct values counted per statistics tag; rarer values beyond this are
+# only counted in total so memory stays bounded
+DEFAULT_MAX_VALUES = 1000
+
+
+def _import_h3():
+    """Import the optional h3 package (version 4), returning None if unavailable."""
+    try:
+        import h3
+    except ImportError:
+        return None
+    return h3
+
+
+class SquareGrid:
+    """Square cells of `cell_km` on a side in the sinusoidal equal-area projection."""
+
+    name = "square"
+
+    def __init__(self, cell_km=10.0):
+        self.cell_km = cell_km
+
+    def cell(self, lat, lon):
+        x, y = sinusoidal_km(lat, lon)
+        return math.floor(x / self.cell_km), math.floor(y / self.cell_km)
+
+    def cell_id(self, cell):
+        return f"{cell[0]}:{cell[1]}"
+
+    def center(self, cell):
+        return sinusoidal_to_latlon((cell[0] + 0.5) * self.cell_km, (cell[1] + 0.5) * self.cell_km)
+
+    def area_km2(self, cell):
+        return self.cell_km * self.cell_km
+
+    def describe(self):
+        return {"type": self.name, "cell_km": self.cell_km}
+
+
+class HexGrid(SquareGrid):
+    """
+    Pointy-top hexagons of `cell_km` squared area in the sinusoidal
+    equal-area projection, addressed by axial (q, r) coordinates.
+    """
+
+    name = "hex"
+
+    def __init__(self, cell_km=10.0):
+        super().__init__(cell_km)
+        # Edge length of a hexagon with the area of a cell_km square
+        self.size = math.sqrt(2 * cell_km * cell_km / (3 * math.sqrt(3)))
+
+    def cell(self, lat, lon):
+        x, y = sinusoidal_km(lat, lon)
+        q = (math.sqrt(3) / 3 * x - y / 3) / self.size
+        r = (2 / 3 * y) / self.size
+        # Round cube coordinates (q, r, -q-r) to the nearest hexagon
+        rq, rr, rs = round(q), round(r), round(-q - r)
+        dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs + q + r)
+        if dq > dr and dq > ds:
+            rq = -rr - rs
+        elif dr > ds:
+            rr = -rq - rs
+        return rq, rr
+
+    def center(self, cell):
+        q, r = cell
+        x = self.size * (math.sqrt(3) * q + math.sqrt(3) / 2 * r)
+        y = self.size * 1.5 * r
+        return sinusoidal_to_latlon(x, y)
+
+
+class H3Grid:
+    """Uber H3 cells of a resolution; requires the optional `h3` package."""
+
+    name = "h3"
+
+    def __init__(self, resolution=DEFAULT_H3_RESOLUTION):
+        self.h3 = _import_h3()
+        if self.h3 is None:
+            raise ImportError("The h3 package (version 4) is required for H3 aggregation")
+        self.resolution = resolution
+
+    def cell(self, lat, lon):
+        return self.h3.latlng_to_cell(lat, lon, self.resolution)
+
+    def cell_id(self, cell):
+        return cell
+
+    def center(self, cell):
+        return self.h3.cell_to_latlng(cell)
+
+    def area_km2(self, cell):
+        return self.h3.cell_area(cell, unit="km^2")
+
+    def describe(self):
+        return {"type": self.name, "resolution": self.resolution}
+
+
+def make_grid(grid_type, cell_km=10.0, resolution=None):
+    """
+    Create a grid by name.
+
+    Args:
+        grid_type (str): "square", "hex" or "h3"
+        cell_km (float): Cell side (square) or equivalent side (hex) in km
+        resolution (int): H3 resolution
+
+    Raises:
+        ValueError: If the grid type is unknown
+    """
+    if grid_type == "square":
+        return SquareGrid(cell_km)
+    if grid_type == "hex":
+        return HexGrid(cell_km)
+    if grid_type == "h3":
+        return H3Grid(resolution or DEFAULT_H3_RESOLUTION)
+    raise ValueError(f"Unknown grid type '{grid_type}'. Expected one of {GRID_TYPES}")
+
+
+class TagStatistics:
+    """Running statistics of one tag: presence, value counts and numeric summary."""
+
+    def __init__(self, max_values=DEFAULT_MAX_VALUES):
+        self.max_values = max_values
+        self.present = 0
+        self.values = {}
+        self.other_values = 0
+        self.numeric_count = 0
+        self.numeric_sum = 0.0
+        self.numeric_min = None
+        self.numeric_max = None
+
+    def add(self, value):
+        self.present += 1
+        if value in self.values:
+            self.values[value] += 1
+        elif len(self.values) < self.max_values:
+            self.values[value] = 1
+        else:
+            self.other_values += 1
+
+        try:
+            number = float(value)
+        except ValueError:
+            return
+        if math.isfinite(number):
+            self.numeric_count += 1
+            self.numeric_sum += number
+            self.numeric_min = number if self.numeric_min is None else min(self.numeric_min, number)
+            self.numeric_max = number if self.numeric_max is None else max(self.numeric_max, number)
+
+    def result(self):
+        result = {
+            "present": self.present,
+            "values": dict(sorted(self.values.items(), key=lambda item: (-item[1], item[0]))),
+            "other_values": self.other_values,
+        }
+        if self.numeric_count:
+            result["numeric"] = {
+                "count": self.numeric_count,
+                "min": self.numeric_min,
+                "max": self.numeric_max,
+                "mean": self.numeric_sum / self.numeric_count,
+            }
+        return result
+
+
+class Aggregator:
+    """
+    Incremental counts of elements per grid cell and region, plus tag statistics.
+
+    Elements are added one at a time and not kept, so memory is proportional
+    to the number of cells, regions and (bounded) distinct tag values rather
+    than to the number of elements.
+    """
+
+    def __init__(self, grid=None, stats_tags=(), region_indexes=None, max_values=DEFAULT_MAX_VALUES):
+        """
+        Args:
+            grid: Grid from `make_grid`, or None for no grid counts
+            stats_tags (iterable): Tag keys to collect statistics for
+            region_indexes (dict): Region level name to `RegionIndex`, e.g.
+                {"admin_level_4": index}, for per-region counts
+            max_values (int): Distinct values counted per statistics tag
+        """
+        self.grid = grid
+        self.region_indexes = region_indexes or {}
+        self.element_count = 0
+        self.unlocated = 0
+        self.cells = {}
+        self.regions = {level: {} for level in self.region_indexes}
+        self.tags = {tag: TagStatistics(max_values) for tag in stats_tags}
+
+    def add(self, element):
+        """Add one element to the aggregate."""
+        self.element_count += 1
+
+        tags = element.get("tags", {})
+        for tag, statistics in self.tags.items():
+            if tag in tags:
+                statistics.add(tags[tag])
+
+        coordinates = element_coordinates(element)
+        if coordinates is None:
+            self.unlocated += 1
+            return
+
+        if self.grid is not None:
+            cell = self.grid.cell(*coordinates)
+            self.cells[cell] = self.cells.get(cell, 0) + 1
+
+        lat, lon = coordinates
+        for level, index in self.region_indexes.items():
+            info = index.lookup(lon, lat)
+            if info is not None:
+                counts = self.regions[level]
+                entry = counts.get(info["id"])
+                if entry is None:
+                    entry = counts[info["id"]] = {**info, "count": 0}
+                entry["count"] += 1
+
+    def add_all(self, elements):
+        """Add every element of an iterable (consumed lazily)."""
+        add = self.add
+        for element in elements:
+            add(element)
+        return self
+
+    def result(self):
+        """
+        Build the aggregate as a JSON-serializable dict.
+
+        Returns:
+            dict: "element_count", "unlocated", "grid" with "cells" sorted by
+                count (id, center, count and density per km²), "regions" per
+                level and "tags" statistics
+        """
+        result = {"element_count": self.element_count, "unlocated": self.unlocated}
+
+        if self.grid is not None:
+            cells = []
+            for cell, count in sorted(self.cells.items(), key=lambda item: -item[1]):
+                lat, lon = self.grid.center(cell)
+                area = self.grid.area_km2(cell)
+                cells.append({
+                    "id": self.grid.cell_id(cell),
+                    "lat": round(lat, 6),
+                    "lon": round(lon, 6),
+                    "count": count,
+                    "area_km2": round(area, 3),
+                    "density_per_km2": count / area,
+                })
+            result["grid"] = {**self.grid.describe(), "cells": cells}
+
+        if self.regions:
+            result["regions"] = {
+                level: sorted(counts.values(), key=lambda entry: -entry["count"])
+                for level, counts in self.regions.items()
+            }
+
+        if self.tags:
+            result["tags"] = {tag: statistics.result() for tag, statistics in self.tags.items()}
+
+        return result
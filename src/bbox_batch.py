@@ -0,0 +1,235 @@
+import math
+from src.geometry import METERS_PER_DEGREE, element_coordinates, haversine_m, segment_distance_m
+
+
+def bbox_area(bbox):
+    """Area of a (south, west, north, east) box in square degrees."""
+    south, west, north, east = bbox
+    return max(0.0, north - south) * max(0.0, east - west)
+
+
+def bbox_intersection_area(a, b):
+    """Area of the intersection of two boxes in square degrees."""
+    return bbox_area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def bbox_union(a, b):
+    """Smallest box containing both boxes."""
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def bboxes_overlap(a, b):
+    """Check whether two boxes intersect (touching counts)."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def bbox_contains(bbox, lat, lon):
+    """Check whether a point lies inside a box."""
+    return bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]
+
+
+def merge_bboxes(bboxes):
+    """
+    Merge overlapping boxes where one box covers exactly the same ground.
+
+    Two overlapping boxes are replaced by their union when the union's area
+    does not exceed the area the two cover together (their areas less the
+    overlap), so merging never makes Overpass scan more ground. Boxes inside
+    others and boxes sharing a full side always merge, while an L-shaped pair
+    or a diagonal chain (e.g. a corridor) stays split.
+
+    Args:
+        bboxes (list): (south, west, north, east) tuples
+
+    Returns:
+        list: Merged boxes
+    """
+    boxes = [tuple(float(c) for c in bbox) for bbox in bboxes]
+    merged = True
+    while merged:
+        merged = False
+        boxes.sort(key=lambda box: box[1])
+        result = []
+        for box in boxes:
+            for i in range(len(result) - 1, -1, -1):
+                other = result[i]
+                if not bboxes_overlap(box, other):
+                    continue
+                union = bbox_union(box, other)
+                covered = bbox_area(box) + bbox_area(other) - bbox_intersection_area(box, other)
+                # Allow for rounding in the sums of equal areas
+                if bbox_area(union) <= covered * (1 + 1e-9):
+                    result[i] = union
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+
+def pack_bboxes(bboxes, box_cost, max_cost):
+    """
+    Group boxes into as few batches as possible under a cost limit.
+
+    Args:
+        bboxes (list): Boxes in the order they should be packed
+        box_cost (callable): Cost of adding a box to a batch, e.g. the length
+            of its query clauses
+        max_cost (int): Maximum total cost of a batch; a single box over
+            the limit still gets a batch of its own
+
+    Returns:
+        list: Lists of boxes
+    """
+    batches = []
+    batch, cost = [], 0
+    for box in bboxes:
+        size = box_cost(box)
+        if batch and cost + size > max_cost:
+            batches.append(batch)
+            batch, cost = [], 0
+        batch.append(box)
+        cost += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def split_polyline(polyline, step_m):
+    """
+    Split a polyline into segments of at most `step_m` meters.
+
+    Args:
+        polyline (list): (lat, lon) points
+
+    Returns:
+        list: ((lat, lon), (lat, lon)) segments
+    """
+    points = list(polyline)
+    if len(points) == 1:
+        points = points * 2
+    segments = []
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+        pieces = max(1, math.ceil(haversine_m(lat1, lon1, lat2, lon2) / step_m))
+        for piece in range(pieces):
+            t1, t2 = piece / pieces, (piece + 1) / pieces
+            segments.append(((lat1 + (lat2 - lat1) * t1, lon1 + (lon2 - lon1) * t1),
+                             (lat1 + (lat2 - lat1) * t2, lon1 + (lon2 - lon1) * t2)))
+    return segments
+
+
+def corridor_bboxes(polyline, buffer_m, step_m=None):
+    """
+    Cover a buffered polyline with boxes.
+
+    The polyline is split into pieces of at most `step_m` (four buffer
+    widths by default), and each piece becomes a box grown by the buffer.
+
+    Args:
+        polyline (list): (lat, lon) points
+        buffer_m (float): Buffer distance in meters
+        step_m (float): Maximum length of the route covered by one box
+
+    Returns:
+        list: (south, west, north, east) boxes
+    """
+    step_m = step_m or max(4 * buffer_m, 1.0)
+    return [buffered_bbox(start, end, buffer_m) for start, end in split_polyline(polyline, step_m)]
+
+
+def buffered_bbox(start, end, buffer_m):
+    """Box around a (lat, lon) segment grown by a distance in meters."""
+    south, north = min(start[0], end[0]), max(start[0], end[0])
+    west, east = min(start[1], end[1]), max(start[1], end[1])
+    lat_buffer = buffer_m / METERS_PER_DEGREE
+    widest = max(abs(south - lat_buffer), abs(north + lat_buffer))
+    lon_buffer = buffer_m / (METERS_PER_DEGREE * max(math.cos(math.radians(min(widest, 89.9))), 1e-6))
+    return (max(-90.0, south - lat_buffer), max(-180.0, west - lon_buffer),
+            min(90.0, north + lat_buffer), min(180.0, east + lon_buffer))
+
+
+class BoxIndex:
+    """Uniform grid over boxes for finding the boxes containing a point."""
+
+    def __init__(self, bboxes):
+        self.bboxes = list(bboxes)
+        sizes = sorted(max(b[2] - b[0], b[3] - b[1]) for b in self.bboxes) or [1.0]
+        # Typical box size, but coarse enough that no box spans a huge number of cells
+        self.cell = max(sizes[len(sizes) // 2], sizes[-1] / 64) or 1.0
+        self.cells = {}
+        for index, (south, west, north, east) in enumerate(self.bboxes):
+            for row in range(math.floor(south / self.cell), math.floor(north / self.cell) + 1):
+                for column in range(math.floor(west / self.cell), math.floor(east / self.cell) + 1):
+                    self.cells.setdefault((row, column), []).append(index)
+
+    def containing(self, lat, lon):
+        """Indexes of the boxes containing a point."""
+        key = (math.floor(lat / self.cell), math.floor(lon / self.cell))
+        return [i for i in self.cells.get(key, ()) if bbox_contains(self.bboxes[i], lat, lon)]
+
+    def overlapping(self, bbox):
+        """Indexes of the boxes intersecting a box."""
+        return [i for i, other in enumerate(self.bboxes) if bboxes_overlap(bbox, other)]
+
+    def nearest(self, lat, lon, candidates=None):
+        """Index of the box closest to a point (by degrees), among `candidates` if given."""
+        def distance(bbox):
+            dlat = max(bbox[0] - lat, 0.0, lat - bbox[2])
+            dlon = max(bbox[1] - lon, 0.0, lon - bbox[3])
+            return dlat * dlat + dlon * dlon
+        candidates = range(len(self.bboxes)) if candidates is None else candidates
+        return min(candidates, key=lambda i: distance(self.bboxes[i]))
+
+
+def map_to_bboxes(elements, bboxes):
+    """
+    Assign elements to each box containing their location.
+
+    Nodes outside every box are dropped. Ways and relations are located by
+    their center, so one crossing a box edge with its center outside every
+    box is given to the nearest box its `bounds` reach; without bounds there
+    is no evidence that it reaches a box, and it is dropped.
+
+    Returns:
+        list: Element lists, one per box in input order
+    """
+    index = BoxIndex(bboxes)
+    results = [[] for _ in index.bboxes]
+    for element in elements:
+        coordinates = element_coordinates(element)
+        if coordinates is None or not index.bboxes:
+            continue
+        matches = index.containing(*coordinates)
+        bounds = element.get("bounds")
+        if not matches and bounds and "lat" not in element:
+            reaching = index.overlapping((bounds["minlat"], bounds["minlon"], bounds["maxlat"], bounds["maxlon"]))
+            matches = [index.nearest(*coordinates, reaching)] if reaching else []
+        for i in matches:
+            results[i].append(element)
+    return results
+
+
+class PolylineIndex:
+    """Grid of polyline segments for distance queries within a buffer."""
+
+    def __init__(self, polyline, buffer_m):
+        self.buffer_m = buffer_m
+        # Short segments keep each one's buffered box within a few cells
+        self.segments = split_polyline(polyline, max(4 * buffer_m, 1.0))
+        self.cell = max(2 * buffer_m / METERS_PER_DEGREE, 1e-4)
+        self.cells = {}
+        for index, (start, end) in enumerate(self.segments):
+            south, west, north, east = buffered_bbox(start, end, buffer_m)
+            for row in range(math.floor(south / self.cell), math.floor(north / self.cell) + 1):
+                for column in range(math.floor(west / self.cell), math.floor(east / self.cell) + 1):
+                    self.cells.setdefault((row, column), []).append(index)
+
+    def distance_m(self, lat, lon):
+        """Distance to the polyline, or None if farther than the buffer."""
+        key = (math.floor(lat / self.cell), math.floor(lon / self.cell))
+        distances = [segment_distance_m(lat, lon, *self.segments[i]) for i in self.cells.get(key, ())]
+        nearest = min(distances, default=None)
+        if nearest is None or nearest > self.buffer_m:
+            return None
+        return nearest
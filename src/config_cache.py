@@ -0,0 +1,103 @@
+import os
+import json
+import marshal
+from pathlib import Path
+from src.conflation import validate_dedup_settings
+from src.tag_filter import CompiledTagGroup
+
+# Parsed configuration files are cached next to them in this directory
+CACHE_DIR_NAME = ".cache"
+# Bump when the cached layout or the validation rules change
+CACHE_FORMAT_VERSION = 3
+
+
+def validate_country_codes(country_codes):
+    """
+    Check that country codes map ISO codes to country names.
+
+    Raises:
+        ValueError: If the configuration is malformed
+    """
+    if not isinstance(country_codes, dict):
+        raise ValueError("country_codes.json must contain an object of code to name")
+    for code, name in country_codes.items():
+        if not isinstance(name, str):
+            raise ValueError(f"Country name for '{code}' must be a string")
+
+
+def validate_location_types(location_types):
+    """
+    Check the structure of location type definitions.
+
+    Raises:
+        ValueError: If the configuration is malformed
+    """
+    if not isinstance(location_types, dict):
+        raise ValueError("location_types.json must contain an object of location types")
+    for name, config in location_types.items():
+        if not isinstance(config, dict):
+            raise ValueError(f"Location type '{name}' must be an object")
+        for tag_group in config.get("tags", []):
+            conditions = tag_group.get("conditions") if isinstance(tag_group, dict) else None
+            if not isinstance(conditions, list) or not all(isinstance(c, dict) and "key" in c for c in conditions):
+                raise ValueError(f"Location type '{name}' has a tag group without a list of conditions with keys")
+            try:
+                CompiledTagGroup(tag_group)
+            except ValueError as e:
+                raise ValueError(f"Location type '{name}': {e}") from e
+        if "dedup" in config:
+            validate_dedup_settings(config["dedup"], name)
+
+
+def cache_path(path):
+    """Path of the cache file for a configuration file."""
+    path = Path(path)
+    return path.parent / CACHE_DIR_NAME / f"{path.name}.marshal"
+
+
+def load_config(path, validate=None):
+    """
+    Load a JSON configuration file through a compact binary cache.
+
+    The parsed and validated value is stored with `marshal`, keyed by the
+    file's modification time and size, so unchanged files are not parsed or
+    validated again. Cache files that cannot be read or written are ignored.
+
+    Args:
+        path (str): JSON file
+        validate (callable): Optional check run on freshly parsed values
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not valid JSON or fails validation
+    """
+    path = Path(path)
+    stat = path.stat()
+    key = (CACHE_FORMAT_VERSION, stat.st_mtime_ns, stat.st_size)
+    cache_file = cache_path(path)
+
+    try:
+        with open(cache_file, "rb") as f:
+            cached_key, value = marshal.load(f)
+        if cached_key == key:
+            return value
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with open(path, "r", encoding="utf-8") as f:
+        value = json.load(f)
+    if validate:
+        validate(value)
+
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        temporary = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as f:
+            marshal.dump((key, value), f)
+        os.replace(temporary, cache_file)
+    except OSError:
+        pass
+    return value
@@ -0,0 +1,158 @@
+import re
+import math
+import unicodedata
+from src.geometry import element_coordinates, haversine_m, local_meters
+
+DEFAULT_DISTANCE_M = 50
+DEFAULT_NAME_SIMILARITY = 0.5
+
+# Settings of a location type's "dedup" block, passed to deduplicate_elements
+DEDUP_SETTINGS = ("distance_m", "name_similarity", "merge_unnamed")
+
+# Preferred representative type when candidates carry equally many tags
+TYPE_RANK = {"relation": 2, "way": 1, "node": 0}
+
+
+def validate_dedup_settings(settings, location_type):
+    """
+    Check a location type's "dedup" settings.
+
+    Raises:
+        ValueError: If a setting is unknown or has an invalid value
+    """
+    if not isinstance(settings, dict):
+        raise ValueError(f"Location type '{location_type}' dedup settings must be an object")
+    unknown = set(settings) - set(DEDUP_SETTINGS)
+    if unknown:
+        raise ValueError(f"Location type '{location_type}' has unknown dedup settings {sorted(unknown)}; "
+                         f"expected {list(DEDUP_SETTINGS)}")
+    distance_m = settings.get("distance_m", DEFAULT_DISTANCE_M)
+    if isinstance(distance_m, bool) or not isinstance(distance_m, (int, float)) or distance_m <= 0:
+        raise ValueError(f"Location type '{location_type}' dedup distance_m must be a positive number")
+    name_similarity = settings.get("name_similarity", DEFAULT_NAME_SIMILARITY)
+    if isinstance(name_similarity, bool) or not isinstance(name_similarity, (int, float)) \
+            or not 0 <= name_similarity <= 1:
+        raise ValueError(f"Location type '{location_type}' dedup name_similarity must be between 0 and 1")
+    if not isinstance(settings.get("merge_unnamed", True), bool):
+        raise ValueError(f"Location type '{location_type}' dedup merge_unnamed must be true or false")
+
+
+def _name_trigrams(element):
+    """Character trigrams of an element's normalized name, or None if unnamed."""
+    name = element.get("tags", {}).get("name")
+    if not name:
+        return None
+    # Case-fold and drop accents but keep letters of every script
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    normalized = " " + re.sub(r"[\W_]+", " ", stripped).strip() + " "
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+
+def _similar(trigrams_a, trigrams_b, threshold, merge_unnamed):
+    """Compare two names by trigram Jaccard similarity."""
+    if trigrams_a is None or trigrams_b is None:
+        return merge_unnamed
+    union = len(trigrams_a | trigrams_b)
+    return union > 0 and len(trigrams_a & trigrams_b) / union >= threshold
+
+
+def _find(parents, i):
+    """Find the component root of i in a union-find forest with path halving."""
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def deduplicate_elements(elements, distance_m=DEFAULT_DISTANCE_M,
+                         name_similarity=DEFAULT_NAME_SIMILARITY, merge_unnamed=True):
+    """
+    Merge elements that represent the same physical feature.
+
+    Elements are hashed into a grid of `distance_m` cells so each one is only
+    compared with candidates in its 3x3 neighbourhood, which keeps the work
+    near-linear in the number of elements. Two elements are duplicates when
+    they are within `distance_m` and their names are similar; unnamed
+    elements match any nearby element when `merge_unnamed` is set.
+
+    Groups only join when every pair across them would match, so duplicates
+    do not chain: an unnamed element between two differently named ones
+    joins only one of them, and no group is wider than `distance_m`.
+
+    Each group of duplicates is replaced by its most detailed element, with
+    tags missing from it filled in from the others and the merged elements
+    listed under `"duplicates"`.
+
+    Args:
+        elements (list): Overpass elements
+        distance_m (float): Maximum distance between duplicates in meters
+        name_similarity (float): Minimum trigram Jaccard similarity of names
+        merge_unnamed (bool): Whether unnamed elements can be merged
+
+    Returns:
+        tuple: (deduplicated elements, number of elements merged away)
+    """
+    parents = list(range(len(elements)))
+    members = {}
+    grid = {}
+    points = [None] * len(elements)
+    trigrams = [None] * len(elements)
+
+    def matches(a, b):
+        return (haversine_m(*points[a], *points[b]) <= distance_m
+                and _similar(trigrams[a], trigrams[b], name_similarity, merge_unnamed))
+
+    for i, element in enumerate(elements):
+        coordinates = element_coordinates(element)
+        if coordinates is None:
+            continue
+
+        lat, lon = coordinates
+        x, y = local_meters(lat, lon)
+        cell_x, cell_y = math.floor(x / distance_m), math.floor(y / distance_m)
+        points[i] = coordinates
+        trigrams[i] = _name_trigrams(element)
+
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((cell_x + dx, cell_y + dy), ()):
+                    root_i, root_j = _find(parents, i), _find(parents, j)
+                    if root_i == root_j or not matches(i, j):
+                        continue
+                    group_i, group_j = members.get(root_i, [root_i]), members.get(root_j, [root_j])
+                    if all(matches(a, b) for a in group_i for b in group_j):
+                        parents[root_j] = root_i
+                        members[root_i] = group_i + group_j
+                        members.pop(root_j, None)
+
+        grid.setdefault((cell_x, cell_y), []).append(i)
+
+    groups = {}
+    for i in range(len(elements)):
+        groups.setdefault(_find(parents, i), []).append(i)
+
+    merged = []
+    for members in sorted(groups.values(), key=lambda m: m[0]):
+        if len(members) == 1:
+            merged.append(elements[members[0]])
+            continue
+
+        def detail(i):
+            return len(elements[i].get("tags", {})), TYPE_RANK.get(elements[i].get("type"), -1)
+
+        keep = max(members, key=detail)
+        representative = dict(elements[keep])
+        tags = dict(representative.get("tags", {}))
+        duplicates = list(representative.get("duplicates", []))
+        for i in members:
+            if i == keep:
+                continue
+            for key, value in elements[i].get("tags", {}).items():
+                tags.setdefault(key, value)
+            duplicates.append({"type": elements[i].get("type"), "id": elements[i].get("id")})
+        representative["tags"] = tags
+        representative["duplicates"] = duplicates
+        merged.append(representative)
+
+    return merged, len(elements) - len(merged)
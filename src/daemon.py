@@ -0,0 +1,156 @@
+import json
+import requests
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.data_saver import COMPRESSION_SUFFIXES, DataSaver
+from src.osm_data_fetcher import OSMDataFetcher
+from src.regions import Region
+
+
+class FetchRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP API for fetch jobs.
+
+    Endpoints:
+        GET  /health  Liveness check
+        GET  /types   Configured location types
+        POST /fetch   Run a fetch job. JSON body fields:
+                      "type" (required), "country" or "region",
+                      "save" (default true), "compress", "index", "output_dir"
+                      (relative to the server's data directory)
+    """
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/types":
+            fetcher = self.server.fetcher
+            fetcher.reload_config_if_changed()
+            self._send_json(200, fetcher.location_types)
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/fetch":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Request body must be a JSON object"})
+            return
+
+        status, result = self.server.run_job(job)
+        self._send_json(status, result)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+class FetchServer(ThreadingHTTPServer):
+    """
+    Long-lived server that keeps an `OSMDataFetcher` loaded between jobs.
+
+    The fetcher reuses one HTTP session for all Overpass requests and its
+    configuration is reloaded whenever the config files change on disk.
+    Output files are only written inside `data_dir`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8765), fetcher=None, config_path="config", data_dir="data"):
+        super().__init__(address, FetchRequestHandler)
+        self.fetcher = fetcher or OSMDataFetcher(config_path=config_path, session=requests.Session())
+        self.data_dir = Path(data_dir).resolve()
+
+    def run_job(self, job):
+        """
+        Run a single fetch job.
+
+        Args:
+            job (dict): Job description as accepted by POST /fetch
+
+        Returns:
+            tuple: (HTTP status code, response payload)
+        """
+        if not isinstance(job, dict) or not job.get("type"):
+            return 400, {"error": "Job must include a location 'type'"}
+        for field in ("type", "country", "region", "compress", "output_dir"):
+            if field in job and job[field] is not None and not isinstance(job[field], str):
+                return 400, {"error": f"'{field}' must be a string"}
+        if bool(job.get("country")) == bool(job.get("region")):
+            return 400, {"error": "Job must include exactly one of 'country' or 'region'"}
+        compression = job.get("compress")
+        if compression and compression not in COMPRESSION_SUFFIXES:
+            return 400, {"error": f"Unknown compression '{compression}'"}
+
+        output_dir = (self.data_dir / (job.get("output_dir") or "")).resolve()
+        if not output_dir.is_relative_to(self.data_dir):
+            return 400, {"error": "'output_dir' must be a path inside the server's data directory"}
+
+        self.fetcher.reload_config_if_changed()
+        location_type = job["type"]
+        if location_type not in self.fetcher.location_types:
+            return 400, {"error": f"Unknown location type '{location_type}'"}
+
+        if job.get("region"):
+            try:
+                region = Region.parse(job["region"])
+            except ValueError as e:
+                return 400, {"error": str(e)}
+        elif not self.fetcher.get_country_code(job["country"]):
+            return 400, {"error": f"Unknown country '{job['country']}'"}
+
+        try:
+            if job.get("region"):
+                osm_data = self.fetcher.fetch_region(region, location_type)
+                output_name = region.label
+            else:
+                osm_data, _ = self.fetcher.fetch_data(job["country"], location_type)
+                output_name = job["country"]
+        except ValueError as e:
+            # The query could not be built from the configuration
+            return 500, {"error": f"Invalid configuration for '{location_type}': {e}"}
+        except OSError as e:
+            return 500, {"error": f"Fetch failed: {e}"}
+
+        if osm_data is None:
+            return 502, {"error": "Failed to fetch data after all retry attempts"}
+
+        element_count = len(osm_data.get("elements", []))
+        if not job.get("save", True):
+            return 200, {"element_count": element_count, "data": osm_data}
+
+        output_file = DataSaver.default_filename(
+            output_name, location_type, element_count, compression, output_dir
+        )
+        try:
+            output_path = DataSaver.save_json(osm_data, output_file, index=job.get("index", False))
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except OSError as e:
+            return 500, {"error": f"Could not save {output_file}: {e}"}
+
+        return 200, {"element_count": element_count, "output_path": str(output_path)}
+
+
+def serve(host="127.0.0.1", port=8765, config_path="config", data_dir="data"):
+    """Run the fetch server until interrupted."""
+    server = FetchServer((host, port), config_path=config_path, data_dir=data_dir)
+    print(f"Serving fetch jobs on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,20 +1,302 @@
+import io
+import gzip
 import json
+import struct
 from pathlib import Path
+from src.geometry import (element_coordinates, geohash_bounds, geohash_cell, geohash_from_cell,
+                          tile_bounds, tile_for)
+
+# Sidecar index layout: a header followed by one fixed-width record per
+# element in file order, then the record positions sorted by (type, id) so
+# lookups can binary search the memory-mapped index without loading it.
+INDEX_MAGIC = b"OSMIDX1\0"
+INDEX_HEADER = struct.Struct("<8sQ")
+INDEX_RECORD = struct.Struct("<BxxxxxxxqQQ")
+INDEX_POSITION = struct.Struct("<Q")
+OSM_TYPE_CODES = {"node": 0, "way": 1, "relation": 2}
+
+# Compressed output is selected by file extension
+GZIP_SUFFIX = ".gz"
+ZSTD_SUFFIX = ".zst"
+COMPRESSION_SUFFIXES = {"gzip": GZIP_SUFFIX, "zstd": ZSTD_SUFFIX}
+
+# Partitioned output: one file per geohash cell or map tile, listed in a
+# manifest that readers use to prune partitions by bounding box
+PARTITION_SCHEMES = ("geohash", "tile")
+DEFAULT_PARTITION_PRECISION = {"geohash": 3, "tile": 8}
+MANIFEST_NAME = "manifest.json"
+UNLOCATED_PARTITION = "unlocated"
+
+
+def _import_zstandard():
+    """Import the optional zstandard package, returning None if unavailable."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
 
 class DataSaver:
     """Class to handle saving data to various formats."""
-    
+
     @staticmethod
-    def save_json(data, filename):
-        """Save data to a JSON file."""
+    def save_json(data, filename, index=False):
+        """
+        Save data to a JSON file.
+
+        Args:
+            data (dict): Overpass response to save
+            filename (str): Output file path. A `.zst` or `.gz` extension
+                writes compressed output (zstd falls back to gzip when the
+                `zstandard` package is not installed)
+            index (bool): Also write a `<filename>.idx` offset index that
+                `DatasetReader` uses for random access to single elements
+
+        Returns:
+            Path: Path of the written file
+        """
         output_path = Path(filename)
-        
+
+        if output_path.suffix == ZSTD_SUFFIX and _import_zstandard() is None:
+            print("Warning: zstandard is not installed. Falling back to gzip compression.")
+            output_path = output_path.with_suffix(GZIP_SUFFIX)
+
+        if index and output_path.suffix in (GZIP_SUFFIX, ZSTD_SUFFIX):
+            raise ValueError("An offset index can only be written for uncompressed output")
+
         # Create directory if it doesn't exist
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        
+
         # Save data to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
+        if index:
+            with open(output_path, 'wb') as f:
+                entries = DataSaver._write_indexed_json(data, f)
+            DataSaver._write_index(entries, DataSaver.index_path(output_path))
+        else:
+            with DataSaver.open_text(output_path, 'w') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
         print(f"Data saved to {output_path}")
-        return output_path
\ No newline at end of file
+        return output_path
+
+    @staticmethod
+    def default_filename(name, location_type, element_count, compression=None, directory="data"):
+        """
+        Build the standard output path for fetched data.
+
+        Args:
+            name (str): Country name or region label
+            location_type (str): Fetched location type
+            element_count (int): Number of fetched elements
+            compression (str): Optional "gzip" or "zstd"
+            directory (str): Output directory
+
+        Returns:
+            str: Output file path
+        """
+        filename = f"{directory}/{name.lower()}_{location_type}_{element_count}_elements.json"
+        if compression:
+            filename += COMPRESSION_SUFFIXES[compression]
+        return filename
+
+    @staticmethod
+    def save_partitioned(data, directory, scheme="geohash", precision=None, compression=None, workers=None):
+        """
+        Save data as a directory of spatial partitions with a manifest.
+
+        Elements are grouped by the geohash prefix (`geohash=<hash>/`) or map
+        tile (`x=<x>/y=<y>/` at zoom `precision`) containing them, and each
+        partition is written concurrently as a regular data file. Elements
+        without a location go to `unlocated/`. `manifest.json` lists every
+        partition with its path, element count, cell bounds and the extent
+        of its elements, so readers can prune and read partitions in parallel
+        (see `read_partitions`).
+
+        Args:
+            data (dict): Overpass response to save
+            directory (str): Output directory
+            scheme (str): "geohash" or "tile"
+            precision (int): Geohash length or tile zoom level (3 and 8 by
+                default)
+            compression (str): Optional "gzip" or "zstd" for partition files
+            workers (int): Threads writing partitions (executor default if None)
+
+        Returns:
+            Path: Path of the output directory
+        """
+        if scheme not in PARTITION_SCHEMES:
+            raise ValueError(f"Unknown partition scheme '{scheme}'. Expected one of {PARTITION_SCHEMES}")
+        precision = precision or DEFAULT_PARTITION_PRECISION[scheme]
+
+        if compression == "zstd" and _import_zstandard() is None:
+            print("Warning: zstandard is not installed. Falling back to gzip compression.")
+            compression = "gzip"
+        filename = "elements.json" + (COMPRESSION_SUFFIXES[compression] if compression else "")
+
+        # Group by integer cell; keys and bounds are derived once per partition
+        groups = {}
+        for element in data.get("elements", []):
+            coordinates = element_coordinates(element)
+            if coordinates is None:
+                cell = None
+            elif scheme == "geohash":
+                cell = geohash_cell(*coordinates, precision)
+            else:
+                cell = tile_for(*coordinates, precision)
+            group = groups.get(cell)
+            if group is None:
+                group = groups[cell] = []
+            group.append(element)
+
+        partitions = []
+        for cell, elements in groups.items():
+            if cell is None:
+                key, path, bounds = UNLOCATED_PARTITION, UNLOCATED_PARTITION, None
+            elif scheme == "geohash":
+                key = geohash_from_cell(*cell, precision)
+                path, bounds = f"geohash={key}", list(geohash_bounds(key))
+            else:
+                key, path, bounds = f"{precision}/{cell[0]}/{cell[1]}", f"x={cell[0]}/y={cell[1]}", \
+                    list(tile_bounds(precision, *cell))
+            partitions.append((
+                {"key": key, "path": f"{path}/{filename}", "count": len(elements), "bounds": bounds, "extent": None},
+                elements,
+            ))
+
+        output_dir = Path(directory)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        metadata = {key: value for key, value in data.items() if key != "elements"}
+
+        def write(partition):
+            entry, elements = partition
+            points = [c for c in map(element_coordinates, elements) if c is not None]
+            if points:
+                lats, lons = [lat for lat, _ in points], [lon for _, lon in points]
+                entry["extent"] = [min(lats), min(lons), max(lats), max(lons)]
+            path = output_dir / entry["path"]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with DataSaver.open_text(path, 'w') as f:
+                json.dump({**metadata, "elements": elements}, f, ensure_ascii=False, indent=2)
+            return entry
+
+        # Imported here to keep it (and logging) out of CLI startup
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            entries = list(executor.map(write, partitions))
+
+        # Written last, so a manifest always describes complete partitions
+        manifest = {
+            "scheme": scheme,
+            "precision": precision,
+            "element_count": sum(entry["count"] for entry in entries),
+            "partitions": sorted(entries, key=lambda entry: entry["key"]),
+        }
+        with open(output_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        print(f"Data saved to {output_dir} ({len(partitions)} partitions)")
+        return output_dir
+
+    @staticmethod
+    def load_json(filename):
+        """Load a JSON file written by `save_json`, decompressing if needed."""
+        with DataSaver.open_text(filename, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def open_text(filename, mode='r'):
+        """
+        Open a data file as a text stream, transparently (de)compressing
+        `.gz` and `.zst` files.
+
+        Args:
+            filename (str): File path
+            mode (str): 'r' to read or 'w' to write
+
+        Returns:
+            file object: UTF-8 text stream
+        """
+        path = Path(filename)
+
+        if path.suffix == GZIP_SUFFIX:
+            return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+
+        if path.suffix == ZSTD_SUFFIX:
+            zstandard = _import_zstandard()
+            if zstandard is None:
+                raise ImportError(f"The zstandard package is required to open {path}")
+            raw = open(path, mode + 'b')
+            if mode == 'w':
+                # threads=-1 compresses with one worker per logical CPU
+                compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+                stream = compressor.stream_writer(raw, closefd=True)
+            else:
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+            return io.TextIOWrapper(stream, encoding='utf-8')
+
+        return open(path, mode, encoding='utf-8')
+
+    @staticmethod
+    def index_path(filename):
+        """Get the sidecar index path for a saved data file."""
+        return Path(f"{filename}.idx")
+
+    @staticmethod
+    def _write_indexed_json(data, f):
+        """
+        Write data with the same layout as `json.dump(indent=2)` while
+        recording the byte range of every element.
+
+        Returns:
+            list: (type_code, id, start, end) tuples in file order
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("elements"), list):
+            raise ValueError("Indexed output requires a dict with an 'elements' list")
+
+        entries = []
+        offset = 0
+
+        def write(text):
+            nonlocal offset
+            chunk = text.encode("utf-8")
+            f.write(chunk)
+            offset += len(chunk)
+
+        def dumps(value, indent):
+            text = json.dumps(value, ensure_ascii=False, indent=2)
+            return text.replace("\n", "\n" + " " * indent)
+
+        write("{")
+        for position, (key, value) in enumerate(data.items()):
+            write("," if position else "")
+            write(f"\n  {json.dumps(key, ensure_ascii=False)}: ")
+            if key != "elements" or not value:
+                write(dumps(value, 2))
+                continue
+
+            write("[")
+            for element_position, element in enumerate(value):
+                write(",\n    " if element_position else "\n    ")
+                start = offset
+                write(dumps(element, 4))
+                type_code = OSM_TYPE_CODES.get(element.get("type"), len(OSM_TYPE_CODES))
+                entries.append((type_code, element.get("id", 0), start, offset))
+            write("\n  ]")
+        write("\n}")
+
+        return entries
+
+    @staticmethod
+    def _write_index(entries, index_path):
+        """Write the sidecar offset index for a list of element entries."""
+        by_key = sorted(range(len(entries)), key=lambda i: (entries[i][0], entries[i][1]))
+
+        with open(index_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(entries)))
+            for entry in entries:
+                f.write(INDEX_RECORD.pack(*entry))
+            for position in by_key:
+                f.write(INDEX_POSITION.pack(position))
+
+        return index_path
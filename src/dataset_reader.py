@@ -0,0 +1,294 @@
+import re
+import json
+import mmap
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from src.data_saver import (
+    DataSaver,
+    INDEX_HEADER,
+    INDEX_MAGIC,
+    INDEX_POSITION,
+    INDEX_RECORD,
+    MANIFEST_NAME,
+    OSM_TYPE_CODES,
+)
+from src.geometry import element_coordinates
+
+
+WHITESPACE = re.compile(r"\s*")
+DELIMITERS = frozenset(" \t\r\n,:]}")
+CHUNK_SIZE = 1 << 20
+
+
+def iter_elements(filename, chunk_size=CHUNK_SIZE):
+    """
+    Stream the elements of a saved data file without loading it whole.
+
+    Works on any file written by `DataSaver.save_json`, including compressed
+    ones, and keeps only the current chunk and element in memory.
+
+    Args:
+        filename (str): Saved data file
+        chunk_size (int): Number of characters read at a time
+
+    Yields:
+        dict: Elements in file order
+    """
+    with DataSaver.open_text(filename, 'r') as f:
+        yield from iter_json_elements(f, chunk_size)
+
+
+def iter_json_elements(stream, chunk_size=CHUNK_SIZE):
+    """Stream the items of the top-level "elements" array of a JSON text stream."""
+    parser = _StreamParser(stream, chunk_size)
+    parser.expect("{")
+    if parser.peek() == "}":
+        return
+
+    while True:
+        key = parser.value()
+        parser.expect(":")
+        if key == "elements":
+            parser.expect("[")
+            if parser.peek() == "]":
+                parser.expect("]")
+            else:
+                while True:
+                    yield parser.value()
+                    if parser.peek() == "]":
+                        parser.expect("]")
+                        break
+                    parser.expect(",")
+        else:
+            parser.value()
+
+        if parser.peek() == "}":
+            return
+        parser.expect(",")
+
+
+def load_manifest(directory):
+    """Load the manifest of a directory written by `DataSaver.save_partitioned`."""
+    with open(Path(directory) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def select_partitions(manifest, bbox=None):
+    """
+    List the partitions that may hold elements inside a bounding box.
+
+    Partitions are pruned by the extent of their elements; unlocated
+    elements are only included without a bbox.
+
+    Args:
+        manifest (dict): Manifest from `load_manifest`
+        bbox (tuple): Optional (south, west, north, east)
+
+    Returns:
+        list: Manifest partition entries
+    """
+    if bbox is None:
+        return list(manifest["partitions"])
+
+    south, west, north, east = bbox
+    return [
+        partition for partition in manifest["partitions"]
+        if partition["extent"] is not None
+        and partition["extent"][0] <= north and south <= partition["extent"][2]
+        and partition["extent"][1] <= east and west <= partition["extent"][3]
+    ]
+
+
+def read_partitions(directory, bbox=None, workers=4):
+    """
+    Read the elements of a partitioned dataset, in parallel.
+
+    Only partitions overlapping the bbox are opened, and elements outside
+    it are dropped.
+
+    Args:
+        directory (str): Directory written by `DataSaver.save_partitioned`
+        bbox (tuple): Optional (south, west, north, east)
+        workers (int): Partitions read concurrently
+
+    Yields:
+        dict: Elements, partition by partition in manifest order
+    """
+    directory = Path(directory)
+    partitions = select_partitions(load_manifest(directory), bbox)
+
+    def read(partition):
+        elements = DataSaver.load_json(directory / partition["path"]).get("elements", [])
+        if bbox is None:
+            return elements
+        south, west, north, east = bbox
+        inside = []
+        for element in elements:
+            coordinates = element_coordinates(element)
+            if coordinates and south <= coordinates[0] <= north and west <= coordinates[1] <= east:
+                inside.append(element)
+        return inside
+
+    # A bounded window of reads ahead keeps memory proportional to the workers
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for partition in partitions:
+            pending.append(executor.submit(read, partition))
+            if len(pending) > 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class _StreamParser:
+    """Minimal incremental JSON tokenizer over a text stream."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON stream")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number cut off by the end of the chunk (e.g. "0." of "0.6")
+                # decodes early, so require a delimiter after every value
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+class DatasetReader:
+    """
+    Random-access reader for files written by `DataSaver.save_json(..., index=True)`.
+
+    Both the data file and its sidecar index are memory-mapped, so opening a
+    reader is constant time and elements are only parsed when accessed.
+    """
+
+    def __init__(self, filename):
+        self.path = Path(filename)
+        index_path = DataSaver.index_path(self.path)
+        if not index_path.exists():
+            raise FileNotFoundError(
+                f"Index {index_path} not found. Save the data with DataSaver.save_json(..., index=True)."
+            )
+
+        self._data_file = open(self.path, "rb")
+        self._index_file = open(index_path, "rb")
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{index_path} is not a dataset index")
+        self._positions_offset = INDEX_HEADER.size + self._count * INDEX_RECORD.size
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._read(position)
+
+    def __getitem__(self, position):
+        """Get an element (or list of elements for a slice) by file position."""
+        if isinstance(position, slice):
+            return [self._read(i) for i in range(*position.indices(self._count))]
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("Element position out of range")
+        return self._read(position)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, osm_type, osm_id, default=None):
+        """
+        Look up a single element by OSM type and id.
+
+        Args:
+            osm_type (str): Element type ("node", "way" or "relation")
+            osm_id (int): OSM id of the element
+            default: Value returned when the element is not in the dataset
+
+        Returns:
+            dict: The parsed element, or `default` if not found
+        """
+        type_code = OSM_TYPE_CODES.get(osm_type, len(OSM_TYPE_CODES))
+        key = (type_code, osm_id)
+        position = bisect_left(_SortedKeys(self), key)
+        if position < self._count:
+            record_position = self._sorted_position(position)
+            if self._record(record_position)[:2] == key:
+                return self._read(record_position)
+        return default
+
+    def close(self):
+        """Release the memory maps and underlying files."""
+        self._data.close()
+        self._index.close()
+        self._data_file.close()
+        self._index_file.close()
+
+    def _record(self, position):
+        return INDEX_RECORD.unpack_from(self._index, INDEX_HEADER.size + position * INDEX_RECORD.size)
+
+    def _sorted_position(self, rank):
+        return INDEX_POSITION.unpack_from(self._index, self._positions_offset + rank * INDEX_POSITION.size)[0]
+
+    def _read(self, position):
+        _, _, start, end = self._record(position)
+        return json.loads(self._data[start:end])
+
+
+class _SortedKeys:
+    """Sequence view of index keys in (type, id) order, for bisect."""
+
+    def __init__(self, reader):
+        self._reader = reader
+
+    def __len__(self):
+        return self._reader._count
+
+    def __getitem__(self, rank):
+        return self._reader._record(self._reader._sorted_position(rank))[:2]
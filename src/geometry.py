@@ -0,0 +1,267 @@
+import math
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+def element_coordinates(element):
+    """
+    Get a representative (lat, lon) for an Overpass element.
+
+    Uses node coordinates, the `center` of `out center` output, or the middle
+    of the `bounds` of `out geom` output.
+
+    Returns:
+        tuple: (lat, lon), or None if the element has no location
+    """
+    if "lat" in element and "lon" in element:
+        return element["lat"], element["lon"]
+
+    center = element.get("center")
+    if center:
+        return center["lat"], center["lon"]
+
+    bounds = element.get("bounds")
+    if bounds:
+        return ((bounds["minlat"] + bounds["maxlat"]) / 2,
+                (bounds["minlon"] + bounds["maxlon"]) / 2)
+
+    return None
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def local_meters(lat, lon):
+    """
+    Project a point to approximate meters (equirectangular).
+
+    Distances are accurate for nearby points, which is what grid hashing
+    of neighbours needs.
+    """
+    return lon * METERS_PER_DEGREE * math.cos(math.radians(lat)), lat * METERS_PER_DEGREE
+
+
+def segment_distance_m(lat, lon, start, end):
+    """
+    Approximate distance in meters from a point to a segment.
+
+    The segment's (lat, lon) end points are projected to a plane centered
+    on the point, which is accurate for the short distances of buffers.
+    """
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(lat))
+    ax, ay = (start[1] - lon) * scale_x, (start[0] - lat) * METERS_PER_DEGREE
+    bx, by = (end[1] - lon) * scale_x, (end[0] - lat) * METERS_PER_DEGREE
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_sq))
+    return math.hypot(ax + t * dx, ay + t * dy)
+
+
+def lonlat_to_world(lon, lat):
+    """
+    Project a point to Web Mercator world coordinates in [0, 1].
+
+    x grows eastwards and y southwards, matching slippy map tile numbering.
+    """
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    sin_lat = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+def world_to_lonlat(x, y):
+    """Inverse of `lonlat_to_world`."""
+    lon = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lon, lat
+
+
+def sinusoidal_km(lat, lon):
+    """
+    Project a point to the sinusoidal equal-area projection, in kilometers.
+
+    Equal areas on the ground are equal areas in the plane, so square or
+    hexagonal cells of the plane can be used for densities.
+    """
+    radius_km = EARTH_RADIUS_M / 1000
+    return radius_km * math.radians(lon) * math.cos(math.radians(lat)), radius_km * math.radians(lat)
+
+
+def sinusoidal_to_latlon(x, y):
+    """Inverse of `sinusoidal_km`, returning (lat, lon)."""
+    radius_km = EARTH_RADIUS_M / 1000
+    lat = math.degrees(y / radius_km)
+    cos_lat = math.cos(math.radians(lat))
+    lon = math.degrees(x / (radius_km * cos_lat)) if cos_lat > 1e-12 else 0.0
+    return lat, lon
+
+
+def tile_for(lat, lon, zoom):
+    """Slippy map (x, y) tile containing a point at a zoom level."""
+    x, y = lonlat_to_world(lon, lat)
+    scale = 1 << zoom
+    return min(scale - 1, int(x * scale)), min(scale - 1, int(y * scale))
+
+
+def tile_bounds(zoom, x, y):
+    """(south, west, north, east) bounds of a slippy map tile."""
+    scale = 1 << zoom
+    west, north = world_to_lonlat(x / scale, y / scale)
+    east, south = world_to_lonlat((x + 1) / scale, (y + 1) / scale)
+    return south, west, north, east
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_cell(lat, lon, precision=5):
+    """
+    Integer (lon, lat) cell of the geohash of `precision` characters
+    containing a point; see `geohash_from_cell`.
+    """
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon_cell = min((1 << lon_bits) - 1, max(0, int((lon + 180.0) / 360.0 * (1 << lon_bits))))
+    lat_cell = min((1 << lat_bits) - 1, max(0, int((lat + 90.0) / 180.0 * (1 << lat_bits))))
+    return lon_cell, lat_cell
+
+
+def geohash_from_cell(lon_cell, lat_cell, precision=5):
+    """Interleave the bits of a geohash cell (longitude first), five per character."""
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    value = 0
+    for bit in range(bits):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((lon_cell >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_cell >> lat_bits) & 1)
+    return "".join(GEOHASH_ALPHABET[(value >> shift) & 31] for shift in range(bits - 5, -1, -5))
+
+
+def geohash_encode(lat, lon, precision=5):
+    """Encode a point as a geohash of `precision` characters."""
+    return geohash_from_cell(*geohash_cell(lat, lon, precision), precision)
+
+
+def geohash_bounds(geohash):
+    """(south, west, north, east) bounds of a geohash cell."""
+    south, west, north, east = -90.0, -180.0, 90.0, 180.0
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                middle = (west + east) / 2
+                west, east = (middle, east) if bit else (west, middle)
+            else:
+                middle = (south + north) / 2
+                south, north = (middle, north) if bit else (south, middle)
+            even = not even
+    return south, west, north, east
+
+
+def assemble_rings(ways):
+    """
+    Join way geometries that share end points into closed rings.
+
+    Multipolygon relations often split a ring over several ways; this
+    concatenates them end to end, reversing ways where needed.
+
+    Args:
+        ways (list): Coordinate lists, e.g. [(lon, lat), ...]
+
+    Returns:
+        list: Closed rings (first point repeated at the end); ways that
+            cannot be closed are dropped
+    """
+    rings = []
+    open_ways = []
+    for way in ways:
+        if len(way) < 2:
+            continue
+        if way[0] == way[-1]:
+            if len(way) >= 4:
+                rings.append(list(way))
+        else:
+            open_ways.append(list(way))
+
+    # Index open ways by their end points for linear-time joining
+    by_end = {}
+    for i, way in enumerate(open_ways):
+        by_end.setdefault(way[0], []).append(i)
+        by_end.setdefault(way[-1], []).append(i)
+    used = [False] * len(open_ways)
+
+    for start in range(len(open_ways)):
+        if used[start]:
+            continue
+        used[start] = True
+        ring = list(open_ways[start])
+        while ring[0] != ring[-1]:
+            candidates = [i for i in by_end.get(ring[-1], ()) if not used[i]]
+            if not candidates:
+                break
+            i = candidates[0]
+            used[i] = True
+            way = open_ways[i]
+            ring.extend(way[1:] if way[0] == ring[-1] else way[-2::-1])
+        if ring[0] == ring[-1] and len(ring) >= 4:
+            rings.append(ring)
+
+    return rings
+
+
+def point_in_ring(x, y, ring):
+    """Ray-casting test of a point against a closed ring of (x, y) points."""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def element_polygons(element):
+    """
+    Build polygons from the geometry of `out geom` output.
+
+    Closed ways become single polygons. Multipolygon and boundary relations
+    have their outer and inner member ways assembled into rings, and each
+    inner ring is attached to the outer ring containing it.
+
+    Returns:
+        list: Polygons as lists of (lon, lat) rings, exterior ring first
+    """
+    if element.get("type") == "way":
+        geometry = [(p["lon"], p["lat"]) for p in element.get("geometry") or [] if p]
+        rings = assemble_rings([geometry])
+        return [rings] if rings else []
+
+    outer_ways, inner_ways = [], []
+    for member in element.get("members", []):
+        if member.get("type") != "way" or not member.get("geometry"):
+            continue
+        geometry = [(p["lon"], p["lat"]) for p in member["geometry"] if p]
+        (inner_ways if member.get("role") == "inner" else outer_ways).append(geometry)
+
+    polygons = [[ring] for ring in assemble_rings(outer_ways)]
+    for ring in assemble_rings(inner_ways):
+        for polygon in polygons:
+            if point_in_ring(ring[0][0], ring[0][1], polygon[0]):
+                polygon.append(ring)
+                break
+    return polygons
@@ -0,0 +1,185 @@
+import json
+import heapq
+import time
+import threading
+from pathlib import Path
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+from src.osm_data_fetcher import DEFAULT_QUERY_TIMEOUT
+
+# Weight of the latest run in the moving average of durations
+HISTORY_SMOOTHING = 0.5
+# Predicted duration of a job with no history at all, in seconds
+DEFAULT_DURATION = 60.0
+
+
+class JobHistory:
+    """JSON-file record of fetch durations and element counts per (country, type)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._jobs = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._jobs = {}
+
+    @staticmethod
+    def _key(country_name, location_type):
+        return f"{country_name.lower()}|{location_type}"
+
+    def get(self, country_name, location_type):
+        """Get the recorded statistics of a job, or None."""
+        with self._lock:
+            return self._jobs.get(self._key(country_name, location_type))
+
+    def record(self, country_name, location_type, duration, element_count):
+        """Record a successful run, smoothing the duration over earlier runs."""
+        key = self._key(country_name, location_type)
+        with self._lock:
+            entry = self._jobs.get(key)
+            if entry:
+                duration = HISTORY_SMOOTHING * duration + (1 - HISTORY_SMOOTHING) * entry["duration"]
+            self._jobs[key] = {
+                "duration": duration,
+                "elements": element_count,
+                "runs": (entry or {}).get("runs", 0) + 1,
+            }
+
+    def predict_duration(self, country_name, location_type):
+        """
+        Predict the duration of a job in seconds.
+
+        Jobs without history are estimated from the median duration of the
+        same location type in other countries, then of all jobs.
+        """
+        entry = self.get(country_name, location_type)
+        if entry:
+            return entry["duration"]
+
+        with self._lock:
+            same_type = [e["duration"] for k, e in self._jobs.items() if k.endswith(f"|{location_type}")]
+            every_job = [e["duration"] for e in self._jobs.values()]
+        if same_type:
+            return median(same_type)
+        if every_job:
+            return median(every_job)
+        return DEFAULT_DURATION
+
+    def save(self):
+        """Persist the history."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._jobs, f, ensure_ascii=False, indent=2)
+
+
+def predicted_makespan(durations, workers):
+    """Simulate running durations in the given order on a pool of workers."""
+    loads = [0.0] * max(1, workers)
+    for duration in durations:
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+class BatchScheduler:
+    """
+    Run a batch of (country, location type) fetches ordered by expected cost.
+
+    Jobs are started longest-first (LPT scheduling) so long fetches such as
+    restaurants in large countries do not become the tail of the batch.
+    Predictions and Overpass timeouts come from the recorded history, which
+    is updated after every successful job.
+    """
+
+    def __init__(self, fetcher, history=None, workers=4, timeout_factor=3,
+                 min_timeout=DEFAULT_QUERY_TIMEOUT, max_timeout=3600):
+        self.fetcher = fetcher
+        self.history = history or JobHistory(Path(fetcher.cache_path) / "job_history.json")
+        self.workers = workers
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+    def timeout_for(self, country_name, location_type):
+        """Overpass timeout for a job: a multiple of its historical duration."""
+        entry = self.history.get(country_name, location_type)
+        if not entry:
+            return self.min_timeout
+        timeout = int(entry["duration"] * self.timeout_factor)
+        return max(self.min_timeout, min(self.max_timeout, timeout))
+
+    def plan(self, jobs):
+        """
+        Order jobs longest-first.
+
+        Args:
+            jobs (list): (country_name, location_type) tuples
+
+        Returns:
+            list: Job dicts with "country", "type", "predicted" duration and
+                "timeout", in execution order
+        """
+        planned = [
+            {
+                "country": country_name,
+                "type": location_type,
+                "predicted": self.history.predict_duration(country_name, location_type),
+                "timeout": self.timeout_for(country_name, location_type),
+            }
+            for country_name, location_type in jobs
+        ]
+        planned.sort(key=lambda job: job["predicted"], reverse=True)
+        return planned
+
+    def run(self, jobs, on_result=None):
+        """
+        Run a batch of fetches on the worker pool.
+
+        Args:
+            jobs (list): (country_name, location_type) tuples
+            on_result (callable): Called as on_result(country_name,
+                location_type, data) for every successful fetch
+
+        Returns:
+            dict: Report with "predicted_makespan", "actual_makespan" and
+                per-job "jobs" results. A job whose fetch or `on_result`
+                raised is reported as failed with its "error"; the history
+                of the other jobs is still saved.
+        """
+        planned = self.plan(jobs)
+        predicted = predicted_makespan([job["predicted"] for job in planned], self.workers)
+        batch_start = time.perf_counter()
+
+        def run_job(job):
+            start = time.perf_counter()
+            job["ok"] = False
+            try:
+                data, _ = self.fetcher.fetch_data(job["country"], job["type"], timeout=job["timeout"])
+                job["actual"] = time.perf_counter() - start
+                if data is not None:
+                    job["elements"] = len(data.get("elements", []))
+                    self.history.record(job["country"], job["type"], job["actual"], job["elements"])
+                    if on_result:
+                        on_result(job["country"], job["type"], data)
+                    job["ok"] = True
+            except Exception as e:
+                job.setdefault("actual", time.perf_counter() - start)
+                job["error"] = f"{type(e).__name__}: {e}"
+                print(f"Job {job['country']} / {job['type']} failed: {job['error']}")
+            return job
+
+        # The executor starts jobs in submission order, so each free worker
+        # takes the longest remaining job
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(run_job, planned))
+        finally:
+            self.history.save()
+        actual = time.perf_counter() - batch_start
+
+        failed = sum(1 for job in results if not job["ok"])
+        print(f"Batch of {len(results)} jobs finished ({failed} failed): "
+              f"predicted makespan {predicted:.1f}s, actual {actual:.1f}s")
+        return {"predicted_makespan": predicted, "actual_makespan": actual, "jobs": results}
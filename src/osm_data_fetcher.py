@@ -1,7 +1,28 @@
+import io
 import time
-import json
 import requests
+from functools import reduce
 from pathlib import Path
+from src.bbox_batch import (PolylineIndex, bbox_union, corridor_bboxes, map_to_bboxes,
+                            merge_bboxes, pack_bboxes)
+from src.conflation import DEDUP_SETTINGS, deduplicate_elements
+from src.config_cache import load_config, validate_country_codes, validate_location_types
+from src.geometry import element_coordinates
+from src.regions import AreaIdCache, Region
+from src.single_flight import SingleFlight
+from src.tag_filter import CompiledTagGroup, TagMatcher
+
+# Shared by all fetchers in the process so identical concurrent queries
+# issue a single Overpass request
+DEFAULT_SINGLE_FLIGHT = SingleFlight()
+
+# Overpass server-side timeout in seconds; the HTTP timeout allows extra time
+# for the response to arrive
+DEFAULT_QUERY_TIMEOUT = 300
+HTTP_TIMEOUT_MARGIN = 60
+
+# Longest query sent by the multi-bbox fetches; longer ones are split
+MAX_QUERY_LENGTH = 50000
 
 
 class OSMDataFetcher:
@@ -9,26 +30,66 @@ class OSMDataFetcher:
     Class to fetch structure data from OpenStreetMap using Overpass API.
     Supports different location types defined in configuration files.
     """
-    def __init__(self, config_path="config"):
+    def __init__(self, config_path="config", single_flight=None, cache_path=None, session=None):
         self.overpass_url = "https://overpass-api.de/api/interpreter"
         self.config_path = Path(config_path)
+        self.cache_path = Path(cache_path) if cache_path else self.config_path.parent / "cache"
+        self.single_flight = single_flight or DEFAULT_SINGLE_FLIGHT
+        self.session = session  # Optional requests.Session for connection reuse
+        self.area_ids = AreaIdCache(self.cache_path / "area_ids.json")
+        self._config_mtimes = self._get_config_mtimes()
+        self._tag_matchers = {}
         self.country_codes = self._load_country_codes()
         self.location_types = self._load_location_types()
 
+    def _get_config_mtimes(self):
+        """Get modification times of the configuration files."""
+        mtimes = []
+        for name in ("country_codes.json", "location_types.json"):
+            try:
+                mtimes.append((self.config_path / name).stat().st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def reload_config_if_changed(self):
+        """
+        Reload the configuration files if they changed since they were loaded.
+
+        Invalid files are reported and the previous configuration is kept.
+
+        Returns:
+            bool: True if the configuration was reloaded
+        """
+        mtimes = self._get_config_mtimes()
+        if mtimes == self._config_mtimes:
+            return False
+
+        self._config_mtimes = mtimes
+        try:
+            country_codes = self._load_country_codes()
+            location_types = self._load_location_types()
+        except ValueError as e:
+            print(f"Error: invalid configuration in {self.config_path}, keeping the previous one: {e}")
+            return False
+        self._tag_matchers = {}
+        self.country_codes = country_codes
+        self.location_types = location_types
+        print(f"Reloaded configuration from {self.config_path}")
+        return True
+
     def _load_country_codes(self):
-        """Load country codes from JSON file."""
+        """Load country codes from JSON file (through the config cache)."""
         try:
-            with open(self.config_path / "country_codes.json", "r") as f:
-                return json.load(f)
+            return load_config(self.config_path / "country_codes.json", validate_country_codes)
         except FileNotFoundError:
             print("Country codes file not found. Using empty dictionary.")
             return {}
 
     def _load_location_types(self):
-        """Load location types from JSON file."""
+        """Load location types from JSON file (through the config cache)."""
         try:
-            with open(self.config_path / "location_types.json", "r") as f:
-                return json.load(f)
+            return load_config(self.config_path / "location_types.json", validate_location_types)
         except FileNotFoundError:
             print("Location types file not found. Using default types.")
             return {}
@@ -49,40 +110,103 @@ class OSMDataFetcher:
 
     def build_tag_query(self, tag_group):
         """Build a query fragment for a group of tags."""
-        query_parts = []
-        
-        for condition in tag_group["conditions"]:
-            key = condition["key"]
-            value = condition["value"]
-            query_parts.append(f'["{key}"="{value}"]')
-            
-        return "".join(query_parts)
+        return CompiledTagGroup(tag_group).overpass
+
+    def get_tag_matcher(self, location_type):
+        """
+        Get the compiled tag matcher for a location type.
+
+        Matchers are compiled once per configuration load and provide both the
+        Overpass filters used by `build_query` and a local matcher for
+        filtering already fetched elements.
+
+        Returns:
+            TagMatcher: Compiled matcher, or None if the type is unknown
+        """
+        matcher = self._tag_matchers.get(location_type)
+        if matcher is None:
+            config = self.get_location_type_config(location_type)
+            if not config:
+                return None
+            matcher = TagMatcher(config)
+            self._tag_matchers[location_type] = matcher
+        return matcher
+
+    def filter_elements(self, data, location_type):
+        """
+        Filter fetched or saved data locally with a location type's conditions.
 
-    def build_query(self, country_code, location_type):
-        """Build an Overpass query for the specified country and location type."""
+        Args:
+            data (dict): Overpass response or saved data
+            location_type (str): Location type whose conditions to apply
+
+        Returns:
+            dict: Copy of the data containing only matching elements, or None
+                if the location type is unknown
+        """
+        matcher = self.get_tag_matcher(location_type)
+        if matcher is None:
+            return None
+        return {**data, "elements": matcher.filter(data.get("elements", []))}
+
+    def deduplicate(self, data, location_type):
+        """
+        Merge elements that represent the same feature, e.g. a church mapped
+        both as a node and as a building way.
+
+        Thresholds come from the location type's optional "dedup" settings
+        ("distance_m", "name_similarity", "merge_unnamed").
+
+        Args:
+            data (dict): Overpass response or saved data
+            location_type (str): Location type whose settings to use
+
+        Returns:
+            tuple: (copy of the data with duplicates merged, number merged)
+        """
+        config = self.get_location_type_config(location_type) or {}
+        settings = config.get("dedup", {})
+        elements, merged_count = deduplicate_elements(
+            data.get("elements", []), **{key: settings[key] for key in DEDUP_SETTINGS if key in settings})
+        print(f"Merged {merged_count} duplicate {location_type} elements")
+        return {**data, "elements": elements}, merged_count
+
+    def build_query(self, target, location_type, timeout=DEFAULT_QUERY_TIMEOUT):
+        """
+        Build an Overpass query for the specified region and location type.
+
+        Args:
+            target (str or Region): ISO country code or Region to search within
+            location_type (str): Type of location to search for
+            timeout (int): Overpass server-side timeout in seconds
+
+        Returns:
+            str: Overpass query, or None if the location type is unknown
+        """
         # Get configuration for the location type
         config = self.get_location_type_config(location_type)
         if not config:
             return None
+
+        region = target if isinstance(target, Region) else Region.country(target)
             
         # Determine output type (center for points, geom for areas)
         output_type = config.get("query_type", "center")
         
         # Start building query
         query = f"""
-        [out:json][timeout:300];
-        // Query using ISO country code
-        area["ISO3166-1"="{country_code}"]->.searchArea;
+        [out:json][timeout:{timeout}];"""
+        query += self.build_area_statement(region)
+        query += """
         // Find locations by type
         ("""
+
+        search_filter = "(area.searchArea)"
+        if region.kind == "bbox":
+            search_filter = "({},{},{},{})".format(*region.value)
         
         # Add each tag group as a query section
-        for tag_group in config["tags"]:
-            tag_query = self.build_tag_query(tag_group)
-            query += f"""
-          node{tag_query}(area.searchArea);
-          way{tag_query}(area.searchArea);
-          relation{tag_query}(area.searchArea);"""
+        query += self._union_clauses(location_type, search_filter)
             
         # Complete the query
         query += f"""
@@ -93,15 +217,95 @@ class OSMDataFetcher:
         
         return query
 
-    def fetch_data(self, country_name, location_type, max_retries=3, initial_delay=10):
+    def _union_clauses(self, location_type, search_filter):
+        """Node, way and relation statements of every tag group within a filter."""
+        clauses = ""
+        for tag_group in self.get_tag_matcher(location_type).groups:
+            tag_query = tag_group.overpass
+            clauses += f"""
+          node{tag_query}{search_filter};
+          way{tag_query}{search_filter};
+          relation{tag_query}{search_filter};"""
+        return clauses
+
+    @staticmethod
+    def _bbox_filter(bbox):
+        """Overpass (south,west,north,east) filter, rounded to about a centimeter."""
+        return "({},{},{},{})".format(*(round(c, 7) for c in bbox))
+
+    def build_bbox_query(self, bboxes, location_type, timeout=DEFAULT_QUERY_TIMEOUT):
+        """
+        Build one Overpass query for a location type in several bounding boxes.
+
+        Args:
+            bboxes (list): (south, west, north, east) tuples
+            location_type (str): Type of location to search for
+            timeout (int): Overpass server-side timeout in seconds
+
+        Returns:
+            str: Overpass query, or None if the location type is unknown
+        """
+        config = self.get_location_type_config(location_type)
+        if not config:
+            return None
+        output_type = config.get("query_type", "center")
+
+        # Bounds instead of centers, so results can be mapped to the boxes
+        # they reach; the center is the middle of the bounds either way
+        if output_type == "center":
+            output_type = "bb"
+
+        query = f"""
+        [out:json][timeout:{timeout}];
+        // Query using {len(bboxes)} bounding boxes
+        ("""
+        for bbox in bboxes:
+            query += self._union_clauses(location_type, self._bbox_filter(bbox))
+        query += f"""
+        );
+        // Output format
+        out {output_type} body;
+        """
+        return query
+
+    def build_area_statement(self, region):
+        """
+        Build the statement defining `.searchArea` for a region.
+
+        Regions with a known or cached area id are selected directly with
+        `area(id:...)`. Otherwise the area is selected by tags and its id is
+        output alongside the results so `fetch_region` can cache it.
+        """
+        if region.kind == "bbox":
+            return """
+        // Query using bounding box"""
+
+        area_id = region.known_area_id() or self.area_ids.get(region)
+        if area_id:
+            return f"""
+        // Query using resolved area id for {region.key}
+        area(id:{area_id})->.searchArea;"""
+
+        comment = "ISO country code" if region.kind == "country" else region.key
+        return f"""
+        // Query using {comment}
+        area{region.area_filter()}->.searchArea;
+        .searchArea out ids;"""
+
+    def fetch_data(self, country_name, location_type, max_retries=3, initial_delay=10,
+                   timeout=DEFAULT_QUERY_TIMEOUT):
         """
         Fetch data from Overpass API with retry logic.
+
+        Concurrent calls that build the same query share one request and its
+        result (see `SingleFlight`); callers must not mutate the returned data.
         
         Args:
             country_name (str): Name of the country
             location_type (str): Type of location to search for
             max_retries (int): Maximum number of retry attempts
             initial_delay (int): Initial delay between retries in seconds
+            timeout (int): Overpass query timeout in seconds
             
         Returns:
             tuple: (JSON response or None if failed, country_code)
@@ -113,30 +317,278 @@ class OSMDataFetcher:
             return None, None
             
         # Build query based on location type
-        query = self.build_query(country_code, location_type)
+        query = self.build_query(country_code, location_type, timeout)
         if not query:
             print(f"Error: Could not build query for location type '{location_type}'")
             return None, country_code
             
         print(f"Fetching {location_type} data from {country_name} ({country_code})...")
-        
+
+        data = self._run_query(query, Region.country(country_code), location_type,
+                               max_retries, initial_delay, timeout)
+        return data, country_code
+
+    def fetch_region(self, region, location_type, max_retries=3, initial_delay=10,
+                     timeout=DEFAULT_QUERY_TIMEOUT):
+        """
+        Fetch data for a region from Overpass API with retry logic.
+
+        Args:
+            region (Region): Region to search within
+            location_type (str): Type of location to search for
+            max_retries (int): Maximum number of retry attempts
+            initial_delay (int): Initial delay between retries in seconds
+            timeout (int): Overpass query timeout in seconds
+
+        Returns:
+            dict: JSON response or None if failed
+        """
+        query = self.build_query(region, location_type, timeout)
+        if not query:
+            print(f"Error: Could not build query for location type '{location_type}'")
+            return None
+
+        print(f"Fetching {location_type} data from {region.key}...")
+
+        return self._run_query(query, region, location_type, max_retries, initial_delay, timeout)
+
+    def fetch_bboxes(self, bboxes, location_type, max_retries=3, initial_delay=10,
+                     timeout=DEFAULT_QUERY_TIMEOUT, max_query_length=MAX_QUERY_LENGTH):
+        """
+        Fetch a location type in many bounding boxes with few requests.
+
+        Overlapping boxes are merged where that does not enlarge the searched
+        area, and the merged boxes are packed into as few queries as the
+        query length limit allows. Results are mapped back to the input boxes.
+
+        Args:
+            bboxes (list): (south, west, north, east) tuples
+            location_type (str): Type of location to search for
+            max_retries (int): Maximum number of retry attempts per query
+            initial_delay (int): Initial delay between retries in seconds
+            timeout (int): Overpass query timeout in seconds
+            max_query_length (int): Maximum length of one query in characters
+
+        Returns:
+            list: {"bbox": ..., "elements": [...]} per input box in input
+                order, or None if a query failed
+        """
+        elements = self._fetch_bbox_elements(merge_bboxes(bboxes), location_type, max_retries,
+                                             initial_delay, timeout, max_query_length)
+        if elements is None:
+            return None
+        return [{"bbox": tuple(bbox), "elements": box_elements}
+                for bbox, box_elements in zip(bboxes, map_to_bboxes(elements, bboxes))]
+
+    def fetch_corridor(self, polyline, buffer_m, location_type, max_retries=3, initial_delay=10,
+                       timeout=DEFAULT_QUERY_TIMEOUT, max_query_length=MAX_QUERY_LENGTH):
+        """
+        Fetch a location type within a distance of a route.
+
+        The buffered route is covered with bounding boxes fetched as by
+        `fetch_bboxes`, then results farther than `buffer_m` from the route
+        are dropped.
+
+        Args:
+            polyline (list): Route as (lat, lon) points
+            buffer_m (float): Maximum distance from the route in meters
+            location_type (str): Type of location to search for
+
+        Returns:
+            dict: {"elements": [...]} within the buffer, or None if failed
+        """
+        boxes = merge_bboxes(corridor_bboxes(polyline, buffer_m))
+        elements = self._fetch_bbox_elements(boxes, location_type, max_retries,
+                                             initial_delay, timeout, max_query_length)
+        if elements is None:
+            return None
+
+        route = PolylineIndex(polyline, buffer_m)
+        within = []
+        for element in elements:
+            coordinates = element_coordinates(element)
+            if coordinates and route.distance_m(*coordinates) is not None:
+                within.append(element)
+        print(f"Kept {len(within)} {location_type} locations within {buffer_m} m of the route")
+        return {"elements": within}
+
+    def _fetch_bbox_elements(self, bboxes, location_type, max_retries, initial_delay, timeout,
+                             max_query_length):
+        """Fetch boxes in length-limited batches and combine the unique elements."""
+        base_query = self.build_bbox_query([], location_type, timeout)
+        if not base_query:
+            print(f"Error: Could not build query for location type '{location_type}'")
+            return None
+
+        batches = pack_bboxes(
+            bboxes,
+            lambda bbox: len(self._union_clauses(location_type, self._bbox_filter(bbox))),
+            max_query_length - len(base_query),
+        )
+
+        elements = {}
+        for number, batch in enumerate(batches, 1):
+            print(f"Fetching {location_type} data in {len(batch)} bounding boxes "
+                  f"(query {number}/{len(batches)})...")
+            query = self.build_bbox_query(batch, location_type, timeout)
+            union = reduce(bbox_union, batch)
+            data = self._run_query(query, Region.bbox(*union), location_type,
+                                   max_retries, initial_delay, timeout)
+            if data is None:
+                return None
+            for element in data.get("elements", []):
+                key = (element.get("type"), element.get("id"))
+                if key in elements:
+                    continue
+                if "bounds" in element and "lat" not in element and "center" not in element:
+                    # The response may be shared with concurrent callers, so add the center to a copy
+                    lat, lon = element_coordinates(element)
+                    element = {**element, "center": {"lat": lat, "lon": lon}}
+                elements[key] = element
+        return list(elements.values())
+
+    def fetch_admin_boundaries(self, country_code, admin_level, max_retries=3, initial_delay=10,
+                               timeout=DEFAULT_QUERY_TIMEOUT):
+        """
+        Fetch the administrative boundary relations of one level in a country.
+
+        Args:
+            country_code (str): ISO 3166-1 country code
+            admin_level (int): OSM admin_level, e.g. 4 for states or provinces
+            max_retries (int): Maximum number of retry attempts
+            initial_delay (int): Initial delay between retries in seconds
+            timeout (int): Overpass query timeout in seconds
+
+        Returns:
+            dict: JSON response with relation geometries, or None if failed
+        """
+        region = Region.country(country_code)
+        query = f"""
+        [out:json][timeout:{timeout}];"""
+        query += self.build_area_statement(region)
+        query += f"""
+        // Find boundaries of the admin level
+        relation["boundary"="administrative"]["admin_level"="{admin_level}"](area.searchArea);
+        out geom;
+        """
+
+        print(f"Fetching admin level {admin_level} boundaries of {country_code}...")
+
+        return self._run_query(query, region, f"admin level {admin_level} boundary",
+                               max_retries, initial_delay, timeout)
+
+    def _run_query(self, query, region, location_type, max_retries, initial_delay, timeout):
+        """Run a query once for all concurrent callers and cache its area id."""
+        def fetch():
+            data = self._post_query(query, max_retries, initial_delay, timeout)
+            if data is not None:
+                self._cache_area_id(region, data)
+                element_count = len(data.get('elements', []))
+                print(f"Found {element_count} {location_type} locations")
+            return data
+
+        return self.single_flight.do(query, fetch)
+
+    def stream_data(self, country_name, location_type, max_retries=3, initial_delay=10,
+                    timeout=DEFAULT_QUERY_TIMEOUT):
+        """
+        Fetch data for a country as a stream of elements.
+
+        Elements are parsed from the HTTP response as it arrives, so memory
+        does not grow with the result size. Unlike `fetch_data`, the request
+        is not shared with concurrent callers, and only errors before the
+        response starts are retried.
+
+        Args:
+            country_name (str): Name of the country
+            location_type (str): Type of location to search for
+            max_retries (int): Maximum number of retry attempts
+            initial_delay (int): Initial delay between retries in seconds
+            timeout (int): Overpass query timeout in seconds
+
+        Returns:
+            iterator: Elements, or None if the request failed
+        """
+        country_code = self.get_country_code(country_name)
+        if not country_code:
+            print(f"Error: Could not find ISO code for country '{country_name}'")
+            return None
+        return self.stream_region(Region.country(country_code), location_type, max_retries,
+                                  initial_delay, timeout)
+
+    def stream_region(self, region, location_type, max_retries=3, initial_delay=10,
+                      timeout=DEFAULT_QUERY_TIMEOUT):
+        """
+        Fetch data for a region as a stream of elements (see `stream_data`).
+
+        Returns:
+            iterator: Elements, or None if the request failed
+        """
+        query = self.build_query(region, location_type, timeout)
+        if not query:
+            print(f"Error: Could not build query for location type '{location_type}'")
+            return None
+
+        print(f"Streaming {location_type} data from {region.key}...")
+        response = self._post_query(query, max_retries, initial_delay, timeout, stream=True)
+        if response is None:
+            return None
+        return self._iter_response_elements(response, region)
+
+    def _iter_response_elements(self, response, region):
+        """Parse elements from a streamed response, caching the region's area id."""
+        # Imported here so the CLI can start without the JSON stream reader
+        from src.dataset_reader import iter_json_elements
+
+        response.raw.decode_content = True
+        area_ids = []
+        try:
+            with io.TextIOWrapper(response.raw, encoding="utf-8") as stream:
+                for element in iter_json_elements(stream):
+                    if element.get("type") == "area":
+                        area_ids.append(element["id"])
+                    else:
+                        yield element
+        finally:
+            response.close()
+        # Ambiguous tag matches are left unresolved rather than guessed
+        if len(area_ids) == 1:
+            self.area_ids.set(region, area_ids[0])
+
+    def _cache_area_id(self, region, data):
+        """Remove area elements from a response and cache the region's area id."""
+        elements = data.get("elements", [])
+        area_ids = [e["id"] for e in elements if e.get("type") == "area"]
+        if not area_ids:
+            return
+
+        data["elements"] = [e for e in elements if e.get("type") != "area"]
+        # Ambiguous tag matches are left unresolved rather than guessed
+        if len(area_ids) == 1:
+            self.area_ids.set(region, area_ids[0])
+
+    def _post_query(self, query, max_retries=3, initial_delay=10, timeout=DEFAULT_QUERY_TIMEOUT,
+                    stream=False):
+        """
+        Post a query to the Overpass API, retrying with exponential backoff.
+
+        Returns the parsed JSON, or with `stream=True` the open response
+        whose body has not been read yet; None if every attempt failed.
+        """
         retry_delay = initial_delay
         
         for attempt in range(max_retries):
             try:
                 print(f"Attempt {attempt+1}/{max_retries}")
-                response = requests.post(
+                response = (self.session or requests).post(
                     self.overpass_url, 
                     data={"data": query}, 
-                    timeout=360
+                    timeout=timeout + HTTP_TIMEOUT_MARGIN,
+                    stream=stream
                 )
                 response.raise_for_status()
                 
-                data = response.json()
-                element_count = len(data.get('elements', []))
-                print(f"Found {element_count} {location_type} locations")
-                
-                return data, country_code
+                return response if stream else response.json()
             except requests.exceptions.RequestException as e:
                 print(f"Error during API request: {e}")
             
@@ -145,4 +597,4 @@ class OSMDataFetcher:
                 time.sleep(retry_delay)
                 retry_delay *= 2  # Exponential backoff
         
-        return None, country_code
\ No newline at end of file
+        return None
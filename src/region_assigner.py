@@ -0,0 +1,288 @@
+import math
+from bisect import bisect_left
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from src.data_saver import DataSaver
+from src.geometry import element_coordinates, element_polygons, point_in_ring
+
+# Target number of polygon edges per prepared grid cell
+EDGES_PER_CELL = 4
+MAX_GRID_SIZE = 256
+
+
+def _segments_cross(ax, ay, bx, by, cx, cy, dx, dy):
+    """Check whether segments AB and CD properly intersect."""
+    d1 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+    d2 = (dx - cx) * (by - cy) - (dy - cy) * (bx - cx)
+    if (d1 > 0) == (d2 > 0):
+        return False
+    d3 = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    d4 = (bx - ax) * (dy - ay) - (by - ay) * (dx - ax)
+    return (d3 > 0) != (d4 > 0)
+
+
+def _on_segment(px, py, x1, y1, x2, y2):
+    """Check whether a point lies exactly on segment (x1, y1)-(x2, y2)."""
+    return ((x2 - x1) * (py - y1) == (y2 - y1) * (px - x1)
+            and min(x1, x2) <= px <= max(x1, x2) and min(y1, y2) <= py <= max(y1, y2))
+
+
+# Offsets (in cell sizes) tried in turn to move a cell's reference point off the boundary
+REFERENCE_NUDGES = [(0.1, 0.0731), (-0.0913, 0.1187), (0.1571, -0.1319), (-0.2029, -0.1753), (0.3137, 0.2411)]
+
+
+class PreparedPolygon:
+    """
+    Polygon preprocessed for fast point-in-polygon tests.
+
+    The bounding box is divided into a grid. Each cell stores whether its
+    center is inside the polygon and the edges passing through it. Points in
+    cells without edges are answered from the cell alone. Otherwise only the
+    cell's edges are tested: each edge crossed on the way from the cell
+    center to the point flips the inside state. A center lying exactly on
+    an edge or vertex has no well-defined state, so such cells use a nearby
+    reference point off the boundary instead.
+
+    Rings use the even-odd rule, so the exterior and hole rings of all parts
+    of a multipolygon can be given together.
+    """
+
+    def __init__(self, rings):
+        edges = []
+        for ring in rings:
+            edges.extend((x1, y1, x2, y2) for (x1, y1), (x2, y2) in zip(ring, ring[1:]) if (x1, y1) != (x2, y2))
+        self.rings = rings
+        self.edges = edges
+
+        xs = [x for ring in rings for x, _ in ring]
+        ys = [y for ring in rings for _, y in ring]
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        min_x, min_y, max_x, max_y = self.bounds
+
+        self.size = max(1, min(MAX_GRID_SIZE, int(math.sqrt(len(edges) / EDGES_PER_CELL))))
+        self.cell_width = (max_x - min_x) / self.size or 1e-12
+        self.cell_height = (max_y - min_y) / self.size or 1e-12
+
+        # Edges overlapping each cell (by edge bounding box, conservatively)
+        self.cell_edges = [[[] for _ in range(self.size)] for _ in range(self.size)]
+        for edge in edges:
+            x1, y1, x2, y2 = edge
+            column_range = range(self._column(min(x1, x2)), self._column(max(x1, x2)) + 1)
+            for row in range(self._row(min(y1, y2)), self._row(max(y1, y2)) + 1):
+                cells = self.cell_edges[row]
+                for column in column_range:
+                    cells[column].append(edge)
+
+        # Inside state of every cell center, from one horizontal scanline per row
+        self.cell_inside = []
+        for row in range(self.size):
+            y = min_y + (row + 0.5) * self.cell_height
+            crossings = sorted(
+                x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+                for x1, y1, x2, y2 in {e for cell in self.cell_edges[row] for e in cell}
+                if (y1 > y) != (y2 > y)
+            )
+            self.cell_inside.append([
+                bisect_left(crossings, min_x + (column + 0.5) * self.cell_width) % 2 == 1
+                for column in range(self.size)
+            ])
+
+        # Reference points of cells whose center lies on the boundary
+        self.cell_reference = {}
+        for row in range(self.size):
+            for column in range(self.size):
+                edges = self.cell_edges[row][column]
+                center_x = min_x + (column + 0.5) * self.cell_width
+                center_y = min_y + (row + 0.5) * self.cell_height
+                if not any(_on_segment(center_x, center_y, *edge) for edge in edges):
+                    continue
+                for dx, dy in REFERENCE_NUDGES:
+                    x, y = center_x + dx * self.cell_width, center_y + dy * self.cell_height
+                    if not any(_on_segment(x, y, *edge) for edge in edges):
+                        self.cell_reference[row, column] = (x, y)
+                        self.cell_inside[row][column] = self.contains_exact(x, y)
+                        break
+
+    def _column(self, x):
+        return min(self.size - 1, max(0, int((x - self.bounds[0]) / self.cell_width)))
+
+    def _row(self, y):
+        return min(self.size - 1, max(0, int((y - self.bounds[1]) / self.cell_height)))
+
+    def contains(self, x, y):
+        """Check whether a point lies inside the polygon."""
+        min_x, min_y, max_x, max_y = self.bounds
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+
+        column, row = self._column(x), self._row(y)
+        inside = self.cell_inside[row][column]
+        edges = self.cell_edges[row][column]
+        if not edges:
+            return inside
+
+        reference = self.cell_reference.get((row, column))
+        if reference:
+            center_x, center_y = reference
+        else:
+            center_x = min_x + (column + 0.5) * self.cell_width
+            center_y = min_y + (row + 0.5) * self.cell_height
+        for x1, y1, x2, y2 in edges:
+            if _segments_cross(center_x, center_y, x, y, x1, y1, x2, y2):
+                inside = not inside
+        return inside
+
+    def contains_exact(self, x, y):
+        """Reference even-odd test against every ring, without the grid."""
+        return sum(point_in_ring(x, y, ring) for ring in self.rings) % 2 == 1
+
+
+class RegionIndex:
+    """
+    Spatial index of prepared region polygons.
+
+    A coarse grid maps each cell to the regions whose bounding boxes overlap
+    it, so a lookup only tests the few candidate polygons near the point.
+    """
+
+    def __init__(self, regions, grid_size=None):
+        """
+        Args:
+            regions (list): (info, rings) pairs, where info is the dict stored
+                on matching elements and rings are closed (lon, lat) rings
+            grid_size (int): Index grid cells per side (derived from the
+                number of regions if None)
+        """
+        self.regions = [(info, PreparedPolygon(rings)) for info, rings in regions if rings]
+        if not self.regions:
+            self.bounds = None
+            return
+
+        boxes = [polygon.bounds for _, polygon in self.regions]
+        self.bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                       max(b[2] for b in boxes), max(b[3] for b in boxes))
+        self.size = grid_size or max(1, min(MAX_GRID_SIZE, int(math.sqrt(len(self.regions)) * 2)))
+        self.cell_width = (self.bounds[2] - self.bounds[0]) / self.size or 1e-12
+        self.cell_height = (self.bounds[3] - self.bounds[1]) / self.size or 1e-12
+
+        self.cells = {}
+        for index, (min_x, min_y, max_x, max_y) in enumerate(boxes):
+            for row in range(self._row(min_y), self._row(max_y) + 1):
+                for column in range(self._column(min_x), self._column(max_x) + 1):
+                    self.cells.setdefault((row, column), []).append(index)
+
+    @classmethod
+    def from_overpass(cls, data):
+        """
+        Build an index from boundary relations fetched with `out geom`.
+
+        Region info holds the relation id, name and ISO 3166-2 code.
+        """
+        regions = []
+        for element in data.get("elements", []):
+            tags = element.get("tags", {})
+            info = {"id": element.get("id"), "name": tags.get("name")}
+            if "ISO3166-2" in tags:
+                info["ISO3166-2"] = tags["ISO3166-2"]
+            rings = [ring for polygon in element_polygons(element) for ring in polygon]
+            regions.append((info, rings))
+        return cls(regions)
+
+    def _column(self, x):
+        return min(self.size - 1, max(0, int((x - self.bounds[0]) / self.cell_width)))
+
+    def _row(self, y):
+        return min(self.size - 1, max(0, int((y - self.bounds[1]) / self.cell_height)))
+
+    def lookup(self, lon, lat):
+        """Get the info of the region containing a point, or None."""
+        if self.bounds is None:
+            return None
+        min_x, min_y, max_x, max_y = self.bounds
+        if not (min_x <= lon <= max_x and min_y <= lat <= max_y):
+            return None
+        for index in self.cells.get((self._row(lat), self._column(lon)), ()):
+            info, polygon = self.regions[index]
+            if polygon.contains(lon, lat):
+                return info
+        return None
+
+    def lookup_many(self, points):
+        """Look up a batch of (lon, lat) points (None entries are skipped)."""
+        lookup = self.lookup
+        return [lookup(*point) if point else None for point in points]
+
+
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _lookup_batch(points):
+    return _worker_index.lookup_many(points)
+
+
+def assign_regions(elements, index, key, workers=1, batch_size=50000):
+    """
+    Tag elements with the region containing them.
+
+    Matching elements get `element["regions"][key] = info` in place.
+
+    Args:
+        elements (list): Overpass elements
+        index (RegionIndex): Prepared regions
+        key (str): Name of the region level, e.g. "admin_level_4"
+        workers (int): Processes used for lookups (1 looks up in this process)
+        batch_size (int): Points per batch sent to a worker
+
+    Returns:
+        int: Number of elements assigned a region
+    """
+    points = []
+    for element in elements:
+        coordinates = element_coordinates(element)
+        points.append((coordinates[1], coordinates[0]) if coordinates else None)
+    batches = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index,)) as executor:
+            results = [info for batch in executor.map(_lookup_batch, batches) for info in batch]
+    else:
+        results = [info for batch in batches for info in index.lookup_many(batch)]
+
+    assigned = 0
+    for element, info in zip(elements, results):
+        if info is not None:
+            element.setdefault("regions", {})[key] = info
+            assigned += 1
+    return assigned
+
+
+def load_region_index(fetcher, country_name, admin_level, refresh=False):
+    """
+    Load the admin boundaries of a country as a RegionIndex.
+
+    Boundaries are fetched through `OSMDataFetcher.fetch_admin_boundaries`
+    and cached in `<cache>/boundaries/`, so they are only downloaded once.
+
+    Returns:
+        RegionIndex: Prepared boundaries, or None if they could not be fetched
+    """
+    country_code = fetcher.get_country_code(country_name)
+    if not country_code:
+        print(f"Error: Could not find ISO code for country '{country_name}'")
+        return None
+
+    cache_file = Path(fetcher.cache_path) / "boundaries" / f"{country_code.lower()}_admin{admin_level}.json.gz"
+    if cache_file.exists() and not refresh:
+        data = DataSaver.load_json(cache_file)
+    else:
+        data = fetcher.fetch_admin_boundaries(country_code, admin_level)
+        if data is None:
+            return None
+        DataSaver.save_json(data, cache_file)
+
+    return RegionIndex.from_overpass(data)
@@ -0,0 +1,161 @@
+import re
+import json
+import threading
+from pathlib import Path
+
+# Overpass derives area ids from relation ids by adding this offset
+AREA_ID_OFFSET = 3600000000
+
+
+def quote(value):
+    """Quote a string for use in an Overpass QL tag filter."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+class Region:
+    """
+    A geographic target for Overpass queries.
+
+    Use the constructors for the supported kinds: ISO 3166-1 countries,
+    ISO 3166-2 subdivisions, administrative boundaries by name, OSM
+    relations by id and bounding boxes.
+    """
+
+    def __init__(self, kind, value, admin_level=None):
+        self.kind = kind
+        self.value = value
+        self.admin_level = admin_level
+
+    @classmethod
+    def country(cls, code):
+        """Country by ISO 3166-1 alpha-2 code, e.g. "FR"."""
+        return cls("country", code.upper())
+
+    @classmethod
+    def subdivision(cls, code):
+        """Subdivision by ISO 3166-2 code, e.g. "US-CA"."""
+        return cls("subdivision", code.upper())
+
+    @classmethod
+    def admin(cls, name, admin_level=None):
+        """Administrative boundary by name, optionally restricted to an admin_level."""
+        return cls("admin", name, admin_level=str(admin_level) if admin_level else None)
+
+    @classmethod
+    def relation(cls, relation_id):
+        """Area of an OSM relation by id."""
+        return cls("relation", int(relation_id))
+
+    @classmethod
+    def bbox(cls, south, west, north, east):
+        """Bounding box in degrees."""
+        return cls("bbox", (float(south), float(west), float(north), float(east)))
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parse a region from a command-line specification.
+
+        Supported forms: "country:FR", "subdivision:US-CA", "admin:Bavaria",
+        "admin:4:Bavaria", "relation:62422" and "bbox:south,west,north,east".
+
+        Raises:
+            ValueError: If the specification is not recognised
+        """
+        kind, _, value = spec.partition(":")
+        if not value:
+            raise ValueError(f"Invalid region '{spec}'. Expected <kind>:<value>")
+
+        if kind == "country":
+            return cls.country(value)
+        if kind == "subdivision":
+            return cls.subdivision(value)
+        if kind == "admin":
+            level, _, name = value.partition(":")
+            if name and level.isdigit():
+                return cls.admin(name, level)
+            return cls.admin(value)
+        if kind == "relation":
+            return cls.relation(value)
+        if kind == "bbox":
+            coordinates = value.split(",")
+            if len(coordinates) != 4:
+                raise ValueError(f"Invalid bounding box '{value}'. Expected south,west,north,east")
+            return cls.bbox(*coordinates)
+
+        raise ValueError(f"Unknown region kind '{kind}'")
+
+    @property
+    def key(self):
+        """Stable identifier used for caching resolved area ids."""
+        if self.kind == "bbox":
+            return "bbox:" + ",".join(str(c) for c in self.value)
+        if self.admin_level:
+            return f"{self.kind}:{self.admin_level}:{self.value}"
+        return f"{self.kind}:{self.value}"
+
+    @property
+    def label(self):
+        """Filesystem-friendly name of the region."""
+        return re.sub(r"[^\w.-]+", "_", self.key.replace(":", "_")).strip("_").lower()
+
+    def area_filter(self):
+        """Overpass tag filter selecting the region's area, or None if not tag-based."""
+        if self.kind == "country":
+            return f'["ISO3166-1"={quote(self.value)}]'
+        if self.kind == "subdivision":
+            return f'["ISO3166-2"={quote(self.value)}]'
+        if self.kind == "admin":
+            level = f'["admin_level"={quote(self.admin_level)}]' if self.admin_level else ""
+            return f'["boundary"="administrative"]{level}["name"={quote(self.value)}]'
+        return None
+
+    def known_area_id(self):
+        """Area id that can be derived without asking Overpass, if any."""
+        if self.kind == "relation":
+            return AREA_ID_OFFSET + self.value
+        return None
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Region({self.key!r})"
+
+
+class AreaIdCache:
+    """JSON-file cache mapping region keys to resolved Overpass area ids."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._ids = None
+
+    def get(self, region):
+        """Get the cached area id for a region, or None."""
+        with self._lock:
+            return self._load().get(region.key)
+
+    def set(self, region, area_id):
+        """Store a resolved area id and persist the cache."""
+        with self._lock:
+            ids = self._load()
+            if ids.get(region.key) == area_id:
+                return
+            ids[region.key] = area_id
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(ids, f, ensure_ascii=False, indent=2)
+
+    def _load(self):
+        if self._ids is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._ids = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._ids = {}
+        return self._ids
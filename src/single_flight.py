@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process sharing is not available
+    fcntl = None
+
+# Seconds a result written to the lock directory is kept for waiting processes
+RESULT_TTL_SECONDS = 60
+
+
+class _Call:
+    """An in-flight call whose result is shared with waiting callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share the same key.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception). With a
+    `lock_dir`, processes also coordinate through a file lock: a process that
+    waited on the lock reuses the result the lock holder wrote to disk
+    instead of repeating the call. Results shared across processes must be
+    JSON serializable.
+
+    Shared results are only needed by processes already waiting for the
+    lock, so results and leftover temporary files older than `result_ttl`
+    seconds are deleted when a lock is next taken, at most once per TTL
+    interval. Lock files are empty and kept: deleting one that another
+    process already has open would let two processes lock different files
+    for the same call.
+    """
+
+    def __init__(self, lock_dir=None, result_ttl=RESULT_TTL_SECONDS):
+        self.lock_dir = Path(lock_dir) if lock_dir else None
+        self.result_ttl = result_ttl
+        self._next_cleanup = 0.0
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run `fn()` once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Identity of the call, e.g. the Overpass query string
+            fn (callable): Function producing the result
+
+        Returns:
+            The result of `fn()`, shared with concurrent callers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def _run(self, key, fn):
+        """Run fn, sharing the result with other processes if configured."""
+        if self.lock_dir is None or fcntl is None:
+            return fn()
+
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._remove_expired()
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        lock_path = self.lock_dir / f"{digest}.lock"
+        result_path = self.lock_dir / f"{digest}.json"
+        requested_at = time.time()
+
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process finished this call while we waited for the lock
+                try:
+                    if result_path.stat().st_mtime >= requested_at:
+                        with open(result_path, "r", encoding="utf-8") as f:
+                            return json.load(f)
+                except FileNotFoundError:
+                    pass
+
+                result = fn()
+                if result is not None:
+                    temp_path = result_path.with_suffix(f".{os.getpid()}.tmp")
+                    with open(temp_path, "w", encoding="utf-8") as f:
+                        json.dump(result, f, ensure_ascii=False)
+                    os.replace(temp_path, result_path)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _remove_expired(self):
+        """Delete results and temporary files older than the TTL, at most once per TTL."""
+        now = time.time()
+        with self._lock:
+            if now < self._next_cleanup:
+                return
+            self._next_cleanup = now + self.result_ttl
+
+        expires = now - self.result_ttl
+        for path in self.lock_dir.iterdir():
+            if path.suffix not in (".json", ".tmp"):
+                continue
+            try:
+                if path.stat().st_mtime < expires:
+                    path.unlink()
+            except OSError:
+                pass  # Removed by another process meanwhile
@@ -0,0 +1,168 @@
+import os
+import json
+import math
+import zlib
+import hashlib
+import tempfile
+from pathlib import Path
+from src.data_saver import DataSaver, GZIP_SUFFIX, ZSTD_SUFFIX
+from src.dataset_reader import iter_elements
+
+# Target uncompressed size of one partition; only one old partition is held
+# in memory at a time
+PARTITION_BYTES = 16 * 1024 * 1024
+MAX_PARTITIONS = 256
+COMPRESSION_RATIO_ESTIMATE = 10
+
+
+def canonicalize(element):
+    """Serialize an element deterministically for hashing and comparison."""
+    return json.dumps(element, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def element_key(element):
+    """Identity of an element within a snapshot."""
+    return f"{element.get('type')}/{element.get('id')}"
+
+
+def tag_changes(old_tags, new_tags):
+    """
+    Compare two tag dictionaries.
+
+    Returns:
+        dict: "added" and "removed" tags, and "changed" tags as [old, new]
+    """
+    return {
+        "added": {k: v for k, v in new_tags.items() if k not in old_tags},
+        "removed": {k: v for k, v in old_tags.items() if k not in new_tags},
+        "changed": {k: [old_tags[k], v] for k, v in new_tags.items() if k in old_tags and old_tags[k] != v},
+    }
+
+
+def _partition_count(*filenames):
+    """Choose a partition count from the (estimated uncompressed) input size."""
+    total = 0
+    for filename in filenames:
+        size = os.path.getsize(filename)
+        if Path(filename).suffix in (GZIP_SUFFIX, ZSTD_SUFFIX):
+            size *= COMPRESSION_RATIO_ESTIMATE
+        total += size
+    return max(1, min(MAX_PARTITIONS, math.ceil(total / PARTITION_BYTES)))
+
+
+def _partition(filename, directory, partitions):
+    """
+    Hash-partition a snapshot into files of `key<TAB>digest<TAB>json` lines.
+
+    Returns:
+        list: Partition file paths
+    """
+    paths = [Path(directory) / f"{i}.tsv" for i in range(partitions)]
+    files = [open(path, "w", encoding="utf-8") for path in paths]
+    try:
+        for element in iter_elements(filename):
+            key = element_key(element)
+            text = canonicalize(element)
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+            files[zlib.crc32(key.encode("utf-8")) % partitions].write(f"{key}\t{digest}\t{text}\n")
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_partition(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, digest, text = line.rstrip("\n").split("\t", 2)
+            yield key, digest, text
+
+
+def diff_snapshots(old_file, new_file, partitions=None, work_dir=None, stats=None):
+    """
+    Stream the differences between two saved snapshots.
+
+    Both snapshots are streamed into hash partitions on disk keyed by
+    (type, id), then each partition pair is compared using content digests,
+    so memory is bounded by the size of one partition rather than the
+    snapshots.
+
+    Args:
+        old_file (str): Earlier snapshot written by `DataSaver.save_json`
+        new_file (str): Later snapshot
+        partitions (int): Number of partitions (chosen from file size if None)
+        work_dir (str): Directory for temporary partition files
+        stats (dict): Optional dict updated with counts per change type
+
+    Yields:
+        dict: Change records with "action" ("added", "removed" or
+            "modified"), "type", "id", "element" (the new version, or the old
+            one for removals) and, for modifications, "tags" changes and the
+            other "changed_fields"
+    """
+    partitions = partitions or _partition_count(old_file, new_file)
+    counts = stats if stats is not None else {}
+    for action in ("added", "removed", "modified", "unchanged"):
+        counts.setdefault(action, 0)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        old_dir, new_dir = Path(directory) / "old", Path(directory) / "new"
+        old_dir.mkdir()
+        new_dir.mkdir()
+        old_paths = _partition(old_file, old_dir, partitions)
+        new_paths = _partition(new_file, new_dir, partitions)
+
+        for old_path, new_path in zip(old_paths, new_paths):
+            old = {key: (digest, text) for key, digest, text in _read_partition(old_path)}
+
+            for key, digest, text in _read_partition(new_path):
+                previous = old.pop(key, None)
+                if previous is None:
+                    counts["added"] += 1
+                    element = json.loads(text)
+                    yield {"action": "added", "type": element.get("type"), "id": element.get("id"), "element": element}
+                elif previous[0] != digest:
+                    counts["modified"] += 1
+                    old_element, element = json.loads(previous[1]), json.loads(text)
+                    changed_fields = sorted(
+                        field for field in set(old_element) | set(element)
+                        if field != "tags" and old_element.get(field) != element.get(field)
+                    )
+                    yield {
+                        "action": "modified",
+                        "type": element.get("type"),
+                        "id": element.get("id"),
+                        "tags": tag_changes(old_element.get("tags", {}), element.get("tags", {})),
+                        "changed_fields": changed_fields,
+                        "element": element,
+                    }
+                else:
+                    counts["unchanged"] += 1
+
+            for digest, text in old.values():
+                counts["removed"] += 1
+                element = json.loads(text)
+                yield {"action": "removed", "type": element.get("type"), "id": element.get("id"), "element": element}
+
+
+def write_diff(old_file, new_file, output_file, partitions=None, work_dir=None):
+    """
+    Write the differences between two snapshots as JSON lines.
+
+    The output is compressed when `output_file` ends in `.gz` or `.zst`.
+
+    Returns:
+        dict: Number of added, removed, modified and unchanged elements
+    """
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    stats = {}
+    with DataSaver.open_text(output_path, "w") as f:
+        for change in diff_snapshots(old_file, new_file, partitions, work_dir, stats):
+            f.write(json.dumps(change, ensure_ascii=False))
+            f.write("\n")
+
+    print(f"Diff saved to {output_path}: {stats['added']} added, "
+          f"{stats['removed']} removed, {stats['modified']} modified")
+    return stats
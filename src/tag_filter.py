@@ -0,0 +1,162 @@
+import re
+import math
+import operator
+from src.regions import quote
+
+NUMERIC_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+OPERATORS = {"=", "!=", "~", "!~", "exists", "not_exists", "between", *NUMERIC_OPERATORS}
+# Plain decimal numbers, as accepted by Overpass number(); float() would also
+# take "1_000", " 5 ", "inf" and "nan"
+NUMBER_PATTERN = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def _number(value):
+    """Parse a tag value as a number, returning None if it is not numeric."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str) and NUMBER_PATTERN.fullmatch(value):
+        number = float(value)
+    else:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _format_number(number):
+    """Format a number for an Overpass evaluator expression."""
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+class CompiledCondition:
+    """A single tag condition compiled to Overpass QL and a local predicate."""
+
+    def __init__(self, condition):
+        self.key = condition["key"]
+        self.op = condition.get("op", "=")
+        self.value = condition.get("value")
+
+        if self.op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{self.op}' for key '{self.key}'")
+        if self.op not in ("exists", "not_exists") and self.value is None:
+            raise ValueError(f"Operator '{self.op}' for key '{self.key}' requires a value")
+
+        key = quote(self.key)
+        if self.op in ("=", "!="):
+            self.value = str(self.value)
+            self.overpass = f'[{key}{self.op}{quote(self.value)}]'
+            self.match = self._equal if self.op == "=" else self._not_equal
+        elif self.op in ("~", "!~"):
+            ignore_case = condition.get("case_insensitive", False)
+            try:
+                self.pattern = re.compile(str(self.value), re.IGNORECASE if ignore_case else 0)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression for key '{self.key}': {e}") from e
+            flags = ",i" if ignore_case else ""
+            self.overpass = f'[{key}{self.op}{quote(self.value)}{flags}]'
+            self.match = self._regex if self.op == "~" else self._not_regex
+        elif self.op == "exists":
+            self.overpass = f'[{key}]'
+            self.match = self._exists
+        elif self.op == "not_exists":
+            self.overpass = f'[!{key}]'
+            self.match = self._not_exists
+        else:
+            bounds = list(self.value) if isinstance(self.value, (list, tuple)) else [self.value]
+            if len(bounds) != (2 if self.op == "between" else 1) or any(_number(b) is None for b in bounds):
+                raise ValueError(f"Operator '{self.op}' for key '{self.key}' requires numeric bounds")
+            if self.op == "between":
+                low, high = (_number(b) for b in bounds)
+                self.comparisons = [(operator.ge, low), (operator.le, high)]
+            else:
+                self.comparisons = [(NUMERIC_OPERATORS[self.op], _number(self.value))]
+            symbols = {operator.gt: ">", operator.ge: ">=", operator.lt: "<", operator.le: "<="}
+            expression = "&&".join(
+                f'number(t[{key}]){symbols[compare]}{_format_number(bound)}'
+                for compare, bound in self.comparisons
+            )
+            # Numeric comparisons need an evaluator filter; the key filter lets
+            # Overpass use its tag index first
+            self.overpass = f'[{key}](if:{expression})'
+            self.match = self._numeric
+
+    def _equal(self, tags):
+        return tags.get(self.key) == self.value
+
+    def _not_equal(self, tags):
+        return tags.get(self.key) != self.value
+
+    def _regex(self, tags):
+        value = tags.get(self.key)
+        return value is not None and self.pattern.search(value) is not None
+
+    def _not_regex(self, tags):
+        value = tags.get(self.key)
+        return value is None or self.pattern.search(value) is None
+
+    def _exists(self, tags):
+        return self.key in tags
+
+    def _not_exists(self, tags):
+        return self.key not in tags
+
+    def _numeric(self, tags):
+        number = _number(tags.get(self.key))
+        return number is not None and all(compare(number, bound) for compare, bound in self.comparisons)
+
+
+class CompiledTagGroup:
+    """A group of conditions that must all match."""
+
+    def __init__(self, tag_group):
+        self.conditions = [CompiledCondition(c) for c in tag_group["conditions"]]
+        # Overpass expects tag filters before evaluator filters
+        self.overpass = "".join(
+            sorted((c.overpass for c in self.conditions), key=lambda part: "(if:" in part)
+        )
+        self._predicates = [c.match for c in self.conditions]
+
+    def matches(self, tags):
+        """Check whether a tag dictionary satisfies every condition."""
+        for predicate in self._predicates:
+            if not predicate(tags):
+                return False
+        return True
+
+
+class TagMatcher:
+    """
+    Location type filter compiled once to Overpass QL and a local matcher.
+
+    An element matches when any of the type's tag groups matches, mirroring
+    the union built by `OSMDataFetcher.build_query`.
+
+    Supported condition operators (`"op"`, default `"="`):
+        "=", "!="           exact (in)equality with "value"
+        "~", "!~"           regex match on "value" ("case_insensitive": true for ,i)
+        "exists"            key is present
+        "not_exists"        key is absent
+        ">", ">=", "<", "<="  numeric comparison with "value"
+        "between"           inclusive numeric range, "value": [min, max]
+    """
+
+    def __init__(self, location_config):
+        self.groups = [CompiledTagGroup(g) for g in location_config.get("tags", [])]
+
+    def matches(self, element):
+        """Check whether an element matches the location type."""
+        tags = element.get("tags", {})
+        for group in self.groups:
+            if group.matches(tags):
+                return True
+        return False
+
+    def filter(self, elements):
+        """Return the elements that match the location type."""
+        matches = self.matches
+        return [element for element in elements if matches(element)]
@@ -0,0 +1,587 @@
+import os
+import gzip
+import json
+import math
+import sqlite3
+import struct
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from src.geometry import element_coordinates, element_polygons, lonlat_to_world, world_to_lonlat
+
+EXTENT = 4096
+TILE_BUFFER = 64  # Extent units kept around each tile so lines and polygons join seamlessly
+TILE_SIZE_PX = 256
+
+POINT, LINESTRING, POLYGON = 1, 2, 3
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+
+# Protocol buffer encoding of the Mapbox Vector Tile format (version 2)
+
+def _varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(out, field_number, wire_type):
+    _varint((field_number << 3) | wire_type, out)
+
+
+def _bytes_field(out, field_number, data):
+    _key(out, field_number, 2)
+    _varint(len(data), out)
+    out += data
+
+
+def _packed_field(out, field_number, values):
+    packed = bytearray()
+    for value in values:
+        _varint(value, packed)
+    _bytes_field(out, field_number, packed)
+
+
+def _encode_value(value):
+    out = bytearray()
+    if isinstance(value, bool):
+        _key(out, 7, 0)
+        _varint(int(value), out)
+    elif isinstance(value, int) and value >= 0:
+        _key(out, 5, 0)
+        _varint(value, out)
+    elif isinstance(value, int):
+        _key(out, 6, 0)
+        _varint(_zigzag(value), out)
+    elif isinstance(value, float):
+        _key(out, 3, 1)
+        out += struct.pack("<d", value)
+    else:
+        _bytes_field(out, 1, str(value).encode("utf-8"))
+    return out
+
+
+def _command(command_id, count):
+    return (command_id & 0x7) | (count << 3)
+
+
+def _encode_geometry(geom_type, parts):
+    """Encode tile-local integer geometry as MVT commands."""
+    commands = []
+    cursor_x = cursor_y = 0
+
+    if geom_type == POINT:
+        commands.append(_command(MOVE_TO, len(parts)))
+        for x, y in parts:
+            commands += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+        return commands
+
+    for part in parts:
+        x, y = part[0]
+        commands += [_command(MOVE_TO, 1), _zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+        cursor_x, cursor_y = x, y
+        commands.append(_command(LINE_TO, len(part) - 1))
+        for x, y in part[1:]:
+            commands += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+        if geom_type == POLYGON:
+            commands.append(_command(CLOSE_PATH, 1))
+    return commands
+
+
+def encode_tile(layer_name, features, extent=EXTENT):
+    """
+    Encode one layer of features as a vector tile.
+
+    Args:
+        layer_name (str): Layer name
+        features (list): (geom_type, parts, properties, id) tuples with
+            geometry in tile-local integer coordinates. Points are a list of
+            (x, y); lines and polygons a list of point lists (polygon rings
+            without the repeated closing point)
+        extent (int): Tile extent
+
+    Returns:
+        bytes: Uncompressed vector tile
+    """
+    keys, values = {}, {}
+    layer = bytearray()
+    _key(layer, 15, 0)
+    _varint(2, layer)
+    _bytes_field(layer, 1, layer_name.encode("utf-8"))
+
+    for geom_type, parts, properties, feature_id in features:
+        feature = bytearray()
+        if feature_id is not None:
+            _key(feature, 1, 0)
+            _varint(feature_id, feature)
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value).__name__, value), len(values)))
+        if tags:
+            _packed_field(feature, 2, tags)
+        _key(feature, 3, 0)
+        _varint(geom_type, feature)
+        _packed_field(feature, 4, _encode_geometry(geom_type, parts))
+        _bytes_field(layer, 2, feature)
+
+    for key in keys:
+        _bytes_field(layer, 3, key.encode("utf-8"))
+    for _, value in values:
+        _bytes_field(layer, 4, _encode_value(value))
+    _key(layer, 5, 0)
+    _varint(extent, layer)
+
+    tile = bytearray()
+    _bytes_field(tile, 3, layer)
+    return bytes(tile)
+
+
+# Feature preparation in Web Mercator world coordinates ([0, 1] on both axes)
+
+def element_features(element, properties=("name",)):
+    """
+    Convert an Overpass element to vector tile features.
+
+    Ways and relations with `out geom` geometry become polygons (closed
+    rings) or lines; everything else with a location becomes a point.
+
+    Returns:
+        list: (geom_type, geometry, properties, id) tuples in world
+            coordinates, where geometry is (x, y) for points, a point list for
+            lines and a ring list for polygons
+    """
+    tags = element.get("tags", {})
+    feature_properties = {"osm_type": element.get("type"), "osm_id": element.get("id")}
+    feature_properties.update({key: tags[key] for key in properties if key in tags})
+    feature_id = element.get("id") if isinstance(element.get("id"), int) and element["id"] >= 0 else None
+
+    features = []
+    if "geometry" in element or "members" in element:
+        for polygon in element_polygons(element):
+            rings = [[lonlat_to_world(lon, lat) for lon, lat in ring] for ring in polygon]
+            features.append((POLYGON, rings, feature_properties, feature_id))
+        if not features and element.get("type") == "way" and len(element.get("geometry") or []) >= 2:
+            line = [lonlat_to_world(p["lon"], p["lat"]) for p in element["geometry"] if p]
+            features.append((LINESTRING, line, feature_properties, feature_id))
+    if features:
+        return features
+
+    coordinates = element_coordinates(element)
+    if coordinates is None:
+        return []
+    lat, lon = coordinates
+    return [(POINT, lonlat_to_world(lon, lat), feature_properties, feature_id)]
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker simplification of a point list (closed rings stay closed)."""
+    if len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    tolerance_sq = tolerance * tolerance
+
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        max_distance, index = -1.0, None
+
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length_sq == 0:
+                distance = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                t = ((px - ax) * dx + (py - ay) * dy) / length_sq
+                t = max(0.0, min(1.0, t))
+                distance = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+            if distance > max_distance:
+                max_distance, index = distance, i
+
+        if index is not None and max_distance > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def cluster_points(features, cells_per_unit):
+    """
+    Merge points falling in the same grid cell into one cluster point.
+
+    Clusters are placed at the mean position of their members and carry a
+    "point_count" property; single points keep their own properties.
+    """
+    cells = {}
+    for feature in features:
+        x, y = feature[1]
+        cells.setdefault((int(x * cells_per_unit), int(y * cells_per_unit)), []).append(feature)
+
+    clustered = []
+    for members in cells.values():
+        if len(members) == 1:
+            clustered.append(members[0])
+            continue
+        x = sum(f[1][0] for f in members) / len(members)
+        y = sum(f[1][1] for f in members) / len(members)
+        clustered.append((POINT, (x, y), {"point_count": len(members)}, None))
+    return clustered
+
+
+def _zoom_features(features, zoom, cluster_max_zoom, cluster_radius_px, simplify_px):
+    """Cluster and simplify features for one zoom level."""
+    pixels = (1 << zoom) * TILE_SIZE_PX
+    tolerance = simplify_px / pixels
+
+    points = [f for f in features if f[0] == POINT]
+    if zoom <= cluster_max_zoom:
+        points = cluster_points(points, pixels / cluster_radius_px)
+
+    prepared = points
+    for geom_type, geometry, properties, feature_id in features:
+        if geom_type == LINESTRING:
+            line = simplify(geometry, tolerance)
+            prepared.append((LINESTRING, line, properties, feature_id))
+        elif geom_type == POLYGON:
+            rings = [simplify(ring, tolerance) for ring in geometry]
+            if len(rings[0]) < 4:
+                continue  # Smaller than the tolerance at this zoom
+            rings = [rings[0]] + [ring for ring in rings[1:] if len(ring) >= 4]
+            prepared.append((POLYGON, rings, properties, feature_id))
+    return prepared
+
+
+def _bounds(geom_type, geometry):
+    if geom_type == POINT:
+        return geometry[0], geometry[1], geometry[0], geometry[1]
+    points = geometry[0] if geom_type == POLYGON else geometry
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _assign_tiles(features, zoom):
+    """Group feature indexes by the tiles (including buffer) they overlap."""
+    tile_count = 1 << zoom
+    buffer = TILE_BUFFER / EXTENT
+    tiles = {}
+    for index, feature in enumerate(features):
+        min_x, min_y, max_x, max_y = _bounds(feature[0], feature[1])
+        pad = 0 if feature[0] == POINT else buffer
+        x_range = range(max(0, math.floor(min_x * tile_count - pad)),
+                        min(tile_count - 1, math.floor(max_x * tile_count + pad)) + 1)
+        y_range = range(max(0, math.floor(min_y * tile_count - pad)),
+                        min(tile_count - 1, math.floor(max_y * tile_count + pad)) + 1)
+        for x in x_range:
+            for y in y_range:
+                tiles.setdefault((x, y), []).append(index)
+    return tiles
+
+
+# Tile rendering: clipping and quantization to tile-local coordinates
+
+def _clip_ring(ring, low, high, axes=(0, 1)):
+    """Sutherland-Hodgman clipping of an open ring to a square (or a strip along `axes`)."""
+    for axis, bound, keep_above in ((axis, bound, bound == low) for axis in axes for bound in (low, high)):
+        if not ring:
+            break
+        clipped = []
+        previous = ring[-1]
+        previous_inside = (previous[axis] >= bound) if keep_above else (previous[axis] <= bound)
+        for point in ring:
+            inside = (point[axis] >= bound) if keep_above else (point[axis] <= bound)
+            if inside != previous_inside:
+                t = (bound - previous[axis]) / (point[axis] - previous[axis])
+                crossing = (previous[0] + t * (point[0] - previous[0]), previous[1] + t * (point[1] - previous[1]))
+                clipped.append(crossing)
+            if inside:
+                clipped.append(point)
+            previous, previous_inside = point, inside
+        ring = clipped
+    return ring
+
+
+def _clip_line(line, low, high):
+    """Liang-Barsky clipping of a line to a square, returning the visible parts."""
+    parts = []
+    current = []
+    for (x0, y0), (x1, y1) in zip(line, line[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        t0, t1 = 0.0, 1.0
+        visible = True
+        for p, q in ((-dx, x0 - low), (dx, high - x0), (-dy, y0 - low), (dy, high - y0)):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+                continue
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                visible = False
+                break
+        if not visible:
+            if current:
+                parts.append(current)
+                current = []
+            continue
+        start = (x0 + t0 * dx, y0 + t0 * dy)
+        end = (x0 + t1 * dx, y0 + t1 * dy)
+        if not current:
+            current = [start]
+        current.append(end)
+        if t1 < 1.0:
+            parts.append(current)
+            current = []
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _quantize(points):
+    """Round points to integers, dropping consecutive duplicates."""
+    result = []
+    for x, y in points:
+        point = (int(round(x)), int(round(y)))
+        if not result or result[-1] != point:
+            result.append(point)
+    return result
+
+
+def _signed_area(ring):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))
+
+
+def render_tile(job):
+    """
+    Clip, quantize and encode the features of one tile.
+
+    Args:
+        job (tuple): (zoom, x, y, layer_name, features in world coordinates)
+
+    Returns:
+        tuple: (zoom, x, y, gzipped tile bytes or None if the tile is empty)
+    """
+    zoom, tile_x, tile_y, layer_name, features = job
+    scale = (1 << zoom) * EXTENT
+    offset_x, offset_y = tile_x * EXTENT, tile_y * EXTENT
+    low, high = -TILE_BUFFER, EXTENT + TILE_BUFFER
+
+    def local(point):
+        return point[0] * scale - offset_x, point[1] * scale - offset_y
+
+    encoded = []
+    for geom_type, geometry, properties, feature_id in features:
+        if geom_type == POINT:
+            x, y = local(geometry)
+            if 0 <= x < EXTENT and 0 <= y < EXTENT:
+                encoded.append((POINT, [(int(x), int(y))], properties, feature_id))
+
+        elif geom_type == LINESTRING:
+            parts = [_quantize(part) for part in _clip_line([local(p) for p in geometry], low, high)]
+            parts = [part for part in parts if len(part) >= 2]
+            if parts:
+                encoded.append((LINESTRING, parts, properties, feature_id))
+
+        else:
+            rings = []
+            for index, ring in enumerate(geometry):
+                clipped = _quantize(_clip_ring([local(p) for p in ring[:-1]], low, high))
+                if len(clipped) > 1 and clipped[0] == clipped[-1]:
+                    clipped.pop()
+                area = _signed_area(clipped) if len(clipped) >= 3 else 0
+                if area == 0:
+                    if index == 0:
+                        break  # Exterior ring vanished
+                    continue
+                # Exterior rings have positive area in tile coordinates, holes negative
+                if (area > 0) != (index == 0):
+                    clipped.reverse()
+                rings.append(clipped)
+            if rings:
+                encoded.append((POLYGON, rings, properties, feature_id))
+
+    if not encoded:
+        return zoom, tile_x, tile_y, None
+    return zoom, tile_x, tile_y, gzip.compress(encode_tile(layer_name, encoded), compresslevel=6)
+
+
+# Features of the zoom level being rendered, set once per worker process
+_worker_features = None
+
+
+def _init_worker(features):
+    global _worker_features
+    _worker_features = features
+
+
+def _clip_to_column(feature, low, high):
+    """Clip a polygon to a vertical strip of world x coordinates, or None if nothing is left."""
+    rings = []
+    for index, ring in enumerate(feature[1]):
+        clipped = _clip_ring(ring[:-1], low, high, axes=(0,))
+        if len(clipped) < 3:
+            if index == 0:
+                return None
+            continue
+        rings.append(clipped + clipped[:1])
+    return POLYGON, rings, feature[2], feature[3]
+
+
+def render_column(job):
+    """
+    Render the tiles of one tile column from the worker's features.
+
+    Polygons reaching several tiles of the column are first clipped to the
+    column (with its buffer), so each tile only clips the part of a large
+    polygon near it instead of the whole outline.
+
+    Args:
+        job (tuple): (zoom, x, layer_name, [(y, feature indexes), ...])
+
+    Returns:
+        list: `render_tile` results
+    """
+    zoom, tile_x, layer_name, tiles = job
+    tile_count = 1 << zoom
+    buffer = TILE_BUFFER / EXTENT
+    low, high = (tile_x - buffer) / tile_count, (tile_x + 1 + buffer) / tile_count
+
+    uses = {}
+    for _, indexes in tiles:
+        for index in indexes:
+            uses[index] = uses.get(index, 0) + 1
+    column_features = {}
+    for index, count in uses.items():
+        feature = _worker_features[index]
+        if feature[0] == POLYGON and count > 1:
+            feature = _clip_to_column(feature, low, high)
+        column_features[index] = feature
+
+    return [
+        render_tile((zoom, tile_x, tile_y, layer_name,
+                     [column_features[i] for i in indexes if column_features[i] is not None]))
+        for tile_y, indexes in tiles
+    ]
+
+
+def export_mbtiles(elements, filename, min_zoom=0, max_zoom=14, layer_name="locations",
+                   properties=("name",), cluster_max_zoom=10, cluster_radius_px=40,
+                   simplify_px=1.0, workers=None):
+    """
+    Export elements as vector tiles to an MBTiles file.
+
+    Points are clustered on a pixel grid up to `cluster_max_zoom`, polygons
+    and lines from `out geom` output are simplified per zoom, and tiles are
+    rendered in parallel with a process pool. Each zoom level's features are
+    handed to the workers once when the pool starts; jobs are tile columns
+    listing feature indexes, so geometry is not sent with every tile.
+
+    Args:
+        elements (list): Overpass elements
+        filename (str): Output .mbtiles path (overwritten)
+        min_zoom (int): Lowest zoom level to generate
+        max_zoom (int): Highest zoom level to generate
+        layer_name (str): Vector layer name
+        properties (tuple): Tag keys copied to feature properties
+        cluster_max_zoom (int): Highest zoom level with point clustering
+        cluster_radius_px (int): Cluster cell size in pixels
+        simplify_px (float): Simplification tolerance in pixels
+        workers (int): Rendering processes (defaults to the CPU count;
+            1 renders in this process)
+
+    Returns:
+        dict: Number of tiles and features written and the file size
+    """
+    features = [f for element in elements for f in element_features(element, properties)]
+
+    output_path = Path(filename)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.exists():
+        output_path.unlink()
+
+    connection = sqlite3.connect(output_path)
+    connection.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+
+    workers = workers or os.cpu_count() or 1
+    tile_count = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        zoom_features = _zoom_features(features, zoom, cluster_max_zoom, cluster_radius_px, simplify_px)
+        columns = {}
+        for (x, y), indexes in sorted(_assign_tiles(zoom_features, zoom).items()):
+            columns.setdefault(x, []).append((y, indexes))
+        jobs = [(zoom, x, layer_name, tiles) for x, tiles in columns.items()]
+
+        if workers > 1 and len(jobs) > 1:
+            # A pool per zoom level, so workers receive that level's features once
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker,
+                                     initargs=(zoom_features,)) as executor:
+                results = list(executor.map(render_column, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        else:
+            _init_worker(zoom_features)
+            try:
+                results = list(map(render_column, jobs))
+            finally:
+                _init_worker(None)
+
+        rows = [(z, x, (1 << z) - 1 - y, data) for column in results for z, x, y, data in column
+                if data is not None]
+        connection.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", rows)
+        tile_count += len(rows)
+
+    connection.executemany("INSERT INTO metadata VALUES (?, ?)", _metadata(
+        features, layer_name, properties, min_zoom, max_zoom
+    ))
+    connection.commit()
+    connection.close()
+
+    size = output_path.stat().st_size
+    print(f"Tiles saved to {output_path}: {tile_count} tiles, {len(features)} features, {size / 1e6:.1f} MB")
+    return {"tiles": tile_count, "features": len(features), "bytes": size}
+
+
+def _metadata(features, layer_name, properties, min_zoom, max_zoom):
+    """Build the MBTiles metadata rows."""
+    if features:
+        boxes = [_bounds(f[0], f[1]) for f in features]
+        west, north = world_to_lonlat(min(b[0] for b in boxes), min(b[1] for b in boxes))
+        east, south = world_to_lonlat(max(b[2] for b in boxes), max(b[3] for b in boxes))
+    else:
+        west, south, east, north = -180.0, -85.0511, 180.0, 85.0511
+
+    fields = {"osm_type": "String", "osm_id": "Number", "point_count": "Number"}
+    fields.update({key: "String" for key in properties})
+    vector_layers = [{"id": layer_name, "fields": fields, "minzoom": min_zoom, "maxzoom": max_zoom}]
+
+    return [
+        ("name", layer_name),
+        ("format", "pbf"),
+        ("type", "overlay"),
+        ("version", "2"),
+        ("minzoom", str(min_zoom)),
+        ("maxzoom", str(max_zoom)),
+        ("bounds", f"{west:.6f},{south:.6f},{east:.6f},{north:.6f}"),
+        ("center", f"{(west + east) / 2:.6f},{(south + north) / 2:.6f},{min_zoom}"),
+        ("json", json.dumps({"vector_layers": vector_layers})),
+    ]
@@ -0,0 +1,170 @@
+# test_aggregation.py
+import pytest
+import io
+import sys
+import json
+import random
+import requests
+import tracemalloc
+from unittest.mock import MagicMock
+import main
+from src.aggregation import Aggregator, HexGrid, SquareGrid, make_grid
+from src.data_saver import DataSaver
+from src.geometry import sinusoidal_km, sinusoidal_to_latlon
+from src.osm_data_fetcher import OSMDataFetcher
+from src.region_assigner import RegionIndex
+from src.regions import Region
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / "country_codes.json").write_text(json.dumps({"FR": "France"}))
+    (config_dir / "location_types.json").write_text(json.dumps({
+        "restaurant": {"description": "Restaurants", "query_type": "center",
+                       "tags": [{"type": "primary", "conditions": [{"key": "amenity", "value": "restaurant"}]}]}
+    }))
+    return config_dir
+
+
+def restaurants(count, seed=1):
+    rng = random.Random(seed)
+    for osm_id in range(count):
+        yield {"type": "node", "id": osm_id, "lat": rng.uniform(48.0, 49.0), "lon": rng.uniform(2.0, 3.0),
+               "tags": {"amenity": "restaurant", "cuisine": rng.choice(["pizza", "french", "sushi"]),
+                        "capacity": str(rng.randint(10, 50))}}
+
+
+# Test the sinusoidal projection round trip
+def test_sinusoidal_projection():
+    x, y = sinusoidal_km(48.85, 2.35)
+    lat, lon = sinusoidal_to_latlon(x, y)
+    assert lat == pytest.approx(48.85) and lon == pytest.approx(2.35)
+    # One degree of longitude shrinks with latitude, one degree of latitude does not
+    assert sinusoidal_km(60, 1)[0] == pytest.approx(sinusoidal_km(0, 1)[0] / 2)
+    assert sinusoidal_km(1, 0)[1] == pytest.approx(111.195, rel=1e-3)
+
+# Test that cell centers map back to their cells
+@pytest.mark.parametrize("grid", [SquareGrid(5), HexGrid(5)])
+def test_grid_centers_round_trip(grid):
+    rng = random.Random(2)
+    for _ in range(500):
+        cell = grid.cell(rng.uniform(-70, 70), rng.uniform(-179, 179))
+        assert grid.cell(*grid.center(cell)) == cell
+    assert grid.area_km2(cell) == 25
+
+# Test that points near a hexagon center stay in it
+def test_hex_grid_neighbourhood():
+    grid = HexGrid(10)
+    cell = grid.cell(48.85, 2.35)
+    lat, lon = grid.center(cell)
+    # The inscribed circle of a 100 km² hexagon has a radius of about 5.4 km
+    for dlat, dlon in [(0.04, 0), (-0.04, 0), (0, 0.06), (0, -0.06)]:
+        assert grid.cell(lat + dlat, lon + dlon) == cell
+    assert grid.cell(lat + 0.2, lon) != cell
+
+# Test counts, densities and tag statistics
+def test_aggregator_counts_and_statistics():
+    elements = list(restaurants(1000))
+    elements.append({"type": "relation", "id": -1, "tags": {"cuisine": "pizza", "capacity": "many"}})
+    aggregator = Aggregator(SquareGrid(20), stats_tags=["cuisine", "capacity"], max_values=2)
+
+    result = aggregator.add_all(iter(elements)).result()
+
+    assert result["element_count"] == 1001
+    assert result["unlocated"] == 1
+    assert result["grid"]["type"] == "square"
+    cells = result["grid"]["cells"]
+    assert sum(c["count"] for c in cells) == 1000
+    assert cells[0]["count"] >= cells[-1]["count"]
+    assert cells[0]["density_per_km2"] == pytest.approx(cells[0]["count"] / 400)
+
+    cuisine = result["tags"]["cuisine"]
+    assert cuisine["present"] == 1001
+    assert len(cuisine["values"]) == 2
+    assert sum(cuisine["values"].values()) + cuisine["other_values"] == 1001
+    assert "numeric" not in cuisine
+    capacity = result["tags"]["capacity"]["numeric"]
+    assert capacity["count"] == 1000
+    assert 10 <= capacity["min"] <= capacity["mean"] <= capacity["max"] <= 50
+
+# Test per-region counts
+def test_aggregator_region_counts():
+    index = RegionIndex([
+        ({"id": 1, "name": "West"}, [[(2.0, 48.0), (2.5, 48.0), (2.5, 49.0), (2.0, 49.0), (2.0, 48.0)]]),
+        ({"id": 2, "name": "East"}, [[(2.5, 48.0), (3.0, 48.0), (3.0, 49.0), (2.5, 49.0), (2.5, 48.0)]]),
+    ])
+    result = Aggregator(region_indexes={"admin_level_4": index}).add_all(restaurants(400)).result()
+
+    assert "grid" not in result
+    regions = result["regions"]["admin_level_4"]
+    assert {r["name"] for r in regions} == {"West", "East"}
+    assert sum(r["count"] for r in regions) == 400
+
+# Test that memory does not grow with the number of elements
+def test_aggregator_memory_is_bounded():
+    tracemalloc.start()
+    aggregator = Aggregator(HexGrid(10), stats_tags=["cuisine"]).add_all(restaurants(100000))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert aggregator.element_count == 100000
+    assert len(aggregator.cells) < 2000
+    assert peak < 5 * 1024 * 1024
+
+# Test the optional H3 grid
+def test_h3_grid():
+    h3 = pytest.importorskip("h3")
+    grid = make_grid("h3", resolution=5)
+    cell = grid.cell(48.85, 2.35)
+    assert h3.get_resolution(cell) == 5
+    with pytest.raises(ValueError):
+        make_grid("triangle")
+
+# Test streaming elements from the HTTP response
+def test_stream_data(config_dir):
+    body = json.dumps({"version": 0.6, "elements": [
+        {"type": "area", "id": 3600002202},
+        *restaurants(3),
+    ]}).encode("utf-8")
+    response = MagicMock()
+    response.raw = io.BytesIO(body)
+    session = MagicMock()
+    session.post.return_value = response
+    fetcher = OSMDataFetcher(config_path=str(config_dir), session=session)
+
+    elements = fetcher.stream_data("France", "restaurant")
+
+    assert session.post.call_args[1]["stream"] is True
+    assert [e["id"] for e in elements] == [0, 1, 2]
+    response.close.assert_called_once()
+    assert fetcher.area_ids.get(Region.country("FR")) == 3600002202
+
+# Test that a failed streaming request returns None
+def test_stream_data_failure(config_dir):
+    session = MagicMock()
+    session.post.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("504")
+    fetcher = OSMDataFetcher(config_path=str(config_dir), session=session)
+    assert fetcher.stream_data("France", "restaurant", max_retries=1) is None
+    assert fetcher.stream_data("Atlantis", "restaurant") is None
+
+# Test the --aggregate command on a saved file
+def test_main_aggregate_from_file(config_dir, monkeypatch):
+    monkeypatch.chdir(config_dir.parent)
+    DataSaver.save_json({"elements": list(restaurants(500))}, "data/france.json")
+    monkeypatch.setattr(sys, "argv", ["main.py", "--from-file", "data/france.json", "--type", "restaurant",
+                                      "--aggregate", "hex", "--cell-km", "25", "--stats-tags", "cuisine"])
+
+    main.main()
+
+    result = DataSaver.load_json(config_dir.parent / "data" / "france_filtered_restaurant_hex_aggregate.json")
+    assert result["location_type"] == "restaurant"
+    assert result["element_count"] == 500
+    assert result["grid"]["cell_km"] == 25
+    assert sum(c["count"] for c in result["grid"]["cells"]) == 500
+    assert set(result["tags"]["cuisine"]["values"]) == {"pizza", "french", "sushi"}
+
+    monkeypatch.setattr(sys, "argv", ["main.py", "--aggregate", "square", "--dedup"])
+    with pytest.raises(SystemExit):
+        main.main()
@@ -0,0 +1,158 @@
+# test_bbox_batch.py
+import pytest
+import json
+import requests
+from unittest.mock import MagicMock
+from src.bbox_batch import (PolylineIndex, corridor_bboxes, map_to_bboxes, merge_bboxes,
+                            pack_bboxes)
+from src.osm_data_fetcher import OSMDataFetcher
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / "country_codes.json").write_text("{}")
+    (config_dir / "location_types.json").write_text(json.dumps({
+        "cafe": {"description": "Cafes", "tags": [{"type": "primary", "conditions": [{"key": "amenity", "value": "cafe"}]}], "query_type": "center"}
+    }))
+    session = MagicMock()
+    return OSMDataFetcher(config_path=str(config_dir), session=session)
+
+
+def respond_with(session, *responses):
+    mocks = []
+    for elements in responses:
+        response = MagicMock()
+        response.json.return_value = {"elements": elements}
+        mocks.append(response)
+    session.post.side_effect = mocks
+
+
+# Test merging of overlapping boxes
+def test_merge_bboxes():
+    # A contained box and a heavily overlapping box merge into one
+    merged = merge_bboxes([(0, 0, 2, 2), (0.5, 0.5, 1, 1), (0, 1, 2, 3)])
+    assert merged == [(0.0, 0.0, 2.0, 3.0)]
+
+    # Diagonal boxes touching at a corner would enlarge the area and stay apart
+    assert len(merge_bboxes([(0, 0, 1, 1), (0.9, 0.9, 2, 2)])) == 2
+    # An L-shaped pair stays apart although the union is no larger than the two areas summed
+    assert len(merge_bboxes([(0, 0, 1, 2), (0, 1, 2, 2)])) == 2
+    # Disjoint boxes stay apart
+    assert len(merge_bboxes([(0, 0, 1, 1), (5, 5, 6, 6)])) == 2
+    assert merge_bboxes([]) == []
+
+# Test packing boxes under a cost limit
+def test_pack_bboxes():
+    batches = pack_bboxes(list(range(7)), lambda box: 10, 30)
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    # A box over the limit gets its own batch
+    assert pack_bboxes([1, 2], lambda box: 100, 30) == [[1], [2]]
+
+# Test covering a route with boxes
+def test_corridor_bboxes_cover_route():
+    route = [(48.0, 2.0), (48.1, 2.1), (48.1, 2.3)]
+    boxes = corridor_bboxes(route, 200)
+
+    # About 13 km and 15 km of route at 800 m per box
+    assert 25 <= len(boxes) <= 40
+    for lat, lon in route:
+        assert any(s <= lat <= n and w <= lon <= e for s, w, n, e in boxes)
+    # Boxes along the diagonal leg stay split; the east-west leg merges into one
+    merged = merge_bboxes(boxes)
+    assert 10 < len(merged) < len(boxes)
+
+# Test distances to a route
+def test_polyline_index_distance():
+    route = PolylineIndex([(0.0, 0.0), (0.0, 1.0)], 500)
+    assert route.distance_m(0.0, 0.5) == pytest.approx(0, abs=1e-6)
+    assert route.distance_m(0.003, 0.5) == pytest.approx(334, rel=0.01)
+    assert route.distance_m(0.01, 0.5) is None
+    assert route.distance_m(0.0, 1.004) == pytest.approx(445, rel=0.01)
+
+# Test mapping results back to the input boxes
+def test_map_to_bboxes():
+    boxes = [(0, 0, 1, 1), (0.5, 0.5, 2, 2), (5, 5, 6, 6)]
+    elements = [
+        {"type": "node", "id": 1, "lat": 0.2, "lon": 0.2},
+        {"type": "node", "id": 2, "lat": 0.7, "lon": 0.7},
+        # Outside every box
+        {"type": "node", "id": 3, "lat": 1.5, "lon": 0.2},
+        {"type": "way", "id": 4, "center": {"lat": 4.0, "lon": 4.5}},
+        {"type": "relation", "id": 5},
+        # Center outside every box, bounds reaching only the far box
+        {"type": "way", "id": 6, "center": {"lat": 4.5, "lon": 4.5},
+         "bounds": {"minlat": 3.0, "minlon": 3.0, "maxlat": 6.0, "maxlon": 6.0}},
+        # Center outside every box, bounds reaching no box
+        {"type": "way", "id": 7, "center": {"lat": 3.5, "lon": 3.5},
+         "bounds": {"minlat": 3.0, "minlon": 3.0, "maxlat": 4.0, "maxlon": 4.0}},
+    ]
+    mapped = map_to_bboxes(elements, boxes)
+    assert [[e["id"] for e in box] for box in mapped] == [[1, 2], [2], [6]]
+
+# Test fetching many boxes in one request
+def test_fetch_bboxes_single_round_trip(fetcher):
+    boxes = [(48.0 + i * 0.01, 2.0, 48.005 + i * 0.01, 2.005) for i in range(50)]
+    respond_with(fetcher.session, [
+        {"type": "node", "id": 1, "lat": 48.002, "lon": 2.002, "tags": {"amenity": "cafe"}},
+        {"type": "node", "id": 2, "lat": 48.492, "lon": 2.001, "tags": {"amenity": "cafe"}},
+    ])
+
+    results = fetcher.fetch_bboxes(boxes, "cafe")
+
+    assert fetcher.session.post.call_count == 1
+    query = fetcher.session.post.call_args[1]["data"]["data"]
+    assert query.count('node["amenity"="cafe"]') == 50
+    assert "(48.0,2.0,48.005,2.005)" in query
+    assert "out bb body;" in query
+    assert len(results) == 50
+    assert results[0]["bbox"] == boxes[0]
+    assert [e["id"] for e in results[0]["elements"]] == [1]
+    assert [e["id"] for e in results[49]["elements"]] == [2]
+    assert all(not r["elements"] for r in results[1:49])
+
+# Test that long batches are split across queries and merged without duplicates
+def test_fetch_bboxes_respects_query_length(fetcher):
+    boxes = [(float(i), 0.0, i + 0.5, 0.5) for i in range(10)]
+    duplicate = {"type": "node", "id": 1, "lat": 0.1, "lon": 0.1}
+    respond_with(fetcher.session, [duplicate], [duplicate], [], [], [], [])
+
+    results = fetcher.fetch_bboxes(boxes, "cafe", max_query_length=1000)
+
+    calls = fetcher.session.post.call_args_list
+    assert len(calls) > 1
+    assert all(len(c[1]["data"]["data"]) <= 1000 for c in calls)
+    assert sum(c[1]["data"]["data"].count('node["amenity"="cafe"]') for c in calls) == 10
+    assert [e["id"] for e in results[0]["elements"]] == [1]
+
+# Test that a failed query fails the whole fetch
+def test_fetch_bboxes_failure(fetcher):
+    fetcher.session.post.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("429")
+    assert fetcher.fetch_bboxes([(0, 0, 1, 1)], "cafe", max_retries=1) is None
+    assert fetcher.fetch_bboxes([(0, 0, 1, 1)], "unknown") is None
+
+# Test fetching along a route with true distance filtering
+def test_fetch_corridor(fetcher):
+    respond_with(fetcher.session, [
+        {"type": "node", "id": 1, "lat": 48.0005, "lon": 2.05},
+        {"type": "node", "id": 2, "lat": 48.004, "lon": 2.05},
+        {"type": "way", "id": 3, "center": {"lat": 47.9999, "lon": 2.01}},
+    ])
+
+    data = fetcher.fetch_corridor([(48.0, 2.0), (48.0, 2.1)], 100, "cafe")
+
+    assert fetcher.session.post.call_count == 1
+    assert sorted(e["id"] for e in data["elements"]) == [1, 3]
+
+# Test that ways fetched with bounds get a center and go to the box they reach
+def test_fetch_bboxes_way_bounds(fetcher):
+    way = {"type": "way", "id": 1, "bounds": {"minlat": 0.8, "minlon": 0.2, "maxlat": 1.4, "maxlon": 0.4}}
+    respond_with(fetcher.session, [way])
+
+    results = fetcher.fetch_bboxes([(0, 0, 1, 1), (5, 5, 6, 6)], "cafe")
+
+    assert results[0]["elements"][0]["center"] == {"lat": pytest.approx(1.1), "lon": pytest.approx(0.3)}
+    assert not results[1]["elements"]
+    # The (possibly shared) response is not modified
+    assert "center" not in way
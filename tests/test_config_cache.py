@@ -0,0 +1,73 @@
+# test_config_cache.py
+import pytest
+import os
+import json
+from src.config_cache import cache_path, load_config, validate_country_codes, validate_location_types
+from src.osm_data_fetcher import OSMDataFetcher
+
+
+@pytest.fixture
+def location_types_file(tmp_path):
+    path = tmp_path / "location_types.json"
+    path.write_text(json.dumps({
+        "cafe": {"description": "Cafes", "tags": [{"type": "primary", "conditions": [{"key": "amenity", "value": "cafe"}]}]}
+    }))
+    return path
+
+# Test that parsed configs are cached and reused
+def test_load_config_uses_cache(location_types_file):
+    value = load_config(location_types_file, validate_location_types)
+    assert value["cafe"]["description"] == "Cafes"
+    assert cache_path(location_types_file).exists()
+    assert cache_path(location_types_file).parent.name == ".cache"
+
+    # A cache hit does not parse the JSON file again
+    stat = location_types_file.stat()
+    location_types_file.write_text("not json but the same mtime and size"[:stat.st_size].ljust(stat.st_size))
+    os.utime(location_types_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_config(location_types_file, validate_location_types) == value
+
+# Test that changed files invalidate the cache
+def test_load_config_invalidated_by_mtime(location_types_file):
+    load_config(location_types_file)
+    location_types_file.write_text(json.dumps({"museum": {"tags": []}}))
+    stat = location_types_file.stat()
+    os.utime(location_types_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert list(load_config(location_types_file)) == ["museum"]
+
+# Test that a corrupt cache file is ignored
+def test_load_config_ignores_corrupt_cache(location_types_file):
+    load_config(location_types_file)
+    cache_path(location_types_file).write_bytes(b"\x00garbage")
+    assert "cafe" in load_config(location_types_file)
+
+# Test validation of the configuration structure
+def test_validation_errors(tmp_path):
+    validate_country_codes({"FR": "France"})
+    with pytest.raises(ValueError):
+        validate_country_codes(["FR"])
+    with pytest.raises(ValueError):
+        validate_location_types({"cafe": {"tags": [{"type": "primary"}]}})
+    validate_location_types({"church": {"tags": [], "dedup": {"distance_m": 75, "merge_unnamed": False}}})
+    with pytest.raises(ValueError, match="like"):
+        validate_location_types({"cafe": {"tags": [{"conditions": [{"key": "name", "op": "like", "value": "x"}]}]}})
+    for dedup in [{"distance": 75}, {"distance_m": -1}, {"name_similarity": 2}, {"merge_unnamed": "yes"}]:
+        with pytest.raises(ValueError):
+            validate_location_types({"church": {"tags": [], "dedup": dedup}})
+
+    path = tmp_path / "location_types.json"
+    path.write_text(json.dumps({"cafe": "not an object"}))
+    with pytest.raises(ValueError):
+        load_config(path, validate_location_types)
+    assert not cache_path(path).exists()
+    with pytest.raises(FileNotFoundError):
+        load_config(tmp_path / "missing.json")
+
+# Test that the fetcher loads its configuration through the cache
+def test_fetcher_uses_config_cache(tmp_path, location_types_file):
+    (tmp_path / "country_codes.json").write_text(json.dumps({"FR": "France"}))
+    fetcher = OSMDataFetcher(config_path=str(tmp_path))
+    assert fetcher.get_country_code("France") == "FR"
+    assert "cafe" in fetcher.location_types
+    assert cache_path(tmp_path / "country_codes.json").exists()
+    assert cache_path(location_types_file).exists()
@@ -0,0 +1,125 @@
+# test_conflation.py
+import pytest
+import json
+import time
+from src.conflation import deduplicate_elements
+from src.geometry import element_coordinates, haversine_m
+from src.osm_data_fetcher import OSMDataFetcher
+
+
+@pytest.fixture
+def church_elements():
+    return [
+        {"type": "node", "id": 1, "lat": 41.90210, "lon": 12.45390,
+         "tags": {"amenity": "place_of_worship", "religion": "christian", "name": "Santo Stefano degli Abissini"}},
+        {"type": "way", "id": 2, "center": {"lat": 41.90220, "lon": 12.45400},
+         "tags": {"building": "church", "name": "Chiesa di Santo Stefano degli Abissini", "wikidata": "Q1"}},
+        {"type": "node", "id": 3, "lat": 41.90225, "lon": 12.45395,
+         "tags": {"amenity": "place_of_worship", "name": "Sant'Anna"}},
+        {"type": "way", "id": 4, "bounds": {"minlat": 41.9034, "minlon": 12.4571, "maxlat": 41.9036, "maxlon": 12.4573},
+         "tags": {"building": "church"}},
+        {"type": "node", "id": 5, "lat": 41.90352, "lon": 12.45718,
+         "tags": {"amenity": "place_of_worship", "name": "Sant'Anna dei Palafrenieri"}},
+        {"type": "relation", "id": 6, "tags": {"name": "No location"}},
+    ]
+
+# Test element coordinate extraction and distances
+def test_element_coordinates():
+    assert element_coordinates({"lat": 1.0, "lon": 2.0}) == (1.0, 2.0)
+    assert element_coordinates({"center": {"lat": 3.0, "lon": 4.0}}) == (3.0, 4.0)
+    assert element_coordinates({"bounds": {"minlat": 0, "minlon": 0, "maxlat": 2, "maxlon": 4}}) == (1.0, 2.0)
+    assert element_coordinates({"id": 1}) is None
+    assert haversine_m(0, 0, 0, 1) == pytest.approx(111195, rel=1e-3)
+
+# Test merging of node and way duplicates
+def test_deduplicate_merges_duplicates(church_elements):
+    merged, merged_count = deduplicate_elements(church_elements, distance_m=50)
+
+    assert merged_count == 2
+    by_id = {e["id"]: e for e in merged}
+    assert sorted(by_id) == [2, 3, 5, 6]
+
+    # The more detailed way is kept and gains the node's tags
+    assert by_id[2]["tags"]["religion"] == "christian"
+    assert by_id[2]["tags"]["name"] == "Chiesa di Santo Stefano degli Abissini"
+    assert by_id[2]["duplicates"] == [{"type": "node", "id": 1}]
+    # An unnamed building merges with the nearby named node
+    assert by_id[5]["duplicates"] == [{"type": "way", "id": 4}]
+    # A nearby element with a different name is kept separate
+    assert "duplicates" not in by_id[3]
+    # The input is not modified
+    assert "duplicates" not in church_elements[1]
+
+# Test configurable thresholds
+def test_deduplicate_thresholds(church_elements):
+    assert deduplicate_elements(church_elements, distance_m=1)[1] == 0
+    assert deduplicate_elements(church_elements, merge_unnamed=False)[1] == 1
+    assert deduplicate_elements(church_elements, name_similarity=0.9)[1] == 1
+
+# Test that an unnamed element does not chain two differently named ones together
+def test_deduplicate_does_not_chain_names():
+    elements = [
+        {"type": "node", "id": 1, "lat": 48.0, "lon": 2.0, "tags": {"name": "Saint Mary"}},
+        {"type": "way", "id": 2, "center": {"lat": 48.0004, "lon": 2.0}, "tags": {"building": "church"}},
+        {"type": "node", "id": 3, "lat": 48.0008, "lon": 2.0, "tags": {"name": "Grace Baptist"}},
+    ]
+    merged, merged_count = deduplicate_elements(elements, distance_m=75)
+
+    assert merged_count == 1
+    names = sorted(e["tags"].get("name") for e in merged)
+    assert names == ["Grace Baptist", "Saint Mary"]
+
+# Test that names in non-Latin scripts are compared
+def test_deduplicate_non_latin_names():
+    elements = [
+        {"type": "node", "id": 1, "lat": 55.7446, "lon": 37.6055, "tags": {"name": "Храм Христа Спасителя"}},
+        {"type": "way", "id": 2, "center": {"lat": 55.7447, "lon": 37.6055},
+         "tags": {"building": "church", "name": "храм Христа Спасителя"}},
+        {"type": "node", "id": 3, "lat": 55.7446, "lon": 37.6056, "tags": {"name": "Церковь Николая"}},
+        {"type": "node", "id": 4, "lat": 35.0, "lon": 135.0, "tags": {"name": "Ἁγία Σοφία"}},
+        {"type": "node", "id": 5, "lat": 35.0001, "lon": 135.0, "tags": {"name": "Αγια Σοφια"}},
+    ]
+    merged, merged_count = deduplicate_elements(elements, distance_m=50)
+
+    assert merged_count == 2
+    assert sorted(e["id"] for e in merged) == [2, 3, 4]
+
+# Test that groups never grow wider than the distance threshold
+def test_deduplicate_does_not_chain_distance():
+    # Ten unnamed nodes in a row, 67 m apart
+    elements = [{"type": "node", "id": i, "lat": 48.0 + i * 0.0006, "lon": 2.0, "tags": {}} for i in range(10)]
+    merged, merged_count = deduplicate_elements(elements, distance_m=75)
+
+    assert len(merged) == 5
+    for element in merged:
+        ids = [element["id"]] + [d["id"] for d in element.get("duplicates", [])]
+        assert max(ids) - min(ids) <= 1
+
+# Test that settings are read from the location type configuration
+def test_fetcher_deduplicate_uses_config(tmp_path, church_elements):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    with open(config_dir / "location_types.json", 'w') as f:
+        json.dump({"church": {"tags": [], "dedup": {"distance_m": 50, "merge_unnamed": False}}}, f)
+    fetcher = OSMDataFetcher(config_path=str(config_dir))
+
+    data, merged_count = fetcher.deduplicate({"version": 0.6, "elements": church_elements}, "church")
+    assert merged_count == 1
+    assert len(data["elements"]) == 5
+    assert data["version"] == 0.6
+
+# Test near-linear scaling on a larger synthetic dataset
+def test_deduplicate_scales():
+    elements = []
+    for i in range(20000):
+        # Churches on a ~1 km grid, a quarter of them also mapped as buildings
+        lat, lon = 42 + (i // 200) * 0.01, 2 + (i % 200) * 0.01
+        elements.append({"type": "node", "id": i, "lat": lat, "lon": lon, "tags": {"name": f"Church {i}"}})
+        if i % 4 == 0:
+            elements.append({"type": "way", "id": i, "center": {"lat": lat + 0.0001, "lon": lon},
+                             "tags": {"building": "church"}})
+
+    start = time.perf_counter()
+    merged, merged_count = deduplicate_elements(elements)
+    assert merged_count == 5000
+    assert time.perf_counter() - start < 10
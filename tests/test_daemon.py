@@ -0,0 +1,137 @@
+# test_daemon.py
+import pytest
+import os
+import json
+import threading
+import urllib.request
+from urllib.error import HTTPError
+from unittest.mock import patch, MagicMock
+from src.daemon import FetchServer
+from src.osm_data_fetcher import OSMDataFetcher
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    with open(config_dir / "country_codes.json", 'w') as f:
+        json.dump({"FR": "France"}, f)
+    with open(config_dir / "location_types.json", 'w') as f:
+        json.dump({
+            "church": {
+                "description": "Christian places of worship",
+                "query_type": "center",
+                "tags": [{"type": "primary", "conditions": [{"key": "building", "value": "church"}]}]
+            }
+        }, f)
+    return config_dir
+
+@pytest.fixture
+def server(config_dir, tmp_path):
+    server = FetchServer(("127.0.0.1", 0), fetcher=OSMDataFetcher(config_path=str(config_dir)),
+                         data_dir=tmp_path / "data")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def request(server, path, job=None):
+    """Send a request to the server and return (status, JSON payload)."""
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    data = json.dumps(job).encode("utf-8") if job is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+# Test health and location type endpoints
+def test_health_and_types(server):
+    assert request(server, "/health") == (200, {"status": "ok"})
+    status, types = request(server, "/types")
+    assert status == 200
+    assert list(types) == ["church"]
+
+# Test a fetch job that saves its output
+@patch('requests.post')
+def test_fetch_job_saves_output(mock_post, server, tmp_path):
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"elements": [{"type": "node", "id": 1}]}
+    mock_post.return_value = mock_response
+
+    status, result = request(server, "/fetch", {"country": "France", "type": "church",
+                                                 "output_dir": "exports"})
+    assert status == 200
+    assert result["element_count"] == 1
+    assert result["output_path"].startswith(str(tmp_path / "data" / "exports"))
+    with open(result["output_path"], encoding="utf-8") as f:
+        assert json.load(f) == {"elements": [{"type": "node", "id": 1}]}
+
+    status, result = request(server, "/fetch", {"country": "France", "type": "church", "save": False})
+    assert status == 200
+    assert result["data"] == {"elements": [{"type": "node", "id": 1}]}
+
+# Test invalid jobs and failed fetches
+def test_invalid_and_failed_jobs(server):
+    assert request(server, "/fetch", {"country": "France"})[0] == 400
+    assert request(server, "/fetch", {"country": "Narnia", "type": "church"})[0] == 400
+    assert request(server, "/fetch", {"region": "planet:earth", "type": "church"})[0] == 400
+    assert request(server, "/missing")[0] == 404
+
+    # Fields of the wrong type are rejected instead of dropping the connection
+    for job in [{"type": ["church"], "country": "France"},
+                {"type": "church", "country": 5},
+                {"type": "church", "region": {"bbox": [0, 0, 1, 1]}},
+                {"type": "church", "country": "France", "compress": []}]:
+        status, result = request(server, "/fetch", job)
+        assert status == 400
+        assert "must be a string" in result["error"]
+
+    with patch.object(server.fetcher, "build_query", side_effect=ValueError("Unknown operator 'like'")):
+        status, result = request(server, "/fetch", {"country": "France", "type": "church"})
+        assert status == 500
+        assert "like" in result["error"]
+
+    with patch.object(server.fetcher, "_post_query", return_value=None) as post_query:
+        status, result = request(server, "/fetch", {"country": "France", "type": "castle"})
+        assert status == 400
+        assert "castle" in result["error"]
+        # Output directories outside the data directory are rejected
+        for output_dir in ["../outside", "/tmp", 7]:
+            job = {"country": "France", "type": "church", "output_dir": output_dir}
+            assert request(server, "/fetch", job)[0] == 400
+        post_query.assert_not_called()
+
+        assert request(server, "/fetch", {"country": "France", "type": "church"})[0] == 502
+
+    with patch.object(server.fetcher, "_post_query", return_value={"elements": []}), \
+            patch("src.daemon.DataSaver.save_json", side_effect=PermissionError("read-only")):
+        status, result = request(server, "/fetch", {"country": "France", "type": "church"})
+        assert status == 500
+        assert "read-only" in result["error"]
+
+# Test that configuration changes are picked up without restarting
+def test_config_hot_reload(server, config_dir):
+    location_types_file = config_dir / "location_types.json"
+    types = json.loads(location_types_file.read_text())
+    types["museum"] = {"description": "Museums", "query_type": "center", "tags": []}
+    location_types_file.write_text(json.dumps(types))
+    stat = location_types_file.stat()
+    os.utime(location_types_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    status, types = request(server, "/types")
+    assert sorted(types) == ["church", "museum"]
+
+# Test that an invalid configuration change keeps the previous configuration
+def test_config_reload_keeps_valid_config(server, config_dir):
+    location_types_file = config_dir / "location_types.json"
+    types = json.loads(location_types_file.read_text())
+    types["church"]["tags"][0]["conditions"][0]["op"] = "like"
+    location_types_file.write_text(json.dumps(types))
+    stat = location_types_file.stat()
+    os.utime(location_types_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    status, types = request(server, "/types")
+    assert status == 200
+    assert "op" not in types["church"]["tags"][0]["conditions"][0]
@@ -0,0 +1,91 @@
+# test_data_saver.py
+import pytest
+import gzip
+import json
+import src.data_saver
+from src.data_saver import DataSaver
+from src.geometry import geohash_bounds, geohash_encode
+
+
+@pytest.fixture
+def sample_data():
+    return {
+        "version": 0.6,
+        "elements": [
+            {"type": "node", "id": 1, "lat": 48.85, "lon": 2.35, "tags": {"name": "Notre-Dame de Paris"}},
+            {"type": "way", "id": 2, "center": {"lat": 43.6, "lon": 1.44}, "tags": {"building": "church"}},
+        ]
+    }
+
+# Test plain JSON round trip
+def test_save_and_load_plain(tmp_path, sample_data):
+    path = DataSaver.save_json(sample_data, tmp_path / "out" / "data.json")
+    assert path.exists()
+    assert json.loads(path.read_text(encoding="utf-8")) == sample_data
+    assert DataSaver.load_json(path) == sample_data
+
+# Test gzip output selected by extension
+def test_save_and_load_gzip(tmp_path, sample_data):
+    path = DataSaver.save_json(sample_data, tmp_path / "data.json.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert json.load(f) == sample_data
+    assert DataSaver.load_json(path) == sample_data
+
+# Test zstd output selected by extension
+def test_save_and_load_zstd(tmp_path, sample_data):
+    zstandard = pytest.importorskip("zstandard")
+    path = DataSaver.save_json(sample_data, tmp_path / "data.json.zst")
+    assert path.suffix == ".zst"
+    with open(path, "rb") as f:
+        assert json.loads(zstandard.ZstdDecompressor().stream_reader(f).read()) == sample_data
+    assert DataSaver.load_json(path) == sample_data
+
+# Test gzip fallback when zstandard is not installed
+def test_zstd_falls_back_to_gzip(tmp_path, sample_data, monkeypatch):
+    monkeypatch.setattr(src.data_saver, "_import_zstandard", lambda: None)
+    path = DataSaver.save_json(sample_data, tmp_path / "data.json.zst")
+    assert path.name == "data.json.gz"
+    assert DataSaver.load_json(path) == sample_data
+
+# Test that an index cannot be combined with compression
+def test_index_rejects_compressed_output(tmp_path, sample_data):
+    with pytest.raises(ValueError):
+        DataSaver.save_json(sample_data, tmp_path / "data.json.gz", index=True)
+
+# Test geohash encoding against known values
+def test_geohash_encode_and_bounds():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash_encode(48.8566, 2.3522, 5) == "u09tv"
+    south, west, north, east = geohash_bounds("u09tv")
+    assert south <= 48.8566 <= north and west <= 2.3522 <= east
+
+# Test geohash-partitioned output and its manifest
+def test_save_partitioned_geohash(tmp_path, sample_data):
+    sample_data["elements"].append({"type": "relation", "id": 3, "tags": {"name": "No location"}})
+    output_dir = DataSaver.save_partitioned(sample_data, tmp_path / "parts", precision=2, compression="gzip")
+
+    manifest = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["scheme"] == "geohash"
+    assert manifest["element_count"] == 3
+    by_key = {p["key"]: p for p in manifest["partitions"]}
+    assert sorted(by_key) == ["sp", "u0", "unlocated"]
+    assert by_key["u0"]["path"] == "geohash=u0/elements.json.gz"
+    assert by_key["u0"]["count"] == 1
+    assert by_key["u0"]["extent"] == [48.85, 2.35, 48.85, 2.35]
+    assert by_key["unlocated"]["bounds"] is None
+
+    part = DataSaver.load_json(output_dir / by_key["sp"]["path"])
+    assert part["version"] == 0.6
+    assert [e["id"] for e in part["elements"]] == [2]
+    assert [e["id"] for e in DataSaver.load_json(output_dir / by_key["unlocated"]["path"])["elements"]] == [3]
+
+# Test tile-partitioned output
+def test_save_partitioned_tile(tmp_path, sample_data):
+    output_dir = DataSaver.save_partitioned(sample_data, tmp_path / "parts", scheme="tile", precision=6)
+    manifest = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert [p["path"] for p in manifest["partitions"]] == ["x=32/y=22/elements.json", "x=32/y=23/elements.json"]
+    south, west, north, east = manifest["partitions"][0]["bounds"]
+    assert south <= 48.85 <= north and west <= 2.35 <= east
+
+    with pytest.raises(ValueError):
+        DataSaver.save_partitioned(sample_data, tmp_path / "bad", scheme="h3")
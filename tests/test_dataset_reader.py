@@ -0,0 +1,73 @@
+# test_dataset_reader.py
+import pytest
+import json
+from src.data_saver import DataSaver
+from src.dataset_reader import DatasetReader, load_manifest, read_partitions, select_partitions
+
+
+@pytest.fixture
+def sample_data():
+    return {
+        "version": 0.6,
+        "osm3s": {"copyright": "OpenStreetMap contributors"},
+        "elements": [
+            {"type": "node", "id": 30, "lat": 41.9, "lon": 12.45, "tags": {"name": "Sant'Anna"}},
+            {"type": "way", "id": 10, "center": {"lat": 41.9, "lon": 12.45}, "tags": {"building": "church"}},
+            {"type": "node", "id": 5, "lat": 41.91, "lon": 12.46, "tags": {"name": "Santo Stefano"}},
+        ]
+    }
+
+@pytest.fixture
+def indexed_file(tmp_path, sample_data):
+    return DataSaver.save_json(sample_data, tmp_path / "data.json", index=True)
+
+# Test that indexed output is byte-identical to the regular output
+def test_indexed_output_matches_plain_output(tmp_path, sample_data, indexed_file):
+    plain_file = DataSaver.save_json(sample_data, tmp_path / "plain.json")
+    assert indexed_file.read_bytes() == plain_file.read_bytes()
+    assert DataSaver.index_path(indexed_file).exists()
+
+# Test positional access and slicing
+def test_positional_access(indexed_file, sample_data):
+    with DatasetReader(indexed_file) as reader:
+        assert len(reader) == 3
+        assert reader[0] == sample_data["elements"][0]
+        assert reader[-1] == sample_data["elements"][2]
+        assert reader[1:] == sample_data["elements"][1:]
+        assert list(reader) == sample_data["elements"]
+        with pytest.raises(IndexError):
+            reader[3]
+
+# Test lookup by OSM type and id
+def test_get_by_id(indexed_file):
+    with DatasetReader(indexed_file) as reader:
+        assert reader.get("node", 5)["tags"]["name"] == "Santo Stefano"
+        assert reader.get("way", 10)["tags"]["building"] == "church"
+        assert reader.get("node", 10) is None
+        assert reader.get("relation", 1, default={}) == {}
+
+# Test empty element lists and missing indexes
+def test_empty_and_missing_index(tmp_path):
+    empty_file = DataSaver.save_json({"elements": []}, tmp_path / "empty.json", index=True)
+    assert json.loads(empty_file.read_text()) == {"elements": []}
+    with DatasetReader(empty_file) as reader:
+        assert len(reader) == 0
+        assert reader.get("node", 1) is None
+
+    plain_file = DataSaver.save_json({"elements": []}, tmp_path / "plain.json")
+    with pytest.raises(FileNotFoundError):
+        DatasetReader(plain_file)
+
+# Test pruning and parallel reading of partitioned output
+def test_read_partitions(tmp_path):
+    elements = [{"type": "node", "id": i, "lat": 40 + i * 0.5, "lon": 2 + i * 0.5} for i in range(20)]
+    elements.append({"type": "relation", "id": 99})
+    output_dir = DataSaver.save_partitioned({"elements": elements}, tmp_path / "parts", precision=4)
+
+    manifest = load_manifest(output_dir)
+    assert len(select_partitions(manifest)) == 21
+    assert sorted(e["id"] for e in read_partitions(output_dir, workers=2)) == list(range(20)) + [99]
+
+    bbox = (41.9, 3.9, 44.1, 6.1)
+    assert len(select_partitions(manifest, bbox)) == 5
+    assert sorted(e["id"] for e in read_partitions(output_dir, bbox=bbox, workers=2)) == [4, 5, 6, 7, 8]
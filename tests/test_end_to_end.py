@@ -24,8 +24,8 @@ class TestEndToEnd:
         # Create src directory
         src_dir = test_dir / "src"
         src_dir.mkdir()
-        shutil.copy("src/osm_data_fetcher.py", src_dir)
-        shutil.copy("src/data_saver.py", src_dir)
+        for module in Path("src").glob("*.py"):
+            shutil.copy(module, src_dir)
         
         # Create __init__.py in src directory
         with open(src_dir / "__init__.py", "w") as f:
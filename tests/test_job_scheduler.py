@@ -0,0 +1,116 @@
+# test_job_scheduler.py
+import pytest
+import time
+import threading
+from src.job_scheduler import BatchScheduler, JobHistory, predicted_makespan, DEFAULT_DURATION
+
+
+class FakeFetcher:
+    """Fetcher stand-in whose jobs take a configured time."""
+
+    def __init__(self, cache_path, durations):
+        self.cache_path = cache_path
+        self.durations = durations
+        self.started = []
+        self.timeouts = {}
+        self._lock = threading.Lock()
+
+    def fetch_data(self, country_name, location_type, timeout=300):
+        with self._lock:
+            self.started.append((country_name, location_type))
+            self.timeouts[(country_name, location_type)] = timeout
+        time.sleep(self.durations.get((country_name, location_type), 0.01))
+        if country_name == "Narnia":
+            return None, None
+        if country_name == "Atlantis":
+            raise OSError("Disk full")
+        return {"elements": [{"id": 1}, {"id": 2}]}, "XX"
+
+@pytest.fixture
+def history(tmp_path):
+    history = JobHistory(tmp_path / "job_history.json")
+    history.record("France", "restaurant", 200.0, 50000)
+    history.record("France", "church", 40.0, 40000)
+    history.record("Italy", "church", 60.0, 60000)
+    return history
+
+# Test history predictions and fallbacks
+def test_history_predictions(history):
+    assert history.predict_duration("france", "restaurant") == 200.0
+    # Unknown countries use the median of the same type elsewhere
+    assert history.predict_duration("Spain", "church") == 50.0
+    # Unknown types use the median of all jobs
+    assert history.predict_duration("Spain", "museum") == 60.0
+    assert JobHistory("missing.json").predict_duration("France", "church") == DEFAULT_DURATION
+
+    history.record("France", "church", 80.0, 41000)
+    assert history.get("France", "church") == {"duration": 60.0, "elements": 41000, "runs": 2}
+
+# Test that the history is persisted
+def test_history_save_and_load(history, tmp_path):
+    history.save()
+    assert JobHistory(tmp_path / "job_history.json").get("Italy", "church")["elements"] == 60000
+
+# Test longest-first planning and timeouts
+def test_plan_orders_longest_first(history, tmp_path):
+    scheduler = BatchScheduler(FakeFetcher(tmp_path, {}), history, workers=2, min_timeout=180)
+    planned = scheduler.plan([("France", "church"), ("Italy", "church"), ("France", "restaurant")])
+    assert [(job["country"], job["type"]) for job in planned] == [
+        ("France", "restaurant"), ("Italy", "church"), ("France", "church")
+    ]
+    assert [job["timeout"] for job in planned] == [600, 180, 180]
+    assert scheduler.timeout_for("Spain", "church") == 180
+
+# Test LPT makespan simulation
+def test_predicted_makespan():
+    assert predicted_makespan([5, 4, 3, 3, 3], 2) == 10
+    assert predicted_makespan([5, 4, 3], 1) == 12
+    assert predicted_makespan([], 3) == 0
+
+# Test running a batch and recording history
+def test_run_batch(tmp_path):
+    history = JobHistory(tmp_path / "job_history.json")
+    history.record("France", "restaurant", 0.3, 10)
+    history.record("France", "church", 0.1, 10)
+    history.record("Italy", "church", 0.1, 10)
+    fetcher = FakeFetcher(tmp_path, {("France", "restaurant"): 0.3, ("France", "church"): 0.1,
+                                     ("Italy", "church"): 0.1})
+    results = []
+    scheduler = BatchScheduler(fetcher, history, workers=2)
+
+    report = scheduler.run(
+        [("France", "church"), ("Italy", "church"), ("France", "restaurant"), ("Narnia", "church")],
+        on_result=lambda country, loc_type, data: results.append((country, loc_type)),
+    )
+
+    assert fetcher.started[0] == ("France", "restaurant")
+    assert sorted(results) == [("France", "church"), ("France", "restaurant"), ("Italy", "church")]
+    assert report["predicted_makespan"] == pytest.approx(0.3)
+    assert 0.3 <= report["actual_makespan"] < 2
+    assert [job["ok"] for job in report["jobs"] if job["country"] == "Narnia"] == [False]
+    assert JobHistory(tmp_path / "job_history.json").get("France", "restaurant")["runs"] == 2
+    assert history.get("Narnia", "church") is None
+
+# Test that failing jobs are reported and the history of the others is saved
+def test_run_batch_with_exceptions(tmp_path):
+    history_path = tmp_path / "job_history.json"
+    fetcher = FakeFetcher(tmp_path, {})
+    scheduler = BatchScheduler(fetcher, JobHistory(history_path), workers=2)
+
+    def on_result(country, loc_type, data):
+        if loc_type == "museum":
+            raise ValueError("Cannot save")
+
+    report = scheduler.run([("France", "church"), ("Atlantis", "church"), ("France", "museum")],
+                           on_result=on_result)
+
+    jobs = {(job["country"], job["type"]): job for job in report["jobs"]}
+    assert jobs["France", "church"]["ok"]
+    assert not jobs["Atlantis", "church"]["ok"]
+    assert jobs["Atlantis", "church"]["error"] == "OSError: Disk full"
+    assert not jobs["France", "museum"]["ok"]
+    assert "Cannot save" in jobs["France", "museum"]["error"]
+    saved = JobHistory(history_path)
+    assert saved.get("France", "church")["runs"] == 1
+    assert saved.get("France", "museum")["runs"] == 1
+    assert saved.get("Atlantis", "church") is None
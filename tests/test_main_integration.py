@@ -152,4 +152,25 @@ def test_data_saver_called_with_correct_data():
         mock_save_json.assert_called_once()
         call_args = mock_save_json.call_args
         assert call_args[0][0] == test_data
-        assert expected_file_pattern in call_args[0][1]
\ No newline at end of file
+        assert expected_file_pattern in call_args[0][1]
+
+# Test that invalid arguments are rejected before the fetcher is imported
+@pytest.mark.parametrize("argv, message", [
+    (["--type", "nonexistent"], "unknown location type 'nonexistent'"),
+    (["--country", "Atlantis"], "unknown country 'Atlantis'"),
+    (["--batch", "--types", "church", "nonexistent"], "unknown location type 'nonexistent'"),
+    (["--index", "--compress", "gzip"], "--index cannot be combined with --compress"),
+    (["--workers", "0"], "--workers must be at least 1"),
+    (["--diff", "missing_old.json", "missing_new.json"], "missing_old.json does not exist"),
+])
+def test_main_validates_arguments_early(setup_config_files, monkeypatch, capsys, argv, message):
+    monkeypatch.chdir(setup_config_files)
+    monkeypatch.setattr(sys, "argv", ["main.py", *argv])
+    monkeypatch.delitem(sys.modules, "src.osm_data_fetcher", raising=False)
+
+    with pytest.raises(SystemExit) as exc_info:
+        main.main()
+
+    assert exc_info.value.code == 2
+    assert message in capsys.readouterr().err
+    assert "src.osm_data_fetcher" not in sys.modules
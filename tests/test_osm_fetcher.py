@@ -1,6 +1,8 @@
 # test_osm_fetcher_updated.py
 import pytest
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 from src.osm_data_fetcher import OSMDataFetcher
@@ -118,4 +120,22 @@ def test_fetch_data_error(mock_post, mock_fetcher):
 def test_fetch_data_nonexistent_country(mock_fetcher):
     data, country_code = mock_fetcher.fetch_data("Nonexistent Country", "church")
     assert data is None
-    assert country_code is None
\ No newline at end of file
+    assert country_code is None
+
+# Test that concurrent identical fetches share one API request
+@patch('requests.post')
+def test_fetch_data_concurrent_requests_deduplicated(mock_post, mock_fetcher):
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"elements": [{"id": 1}]}
+
+    def slow_post(*args, **kwargs):
+        time.sleep(0.2)
+        return mock_response
+
+    mock_post.side_effect = slow_post
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: mock_fetcher.fetch_data("Netherlands", "church"), range(4)))
+
+    mock_post.assert_called_once()
+    assert all(data == {"elements": [{"id": 1}]} and code == "NL" for data, code in results)
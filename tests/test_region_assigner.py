@@ -0,0 +1,137 @@
+# test_region_assigner.py
+import json
+import math
+import random
+from unittest.mock import MagicMock
+from src.osm_data_fetcher import OSMDataFetcher
+from src.region_assigner import PreparedPolygon, RegionIndex, assign_regions, load_region_index
+
+
+def square(min_x, min_y, max_x, max_y):
+    return [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y), (min_x, min_y)]
+
+
+def star(cx, cy, radius, points=400, seed=0):
+    """Irregular ring with many vertices."""
+    rng = random.Random(seed)
+    ring = []
+    for step in range(points):
+        angle = step / points * 6.283185307
+        r = radius * rng.uniform(0.5, 1.0)
+        ring.append((cx + r * math.cos(angle), cy + r * math.sin(angle)))
+    ring.append(ring[0])
+    return ring
+
+
+def boundary_relation(osm_id, name, ring, iso=None):
+    tags = {"boundary": "administrative", "admin_level": "4", "name": name}
+    if iso:
+        tags["ISO3166-2"] = iso
+    return {"type": "relation", "id": osm_id, "tags": tags,
+            "members": [{"type": "way", "role": "outer",
+                         "geometry": [{"lon": x, "lat": y} for x, y in ring]}]}
+
+
+# Test that the prepared grid test agrees with plain ray casting
+def test_prepared_polygon_matches_exact_test():
+    rings = [star(0, 0, 10), square(-1, -1, 1, 1)]  # with a hole
+    polygon = PreparedPolygon(rings)
+    assert polygon.size > 1
+
+    rng = random.Random(1)
+    for _ in range(5000):
+        x, y = rng.uniform(-11, 11), rng.uniform(-11, 11)
+        assert polygon.contains(x, y) == polygon.contains_exact(x, y)
+
+    assert not polygon.contains(0, 0)
+    assert polygon.contains(2, 2)
+    assert not polygon.contains(50, 50)
+
+# Test a cell whose center lies exactly on a vertex of the polygon
+def test_prepared_polygon_center_on_boundary():
+    # A single grid cell centered on the notch vertex (4, 4)
+    polygon = PreparedPolygon([[(0, 0), (8, 0), (8, 8), (4, 4), (0, 8), (0, 0)]])
+    assert polygon.size == 1
+    assert (0, 0) in polygon.cell_reference
+
+    # Points offset so none lies on an edge
+    for i in range(16):
+        for j in range(16):
+            x, y = 0.3 + i * 0.5, 0.15 + j * 0.5
+            assert polygon.contains(x, y) == polygon.contains_exact(x, y)
+
+# Test looking up regions in the spatial index
+def test_region_index_lookup():
+    data = {"elements": [
+        boundary_relation(1, "West", square(0, 0, 10, 10), iso="XX-W"),
+        boundary_relation(2, "East", square(10, 0, 20, 10), iso="XX-E"),
+        {"type": "relation", "id": 3, "tags": {"name": "No geometry"}, "members": []},
+    ]}
+    index = RegionIndex.from_overpass(data)
+
+    assert len(index.regions) == 2
+    assert index.lookup(5, 5) == {"id": 1, "name": "West", "ISO3166-2": "XX-W"}
+    assert index.lookup(15, 5)["name"] == "East"
+    assert index.lookup(25, 5) is None
+    assert RegionIndex([]).lookup(0, 0) is None
+
+# Test assigning regions to elements in place
+def test_assign_regions():
+    index = RegionIndex([({"id": 1, "name": "West"}, [square(0, 0, 10, 10)]),
+                         ({"id": 2, "name": "East"}, [square(10, 0, 20, 10)])])
+    elements = [
+        {"type": "node", "id": 1, "lat": 5, "lon": 5},
+        {"type": "way", "id": 2, "center": {"lat": 5, "lon": 15}},
+        {"type": "node", "id": 3, "lat": 50, "lon": 50},
+        {"type": "relation", "id": 4},
+    ]
+
+    assigned = assign_regions(elements, index, "admin_level_4", batch_size=2)
+
+    assert assigned == 2
+    assert elements[0]["regions"] == {"admin_level_4": {"id": 1, "name": "West"}}
+    assert elements[1]["regions"]["admin_level_4"]["name"] == "East"
+    assert "regions" not in elements[2]
+    assert "regions" not in elements[3]
+
+# Test the process pool gives the same result
+def test_assign_regions_with_workers():
+    index = RegionIndex([({"id": 1, "name": "Star"}, [star(0, 0, 10)])])
+    rng = random.Random(2)
+    elements = [{"type": "node", "id": i, "lat": rng.uniform(-10, 10), "lon": rng.uniform(-10, 10)}
+                for i in range(400)]
+    serial = [dict(e) for e in elements]
+
+    assign_regions(serial, index, "level")
+    assign_regions(elements, index, "level", workers=2, batch_size=100)
+
+    assert [e.get("regions") for e in elements] == [e.get("regions") for e in serial]
+
+# Test that boundaries are fetched once and then read from the cache
+def test_load_region_index_caches_boundaries(tmp_path):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / "country_codes.json").write_text(json.dumps({"TL": "Testland"}))
+    (config_dir / "location_types.json").write_text("{}")
+
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"elements": [
+        {"type": "area", "id": 3600000001},
+        boundary_relation(1, "West", square(0, 0, 10, 10)),
+    ]}
+    session = MagicMock()
+    session.post.return_value = mock_response
+    fetcher = OSMDataFetcher(config_path=str(config_dir), session=session)
+
+    index = load_region_index(fetcher, "Testland", 4)
+    assert index.lookup(5, 5)["name"] == "West"
+    query = session.post.call_args[1]["data"]["data"]
+    assert '["admin_level"="4"](area.searchArea)' in query
+    assert "out geom;" in query
+    assert (tmp_path / "cache" / "boundaries" / "tl_admin4.json.gz").exists()
+
+    index = load_region_index(fetcher, "Testland", 4)
+    assert index.lookup(5, 5)["name"] == "West"
+    assert session.post.call_count == 1
+
+    assert load_region_index(fetcher, "Nowhere", 4) is None
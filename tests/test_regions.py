@@ -0,0 +1,94 @@
+# test_regions.py
+import pytest
+import json
+from unittest.mock import patch, MagicMock
+from src.osm_data_fetcher import OSMDataFetcher
+from src.regions import AreaIdCache, Region, AREA_ID_OFFSET
+
+
+@pytest.fixture
+def mock_fetcher(tmp_path):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    with open(config_dir / "country_codes.json", 'w') as f:
+        json.dump({"US": "United States", "DE": "Germany"}, f)
+    with open(config_dir / "location_types.json", 'w') as f:
+        json.dump({
+            "museum": {
+                "description": "Museums",
+                "query_type": "center",
+                "tags": [{"type": "primary", "conditions": [{"key": "tourism", "value": "museum"}]}]
+            }
+        }, f)
+    return OSMDataFetcher(config_path=str(config_dir))
+
+# Test parsing region specifications
+def test_parse_regions():
+    assert Region.parse("country:fr") == Region.country("FR")
+    assert Region.parse("subdivision:us-ca").area_filter() == '["ISO3166-2"="US-CA"]'
+    assert Region.parse("admin:4:Bavaria") == Region.admin("Bavaria", 4)
+    assert Region.parse("admin:Île-de-France").admin_level is None
+    assert Region.parse("relation:62422").known_area_id() == AREA_ID_OFFSET + 62422
+    assert Region.parse("bbox:48.1,11.4,48.2,11.6").value == (48.1, 11.4, 48.2, 11.6)
+    for spec in ["FR", "planet:earth", "bbox:1,2,3"]:
+        with pytest.raises(ValueError):
+            Region.parse(spec)
+
+# Test area filters and labels
+def test_area_filter_and_label():
+    region = Region.admin('Saint "Martin"', 8)
+    assert region.area_filter() == '["boundary"="administrative"]["admin_level"="8"]["name"="Saint \\"Martin\\""]'
+    assert Region.subdivision("US-CA").label == "subdivision_us-ca"
+    assert Region.bbox(1, 2, 3, 4).area_filter() is None
+
+# Test query building for different region kinds
+def test_build_query_for_regions(mock_fetcher):
+    query = mock_fetcher.build_query(Region.subdivision("US-CA"), "museum")
+    assert 'area["ISO3166-2"="US-CA"]->.searchArea;' in query
+    assert '.searchArea out ids;' in query
+    assert 'node["tourism"="museum"](area.searchArea);' in query
+
+    query = mock_fetcher.build_query(Region.relation(62422), "museum")
+    assert f'area(id:{AREA_ID_OFFSET + 62422})->.searchArea;' in query
+    assert 'out ids' not in query
+
+    query = mock_fetcher.build_query(Region.bbox(48.1, 11.4, 48.2, 11.6), "museum")
+    assert 'searchArea' not in query
+    assert 'node["tourism"="museum"](48.1,11.4,48.2,11.6);' in query
+
+# Test that resolved area ids are cached and reused
+@patch('requests.post')
+def test_area_id_cached_after_fetch(mock_post, mock_fetcher, tmp_path):
+    mock_response = MagicMock()
+    mock_response.json.return_value = {
+        "elements": [{"type": "area", "id": 3600062428}, {"type": "node", "id": 1}]
+    }
+    mock_post.return_value = mock_response
+
+    data = mock_fetcher.fetch_region(Region.subdivision("US-CA"), "museum")
+    assert data["elements"] == [{"type": "node", "id": 1}]
+
+    query = mock_fetcher.build_query(Region.subdivision("US-CA"), "museum")
+    assert 'area(id:3600062428)->.searchArea;' in query
+
+    # The cache persists for new fetchers using the same cache directory
+    reloaded = AreaIdCache(tmp_path / "cache" / "area_ids.json")
+    assert reloaded.get(Region.subdivision("US-CA")) == 3600062428
+
+    # Country fetches share the cache
+    mock_response.json.return_value = {"elements": [{"type": "area", "id": 3600051477}]}
+    mock_fetcher.fetch_data("Germany", "museum")
+    assert 'area(id:3600051477)' in mock_fetcher.build_query("DE", "museum")
+
+# Test that ambiguous area matches are not cached
+@patch('requests.post')
+def test_ambiguous_area_not_cached(mock_post, mock_fetcher):
+    mock_response = MagicMock()
+    mock_response.json.return_value = {
+        "elements": [{"type": "area", "id": 3600000001}, {"type": "area", "id": 3600000002}]
+    }
+    mock_post.return_value = mock_response
+
+    data = mock_fetcher.fetch_region(Region.admin("Springfield"), "museum")
+    assert data["elements"] == []
+    assert mock_fetcher.area_ids.get(Region.admin("Springfield")) is None
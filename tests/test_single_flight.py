@@ -0,0 +1,110 @@
+# test_single_flight.py
+import pytest
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.single_flight import SingleFlight, fcntl
+
+
+def run_concurrently(callables):
+    """Start all callables at the same time and return their results."""
+    barrier = threading.Barrier(len(callables))
+
+    def run(fn):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=len(callables)) as executor:
+        return list(executor.map(run, callables))
+
+# Test that concurrent identical calls share a single execution
+def test_concurrent_calls_share_result():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"elements": [1, 2, 3]}
+
+    results = run_concurrently([lambda: flight.do("query", fetch)] * 5)
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+# Test that different keys and sequential calls are not deduplicated
+def test_distinct_and_sequential_calls_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        time.sleep(0.1)
+        return key
+
+    results = run_concurrently([lambda: flight.do("a", lambda: fetch("a")),
+                                lambda: flight.do("b", lambda: fetch("b"))])
+    assert results == ["a", "b"]
+    assert flight.do("a", lambda: fetch("a")) == "a"
+    assert sorted(calls) == ["a", "a", "b"]
+
+# Test that errors are propagated to every waiting caller
+def test_errors_are_shared():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("API Error")
+
+    def call():
+        try:
+            flight.do("query", fail)
+        except RuntimeError as e:
+            return str(e)
+
+    assert run_concurrently([call] * 3) == ["API Error"] * 3
+
+# Test cross-process sharing through the lock directory
+@pytest.mark.skipif(fcntl is None, reason="File locks require fcntl")
+def test_lock_dir_shares_result_between_instances(tmp_path):
+    # Separate instances behave like separate processes: they only share the lock dir
+    first, second = SingleFlight(tmp_path), SingleFlight(tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.3)
+        return {"elements": [{"id": 1}]}
+
+    def delayed_second():
+        time.sleep(0.1)
+        return second.do("query", fetch)
+
+    results = run_concurrently([lambda: first.do("query", fetch), delayed_second])
+
+    assert len(calls) == 1
+    assert results[0] == results[1] == {"elements": [{"id": 1}]}
+
+# Test that shared results are removed once expired while lock files are kept
+@pytest.mark.skipif(fcntl is None, reason="File locks require fcntl")
+def test_lock_dir_removes_expired_results(tmp_path):
+    flight = SingleFlight(tmp_path, result_ttl=60)
+    flight.do("old", lambda: {"elements": [1]})
+    old_files = list(tmp_path.iterdir())
+    assert sorted(p.suffix for p in old_files) == [".json", ".lock"]
+
+    # Age the files of the first call past the TTL
+    expired = time.time() - 120
+    for path in old_files:
+        os.utime(path, (expired, expired))
+
+    # Cleanup runs at most once per TTL interval
+    flight.do("new", lambda: {"elements": [2]})
+    assert all(path.exists() for path in old_files)
+
+    flight._next_cleanup = 0
+    flight.do("other", lambda: None)
+    assert [p.suffix for p in old_files if p.exists()] == [".lock"]
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    assert len(list(tmp_path.glob("*.lock"))) == 3
@@ -0,0 +1,73 @@
+# test_snapshot_diff.py
+import pytest
+import json
+from src.data_saver import DataSaver
+from src.dataset_reader import iter_elements
+from src.snapshot_diff import diff_snapshots, write_diff
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    old = {
+        "version": 0.6,
+        "elements": [
+            {"type": "node", "id": 1, "lat": 48.85, "lon": 2.35, "tags": {"name": "Notre-Dame", "religion": "christian"}},
+            {"type": "node", "id": 2, "lat": 48.86, "lon": 2.34, "tags": {"name": "Saint-Eustache"}},
+            {"type": "way", "id": 2, "center": {"lat": 48.87, "lon": 2.33}, "tags": {"building": "church"}},
+            {"type": "node", "id": 3, "lat": 48.88, "lon": 2.32, "tags": {"name": "Demolished"}},
+        ]
+    }
+    new = {
+        "version": 0.6,
+        "elements": [
+            {"type": "way", "id": 2, "center": {"lat": 48.87, "lon": 2.33}, "tags": {"building": "church"}},
+            {"type": "node", "id": 1, "lat": 48.85, "lon": 2.35,
+             "tags": {"name": "Notre-Dame de Paris", "wikidata": "Q2981"}},
+            {"type": "node", "id": 2, "lat": 48.8601, "lon": 2.34, "tags": {"name": "Saint-Eustache"}},
+            {"type": "node", "id": 4, "lat": 48.89, "lon": 2.31, "tags": {"name": "Sacré-Cœur"}},
+        ]
+    }
+    old_file = DataSaver.save_json(old, tmp_path / "old.json")
+    new_file = DataSaver.save_json(new, tmp_path / "new.json.gz")
+    return old_file, new_file
+
+# Test streaming elements from plain and compressed files
+def test_iter_elements(snapshots):
+    old_file, new_file = snapshots
+    assert [e["id"] for e in iter_elements(old_file, chunk_size=7)] == [1, 2, 2, 3]
+    assert [e["id"] for e in iter_elements(new_file)] == [2, 1, 2, 4]
+
+# Test that changes are detected regardless of partitioning and order
+@pytest.mark.parametrize("partitions", [1, 3, 16])
+def test_diff_snapshots(snapshots, partitions):
+    stats = {}
+    changes = {(c["action"], c["type"], c["id"]): c for c in diff_snapshots(*snapshots, partitions=partitions, stats=stats)}
+
+    assert sorted(changes) == [
+        ("added", "node", 4),
+        ("modified", "node", 1),
+        ("modified", "node", 2),
+        ("removed", "node", 3),
+    ]
+    assert stats == {"added": 1, "removed": 1, "modified": 2, "unchanged": 1}
+
+    renamed = changes[("modified", "node", 1)]
+    assert renamed["tags"] == {
+        "added": {"wikidata": "Q2981"},
+        "removed": {"religion": "christian"},
+        "changed": {"name": ["Notre-Dame", "Notre-Dame de Paris"]},
+    }
+    assert renamed["changed_fields"] == []
+
+    moved = changes[("modified", "node", 2)]
+    assert moved["changed_fields"] == ["lat"]
+    assert moved["tags"] == {"added": {}, "removed": {}, "changed": {}}
+    assert changes[("removed", "node", 3)]["element"]["tags"]["name"] == "Demolished"
+
+# Test writing the diff as JSON lines
+def test_write_diff(snapshots, tmp_path):
+    stats = write_diff(*snapshots, tmp_path / "diff" / "changes.jsonl")
+    lines = (tmp_path / "diff" / "changes.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 4
+    assert {json.loads(line)["action"] for line in lines} == {"added", "removed", "modified"}
+    assert stats["unchanged"] == 1
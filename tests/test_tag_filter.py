@@ -0,0 +1,115 @@
+# test_tag_filter.py
+import pytest
+import json
+from src.osm_data_fetcher import OSMDataFetcher
+from src.tag_filter import CompiledCondition, TagMatcher
+
+
+@pytest.fixture
+def sample_location_types():
+    return {
+        "restaurant": {
+            "description": "Restaurants with a cuisine, excluding fast food chains",
+            "query_type": "center",
+            "tags": [
+                {
+                    "type": "primary",
+                    "conditions": [
+                        {"key": "amenity", "value": "restaurant"},
+                        {"key": "cuisine", "op": "exists"},
+                        {"key": "brand", "op": "not_exists"}
+                    ]
+                },
+                {
+                    "type": "alternative",
+                    "conditions": [
+                        {"key": "amenity", "op": "~", "value": "^(cafe|bistro)$", "case_insensitive": True},
+                        {"key": "capacity", "op": "between", "value": [10, 200]}
+                    ]
+                }
+            ]
+        }
+    }
+
+@pytest.fixture
+def mock_fetcher(tmp_path, sample_location_types):
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    with open(config_dir / "country_codes.json", 'w') as f:
+        json.dump({"FR": "France"}, f)
+    with open(config_dir / "location_types.json", 'w') as f:
+        json.dump(sample_location_types, f)
+    return OSMDataFetcher(config_path=str(config_dir))
+
+# Test Overpass QL generated for each operator
+@pytest.mark.parametrize("condition,expected", [
+    ({"key": "building", "value": "church"}, '["building"="church"]'),
+    ({"key": "protect_class", "value": 2}, '["protect_class"="2"]'),
+    ({"key": "access", "op": "!=", "value": "private"}, '["access"!="private"]'),
+    ({"key": "name", "op": "~", "value": "^St"}, '["name"~"^St"]'),
+    ({"key": "name", "op": "~", "value": "church", "case_insensitive": True}, '["name"~"church",i]'),
+    ({"key": "religion", "op": "!~", "value": "muslim|jewish"}, '["religion"!~"muslim|jewish"]'),
+    ({"key": "wikidata", "op": "exists"}, '["wikidata"]'),
+    ({"key": "disused", "op": "not_exists"}, '[!"disused"]'),
+    ({"key": "capacity", "op": ">=", "value": 50}, '["capacity"](if:number(t["capacity"])>=50)'),
+    ({"key": "ele", "op": "between", "value": [0, 1.5]},
+     '["ele"](if:number(t["ele"])>=0&&number(t["ele"])<=1.5)'),
+])
+def test_condition_overpass(condition, expected):
+    assert CompiledCondition(condition).overpass == expected
+
+# Test local matching for each operator
+def test_condition_matching():
+    tags = {"name": "St Mary", "capacity": "120", "religion": "christian"}
+    assert CompiledCondition({"key": "religion", "value": "christian"}).match(tags)
+    assert CompiledCondition({"key": "access", "op": "!=", "value": "private"}).match(tags)
+    assert CompiledCondition({"key": "name", "op": "~", "value": "mary", "case_insensitive": True}).match(tags)
+    assert not CompiledCondition({"key": "name", "op": "~", "value": "mary"}).match(tags)
+    assert CompiledCondition({"key": "denomination", "op": "!~", "value": "catholic"}).match(tags)
+    assert CompiledCondition({"key": "capacity", "op": ">", "value": 100}).match(tags)
+    assert not CompiledCondition({"key": "capacity", "op": "between", "value": [0, 100]}).match(tags)
+    assert not CompiledCondition({"key": "name", "op": "<", "value": 5}).match(tags)
+
+    # Only plain decimal numbers compare, as with Overpass number()
+    at_least_one = CompiledCondition({"key": "capacity", "op": ">=", "value": 1})
+    for value in ["5", "-2.5e3", "+7", ".5", "12."]:
+        assert at_least_one.match({"capacity": value}) == (float(value) >= 1)
+    for value in ["1_000", " 5 ", "inf", "nan", "0x10", ""]:
+        assert not at_least_one.match({"capacity": value})
+
+# Test invalid conditions
+@pytest.mark.parametrize("condition", [
+    {"key": "name", "op": "like", "value": "x"},
+    {"key": "name", "op": "="},
+    {"key": "capacity", "op": ">", "value": "many"},
+    {"key": "capacity", "op": "between", "value": [1]},
+    {"key": "capacity", "op": ">", "value": "inf"},
+    {"key": "name", "op": "~", "value": "(unclosed"},
+])
+def test_invalid_conditions(condition):
+    with pytest.raises(ValueError):
+        CompiledCondition(condition)
+
+# Test that the query and the local matcher come from the same definition
+def test_query_and_local_matcher(mock_fetcher):
+    query = mock_fetcher.build_query("FR", "restaurant")
+    assert 'node["amenity"="restaurant"]["cuisine"][!"brand"](area.searchArea);' in query
+    assert ('way["amenity"~"^(cafe|bistro)$",i]["capacity"]'
+            '(if:number(t["capacity"])>=10&&number(t["capacity"])<=200)(area.searchArea);') in query
+
+    elements = [
+        {"id": 1, "tags": {"amenity": "restaurant", "cuisine": "french"}},
+        {"id": 2, "tags": {"amenity": "restaurant", "cuisine": "burger", "brand": "Chain"}},
+        {"id": 3, "tags": {"amenity": "Cafe", "capacity": "40"}},
+        {"id": 4, "tags": {"amenity": "cafe", "capacity": "400"}},
+        {"id": 5},
+    ]
+    filtered = mock_fetcher.filter_elements({"version": 0.6, "elements": elements}, "restaurant")
+    assert [e["id"] for e in filtered["elements"]] == [1, 3]
+    assert filtered["version"] == 0.6
+    assert mock_fetcher.filter_elements({"elements": elements}, "unknown") is None
+    assert mock_fetcher.get_tag_matcher("restaurant") is mock_fetcher.get_tag_matcher("restaurant")
+
+# Test bulk filtering with an empty type definition
+def test_matcher_without_tags():
+    assert TagMatcher({"tags": []}).filter([{"tags": {"amenity": "cafe"}}]) == []
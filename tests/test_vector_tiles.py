@@ -0,0 +1,114 @@
+# test_vector_tiles.py
+import pytest
+import gzip
+import math
+import sqlite3
+from src import vector_tiles
+from src.vector_tiles import (
+    LINESTRING, POINT, POLYGON,
+    _assign_tiles, _encode_geometry, cluster_points, element_features, export_mbtiles, render_column,
+    render_tile, simplify,
+)
+
+
+@pytest.fixture
+def sample_elements():
+    return [
+        {"type": "node", "id": 1, "lat": 41.9022, "lon": 12.4539, "tags": {"name": "San Pietro"}},
+        {"type": "node", "id": 2, "lat": 41.9030, "lon": 12.4550, "tags": {"name": "Santa Marta"}},
+        {"type": "way", "id": 3, "tags": {"name": "Giardini"}, "geometry": [
+            {"lat": 41.90, "lon": 12.45}, {"lat": 41.90, "lon": 12.46}, {"lat": 41.91, "lon": 12.46},
+            {"lat": 41.91, "lon": 12.45}, {"lat": 41.90, "lon": 12.45}]},
+        {"type": "relation", "id": 4, "tags": {"name": "Parco"}, "members": [
+            {"type": "way", "role": "outer", "geometry": [{"lat": 42.0, "lon": 12.0}, {"lat": 42.0, "lon": 12.2}]},
+            {"type": "way", "role": "outer", "geometry": [{"lat": 42.0, "lon": 12.2}, {"lat": 42.2, "lon": 12.2},
+                                                          {"lat": 42.0, "lon": 12.0}]}]},
+        {"type": "way", "id": 5, "center": {"lat": 41.95, "lon": 12.5}, "tags": {}},
+    ]
+
+# Test geometry command encoding against the examples of the MVT specification
+def test_encode_geometry_spec_examples():
+    assert _encode_geometry(POINT, [(25, 17)]) == [9, 50, 34]
+    assert _encode_geometry(LINESTRING, [[(2, 2), (2, 10), (10, 10)]]) == [9, 4, 4, 18, 0, 16, 16, 0]
+    assert _encode_geometry(POLYGON, [[(3, 6), (8, 12), (20, 34)]]) == [9, 6, 12, 18, 10, 12, 24, 44, 15]
+
+# Test conversion of elements to features
+def test_element_features(sample_elements):
+    kinds = [[f[0] for f in element_features(e)] for e in sample_elements]
+    assert kinds == [[POINT], [POINT], [POLYGON], [POLYGON], [POINT]]
+    properties = element_features(sample_elements[0])[0][2]
+    assert properties == {"osm_type": "node", "osm_id": 1, "name": "San Pietro"}
+    # Relation rings split over several ways are assembled
+    assert len(element_features(sample_elements[3])[0][1][0]) == 4
+
+# Test simplification and clustering
+def test_simplify_and_cluster():
+    line = [(0.0, 0.0), (0.5, 0.001), (1.0, 0.0), (1.0, 1.0)]
+    assert simplify(line, 0.01) == [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]
+    assert simplify(line, 0.0001) == line
+
+    points = [(POINT, (0.101, 0.101), {"osm_id": 1}, 1), (POINT, (0.102, 0.102), {"osm_id": 2}, 2),
+              (POINT, (0.9, 0.9), {"osm_id": 3}, 3)]
+    clustered = cluster_points(points, 10)
+    assert sorted(f[2].get("point_count", 1) for f in clustered) == [1, 2]
+
+# Test clipping of polygons to the tile buffer and ring winding
+def test_render_tile_clips_polygons():
+    square = [(0.2, 0.2), (0.8, 0.2), (0.8, 0.8), (0.2, 0.8), (0.2, 0.2)]
+    _, _, _, data = render_tile((1, 0, 0, "locations", [(POLYGON, [square], {"osm_id": 1}, 1)]))
+    assert data is not None
+    tile = gzip.decompress(data)
+    assert b"locations" in tile
+
+    # A tile the feature does not reach is empty
+    outside = [(POINT, (0.9, 0.9), {}, None)]
+    assert render_tile((1, 0, 0, "locations", outside))[3] is None
+
+# Test that column rendering of a large polygon matches rendering each tile from the full outline
+def test_render_column_matches_render_tile(monkeypatch):
+    ring = [(0.5 + 0.3 * math.cos(a / 200 * math.tau), 0.5 + 0.2 * math.sin(a / 200 * math.tau)) for a in range(200)]
+    hole = [(0.5 + 0.05 * math.cos(-a / 20 * math.tau), 0.5 + 0.05 * math.sin(-a / 20 * math.tau)) for a in range(20)]
+    features = [(POLYGON, [ring + ring[:1], hole + hole[:1]], {"osm_id": 1}, 1), (POINT, (0.51, 0.52), {}, None)]
+    monkeypatch.setattr(vector_tiles, "_worker_features", features)
+
+    tiles = _assign_tiles(features, 4)
+    for x in {x for x, _ in tiles}:
+        column = sorted((y, indexes) for (tile_x, y), indexes in tiles.items() if tile_x == x)
+        rendered = render_column((4, x, "locations", column))
+        for (y, indexes), (_, _, tile_y, data) in zip(column, rendered):
+            expected = render_tile((4, x, y, "locations", [features[i] for i in indexes]))[3]
+            assert tile_y == y
+            assert (data and gzip.decompress(data)) == (expected and gzip.decompress(expected))
+
+# Test writing an MBTiles file
+@pytest.mark.parametrize("workers", [1, 2])
+def test_export_mbtiles(sample_elements, tmp_path, workers):
+    stats = export_mbtiles(sample_elements, tmp_path / "tiles.mbtiles", max_zoom=12, workers=workers)
+    assert stats["features"] == 5
+
+    connection = sqlite3.connect(tmp_path / "tiles.mbtiles")
+    metadata = dict(connection.execute("SELECT name, value FROM metadata"))
+    assert metadata["format"] == "pbf"
+    assert metadata["maxzoom"] == "12"
+    zooms = {row[0] for row in connection.execute("SELECT zoom_level FROM tiles")}
+    assert zooms == set(range(13))
+    assert connection.execute("SELECT COUNT(*) FROM tiles").fetchone()[0] == stats["tiles"]
+    connection.close()
+
+# Test decoded tile contents with an independent decoder when available
+def test_tiles_decode(sample_elements, tmp_path):
+    mapbox_vector_tile = pytest.importorskip("mapbox_vector_tile")
+    export_mbtiles(sample_elements, tmp_path / "tiles.mbtiles", max_zoom=12, workers=1)
+    connection = sqlite3.connect(tmp_path / "tiles.mbtiles")
+
+    (data,) = connection.execute("SELECT tile_data FROM tiles WHERE zoom_level = 0").fetchone()
+    features = mapbox_vector_tile.decode(gzip.decompress(data))["locations"]["features"]
+    # The Vatican points are clustered at low zoom
+    assert {"point_count": 3} in [f["properties"] for f in features]
+
+    names = set()
+    for (data,) in connection.execute("SELECT tile_data FROM tiles WHERE zoom_level = 12"):
+        for feature in mapbox_vector_tile.decode(gzip.decompress(data))["locations"]["features"]:
+            names.add(feature["properties"].get("name"))
+    assert {"San Pietro", "Santa Marta", "Giardini", "Parco"} <= names
+    connection.close()